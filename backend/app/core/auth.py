@@ -1,16 +1,21 @@
 # backend/app/core/auth.py
 
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..db.database import get_db
 from ..db import models # Your database models
 from ..schemas.auth import TokenData
-from ..core.security import verify_password, get_password_hash # Import hashing functions
-from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES # Import JWT settings
+from ..core.security import password_hasher # bcrypt off the event loop
+from ..utils.metrics import record_cache_lookup
+from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES # Import JWT settings
 
 # OAuth2PasswordBearer is used to get the token from the request header (Authorization: Bearer <token>)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") # "token" is the endpoint for getting a token
@@ -33,31 +38,162 @@ def decode_access_token(token: str) -> Optional[TokenData]:
         username: str = payload.get("sub")
         if username is None:
             return None
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, expires_at=payload.get("exp"))
     except JWTError:
         return None # Invalid token
     return token_data
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Dependency to get the current authenticated user from the token."""
-    credentials_exception = HTTPException(
+class AuthenticatedUser:
+    """
+    Identity and permissions of the user behind a token, detached from any DB session. Enough for
+    handlers that only need the user's id, roles or quota; `get_current_user` loads the full User row.
+    """
+    __slots__ = ("id", "username", "is_active", "is_admin", "is_recruiter", "daily_token_quota")
+
+    def __init__(self, id: int, username: str, is_active: bool, is_admin: bool, is_recruiter: bool,
+                 daily_token_quota: Optional[int]):
+        self.id = id
+        self.username = username
+        self.is_active = is_active
+        self.is_admin = is_admin
+        self.is_recruiter = is_recruiter
+        self.daily_token_quota = daily_token_quota
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "AuthenticatedUser":
+        return cls(user.id, user.username, bool(user.is_active), bool(user.is_admin), bool(user.is_recruiter),
+                   user.daily_token_quota)
+
+
+class AuthCache:
+    """
+    Bounded LRU cache of token -> AuthenticatedUser, keyed by the token's SHA-256 so raw tokens aren't kept.
+    An entry lives `ttl` seconds at most, and never past the token's own expiry. Changes to a User made
+    through the ORM in this worker drop its entries right away (see the mapper events below); changes
+    made elsewhere are picked up once the TTL runs out. Per worker.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        if self.ttl <= 0:
+            return None
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            record_cache_lookup("auth_user", False)
+            return None
+        self._entries.move_to_end(key)
+        record_cache_lookup("auth_user", True)
+        return entry[1]
+
+    def put(self, token: str, user: AuthenticatedUser, token_expires_at: Optional[int]) -> None:
+        if self.ttl <= 0:
+            return
+        ttl = self.ttl
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        key = self._key(token)
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, user)
+        self._keys_by_user.setdefault(user.id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[1].id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[1].id]
+
+    def invalidate_user(self, user_id: int) -> None:
+        for key in list(self._keys_by_user.get(user_id, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+
+auth_cache = AuthCache()
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target) -> None:
+    # Roles, quota or the account itself changed: the next request reloads the user
+    auth_cache.invalidate_user(target.id)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def _resolve_token(db: AsyncSession, token: str) -> Tuple[Optional[AuthenticatedUser], Optional[models.User]]:
+    """(identity, User row if it had to be loaded) for a token; (None, None) if it is invalid."""
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached, None
     token_data = decode_access_token(token)
     if token_data is None:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+        return None, None
+    result = await db.execute(select(models.User).where(models.User.username == token_data.username))
+    user = result.scalars().first()
+    if user is None:
+        return None, None
+    identity = AuthenticatedUser.from_user(user)
+    auth_cache.put(token, identity, token_data.expires_at)
+    return identity, user
+
+
+async def get_identity_by_token(db: AsyncSession, token: str) -> Optional[AuthenticatedUser]:
+    """The identity a valid access token belongs to, or None. No DB access while the token is cached."""
+    identity, _ = await _resolve_token(db, token)
+    return identity
+
+
+async def get_current_identity(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> AuthenticatedUser:
+    """Dependency for handlers that only need the user's id, roles or quota: skips the User load on cache hits."""
+    identity = await get_identity_by_token(db, token)
+    if identity is None:
+        raise _credentials_exception()
+    return identity
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Dependency to get the current authenticated user (the full User row) from the token."""
+    identity, user = await _resolve_token(db, token)
+    if identity is not None and user is None:
+        user = await db.get(models.User, identity.id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authenticates a user against the database."""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    user = result.scalars().first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
\ No newline at end of file
@@ -0,0 +1,106 @@
+# backend/app/core/refresh_tokens.py
+
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import models
+from ..config import REFRESH_TOKEN_EXPIRE_DAYS
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _token_hash(token: str) -> str:
+    # The token is 256 random bits, so a plain SHA-256 is enough to keep it useless if the table leaks
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, owner_id: int, family_id: Optional[str] = None,
+                        expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Adds a refresh token for the user to the session and returns it; the caller commits.
+    Without `family_id` it starts a new family (a new login).
+    """
+    now = datetime.now(timezone.utc)
+    token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        owner_id=owner_id,
+        token_hash=_token_hash(token),
+        family_id=family_id or secrets.token_hex(16),
+        created_at=now,
+        expires_at=now + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)),
+    ))
+    return token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[models.User, str]:
+    """
+    Uses up a refresh token: (its user, the refresh token that replaces it). Raises InvalidRefreshToken for
+    unknown, expired or already used tokens. A used token coming back means it was copied, so the whole
+    family is revoked and whoever holds its latest token has to log in again too.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(select(models.RefreshToken).where(models.RefreshToken.token_hash == _token_hash(token)))
+    stored = result.scalars().first()
+    if stored is None:
+        raise InvalidRefreshToken("Unknown refresh token.")
+    if stored.revoked_at is not None:
+        await revoke_refresh_token_family(db, stored.family_id)
+        await db.commit()
+        raise InvalidRefreshToken("Refresh token was already used.")
+
+    # Claimed with a conditional UPDATE, so of two concurrent refreshes with the same token only one wins
+    claimed = await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.id == stored.id, models.RefreshToken.revoked_at.is_(None),
+               models.RefreshToken.expires_at > now)
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await db.rollback()
+        raise InvalidRefreshToken("Refresh token expired or was already used.")
+
+    user = await db.get(models.User, stored.owner_id)
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise InvalidRefreshToken("The account no longer exists or is disabled.")
+    new_token = issue_refresh_token(db, stored.owner_id, stored.family_id)
+    await db.commit()
+    return user, new_token
+
+
+async def revoke_refresh_token_family(db: AsyncSession, family_id: str) -> None:
+    """Revokes every token of a login (e.g. on logout); the caller commits."""
+    await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id == family_id, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> None:
+    """Logs the session a refresh token belongs to out: its whole family is revoked. Unknown tokens are ignored."""
+    result = await db.execute(select(models.RefreshToken.family_id)
+                              .where(models.RefreshToken.token_hash == _token_hash(token)))
+    family_id = result.scalars().first()
+    if family_id is not None:
+        await revoke_refresh_token_family(db, family_id)
+        await db.commit()
+
+
+async def delete_expired_refresh_tokens(db: AsyncSession, owner_id: int) -> None:
+    """Drops the user's expired tokens, so the table doesn't grow with every login; the caller commits."""
+    await db.execute(
+        delete(models.RefreshToken)
+        .where(models.RefreshToken.owner_id == owner_id,
+               models.RefreshToken.expires_at <= datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
@@ -1,7 +1,15 @@
 # backend/app/core/security.py
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from passlib.context import CryptContext
 
+from ..config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from ..utils.metrics import password_hash_duration_seconds
+
 # Use bcrypt for password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -11,4 +19,54 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool instead of the event loop: each hash or verify
+    costs ~100 ms of CPU, during which no other request on the worker could make progress. bcrypt
+    releases the GIL, so the threads hash in parallel. The pool is separate from asyncio's default
+    executor, so a burst of logins can't hold up other to_thread work. At most `max_pending`
+    operations may be queued or running; beyond that PasswordHasherBusy is raised (503).
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy("Too many sign-ins are being processed right now. Please retry shortly.")
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            password_hash_duration_seconds.observe(time.perf_counter() - started, operation=operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -1,12 +1,46 @@
 import json
+import logging
 from typing import Dict, Any, List, Optional
 from ..schemas.feedback import FeedbackItem
 from ..core_ai.llm_client import LLMClient
 from ..utils.text_processing import clean_llm_output
 from ..schemas.feedback import ResumeFeedback
+
+logger = logging.getLogger(__name__)
+
+# Output shape for the batched interpretation: one entry per feedback item, each with the same
+# `rules` / `core_data_updates` structure the single-item prompt asks for.
+BATCH_INTERPRETATION_SCHEMA = """{
+  "items": [
+    {
+      "index": 0,
+      "rules": [
+        {"action": "add" | "update" | "remove", "id": "existing_rule_id" | null, "rule": "Natural language rule", "type": "stylistic" | "exclusion" | "inclusion", "active": true | false}
+      ],
+      "core_data_updates": {
+        "full_name": "New Name" | null, "email": "new@example.com" | null, "phone": "+1234567890" | null,
+        "linkedin": "new_linkedin_url" | null, "years_of_experience": 9 | null,
+        "job_history_add": [{"title": "New Role", "company": "New Co", ...}],
+        "job_history_update": [{"company": "Old Co", "updates": {"responsibilities": "new responsibilities"}}],
+        "job_history_remove": ["Company Name to Remove"],
+        "education_add": [{"degree": "PhD", "institution": "Uni", ...}],
+        "education_update": [{"institution": "Old Uni", "updates": {"degree": "New Degree"}}],
+        "education_remove": ["Institution Name to Remove"],
+        "skills_add": ["PostgreSQL"], "skills_remove": ["OldSkill"],
+        "projects_add": [{"name": "New Project", "description": "..."}],
+        "projects_update": [{"name": "Old Project", "updates": {"description": "new desc"}}],
+        "projects_remove": ["Project Name to Remove"]
+      }
+    }
+  ]
+}"""
+
+
 class AgenticLearner:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, batch_interpretation: bool = True):
         self.llm_client = llm_client
+        # Interpret all comments of one feedback submission with a single LLM call (falls back to one call per comment)
+        self.batch_interpretation = batch_interpretation
 
     def _interpret_feedback_with_llm(self, feedback_comment: str, current_user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -81,16 +115,62 @@ class AgenticLearner:
             f"JSON Output:"
         )
 
-        response_text = self.llm_client.generate_text(prompt, temperature=0.1, max_output_tokens=1024)
+        response_text = self.llm_client.generate_text(prompt, temperature=0.1, max_output_tokens=1024, call_type="learn")
         cleaned_response = clean_llm_output(response_text)
 
         try:
             interpreted_data = json.loads(cleaned_response)
             return interpreted_data
         except json.JSONDecodeError:
-            print(f"Warning: LLM did not return valid JSON for feedback '{feedback_comment}': {cleaned_response}")
+            logger.warning("LLM did not return valid JSON for feedback.",
+                           extra={"feedback_comment": feedback_comment, "raw_output": cleaned_response})
             return {"rules": [], "core_data_updates": {}}
 
+    def _interpret_feedback_batch_with_llm(self, feedback_comments: List[str], current_user_profile: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Interprets several feedback comments with one LLM call: the profile is sent once (compact JSON)
+        and the response holds one `rules` / `core_data_updates` entry per comment, in order.
+        Returns None if the response is unusable, so the caller can fall back to per-comment calls.
+        """
+        current_core_data_json = json.dumps(current_user_profile.get("core_data", {}), separators=(",", ":"))
+        current_preferences_json = json.dumps(current_user_profile.get("learned_preferences", []), separators=(",", ":"))
+        numbered_comments = "\n".join(f"[{index}] '{comment}'" for index, comment in enumerate(feedback_comments))
+
+        prompt = (
+            f"You are an AI assistant tasked with interpreting user feedback on a resume. "
+            f"The user left {len(feedback_comments)} comments. For EACH comment, extract:\n"
+            f"1. **Stylistic Preferences (Rules/Guidelines):** How the resume should be written. Examples: 'Ensure the summary is concise.', 'Use strong action verbs in the experience section.'\n"
+            f"2. **Content Exclusion/Inclusion Rules:** What specific content or keywords from the core data should be omitted or explicitly included. Examples: 'Do not include C# language details.', 'Ensure to highlight Python and AI skills.'\n"
+            f"3. **Factual Core Data Updates:** Changes or additions to the user's personal information, job history, education, skills, projects, etc.\n\n"
+            f"Here is the user's current known core data:\n```json\n{current_core_data_json}\n```\n"
+            f"And their current learned writing preferences (as a list of rules):\n```json\n{current_preferences_json}\n```\n\n"
+            f"Output a single JSON object with an `items` array containing exactly one entry per comment, in the same order, "
+            f"each with the comment's `index`, its `rules` and its `core_data_updates`. "
+            f"If a comment needs no updates of a certain type, use an empty array or object.\n\n"
+            f"**Schema for Output:**\n```json\n{BATCH_INTERPRETATION_SCHEMA}\n```\n\n"
+            f"Ensure all string values are enclosed in double quotes. Only provide fields that are explicitly indicated by the user feedback. "
+            f"For 'rules', generate concise and clear guidelines that can be directly applied during resume generation. "
+            f"If a rule already exists that covers the feedback, suggest updating that rule instead of adding a new one. "
+            f"If two comments ask for the same rule, add it only once. If a rule is no longer relevant, suggest removing it.\n\n"
+            f"User Feedback Comments:\n{numbered_comments}\n"
+            f"JSON Output:"
+        )
+
+        response_text = self.llm_client.generate_text(
+            prompt, temperature=0.1, max_output_tokens=min(8192, 1024 * len(feedback_comments)), call_type="learn")
+        cleaned_response = clean_llm_output(response_text)
+
+        try:
+            items = json.loads(cleaned_response)["items"]
+            interpretations = sorted(items, key=lambda item: item["index"])
+            if [item["index"] for item in interpretations] != list(range(len(feedback_comments))):
+                raise ValueError("items do not match the comments one-to-one")
+            return [{"rules": item.get("rules") or [], "core_data_updates": item.get("core_data_updates") or {}}
+                    for item in interpretations]
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Batched feedback interpretation failed (%s); falling back to one call per comment.", e)
+            return None
+
     def update_user_profile_from_feedback(self, current_user_profile: Dict[str, Any], feedback_items: List[FeedbackItem]) -> Dict[str, Any]:
         """
         Updates the user's profile (core data and learned preferences/rules) based on feedback,
@@ -100,11 +180,17 @@ class AgenticLearner:
         current_core_data = updated_profile.get("core_data", {})
         current_rules = updated_profile.get("learned_preferences", [])
 
-        for item in feedback_items:
-            if not item.comment:
-                continue
+        comments = [item.comment for item in feedback_items if item.comment]
+        batch_interpretations = None
+        if self.batch_interpretation and len(comments) > 1:
+            batch_interpretations = self._interpret_feedback_batch_with_llm(comments, updated_profile)
 
-            llm_interpretation = self._interpret_feedback_with_llm(item.comment, updated_profile)
+        for position, comment in enumerate(comments):
+            # Without a batched result, each comment is interpreted against the profile as updated by the previous ones
+            if batch_interpretations is not None:
+                llm_interpretation = batch_interpretations[position]
+            else:
+                llm_interpretation = self._interpret_feedback_with_llm(comment, updated_profile)
 
             # --- Manage Rules (learned_preferences) ---
             extracted_rules = llm_interpretation.get("rules", [])
@@ -156,11 +242,11 @@ class AgenticLearner:
                 current_core_data.setdefault("projects", []).extend(extracted_core_data_updates["projects_add"])
 
             if extracted_core_data_updates.get("job_history_update") or extracted_core_data_updates.get("job_history_remove"):
-                print("Warning: Complex job_history update/remove logic not fully implemented yet.")
+                logger.warning("Complex job_history update/remove logic not fully implemented yet.")
             if extracted_core_data_updates.get("education_update") or extracted_core_data_updates.get("education_remove"):
-                print("Warning: Complex education update/remove logic not fully implemented yet.")
+                logger.warning("Complex education update/remove logic not fully implemented yet.")
             if extracted_core_data_updates.get("projects_update") or extracted_core_data_updates.get("projects_remove"):
-                print("Warning: Complex projects update/remove logic not fully implemented yet.")
+                logger.warning("Complex projects update/remove logic not fully implemented yet.")
 
         updated_profile["core_data"] = current_core_data
         updated_profile["learned_preferences"] = current_rules
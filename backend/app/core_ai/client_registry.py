@@ -0,0 +1,30 @@
+# backend/app/core_ai/client_registry.py
+
+import threading
+from typing import Dict, Optional
+
+from ..config import GEMINI_MODEL
+from .llm_client import LLMClient
+
+
+class ClientRegistry:
+    """
+    The process's shared LLM clients, one per model name, created on first use. Everything that calls
+    Gemini takes its client from here, so a worker configures the SDK once instead of once per module.
+    """
+
+    def __init__(self, default_model: str = GEMINI_MODEL):
+        self.default_model = default_model
+        self._llm_clients: Dict[str, LLMClient] = {}
+        self._lock = threading.Lock()
+
+    def llm(self, model_name: Optional[str] = None) -> LLMClient:
+        model_name = model_name or self.default_model
+        client = self._llm_clients.get(model_name)
+        if client is None:
+            with self._lock:
+                client = self._llm_clients.setdefault(model_name, LLMClient(model_name))
+        return client
+
+
+clients = ClientRegistry()
@@ -1,22 +1,82 @@
-import google.generativeai as genai
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from .prompt_budget import token_counter
+from ..services.usage_ledger import usage_ledger
+from ..utils.metrics import llm_calls_total, llm_call_duration_seconds, llm_tokens_total
+from ..utils.tracing import span
+
 load_dotenv() # Ensure .env is loaded here too for robustness
 
+logger = logging.getLogger(__name__)
+
+
+def _genai():
+    """google.generativeai, imported on first use: it takes about a second to import (it pulls in IPython when installed)."""
+    import google.generativeai as genai
+    return genai
+
+
 class LLMClient:
+    """
+    Gemini client. Constructing one is cheap: the SDK is imported and configured, and the model
+    created, on the first call. Get the process's shared instance from core_ai.client_registry.
+    """
+
     def __init__(self, model_name: str = "gemini-1.5-flash"):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set.")
-        genai.configure(api_key=api_key)
         self.model_name = model_name
-        self.model = genai.GenerativeModel(self.model_name)
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    api_key = os.getenv("GEMINI_API_KEY")
+                    if not api_key:
+                        raise ValueError("GEMINI_API_KEY environment variable not set.")
+                    genai = _genai()
+                    genai.configure(api_key=api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
 
-    def generate_text(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048) -> str:
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
+
+    def generate_text(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                      call_type: str = "generate") -> str:
         """
         Generates text using the configured Gemini model.
+        `call_type` (generate, critique, refine, extract, suggest, learn, jd_digest) labels the call in traces and metrics.
         """
+        with span("llm.call", call_type=call_type, model=self.model_name, temperature=temperature) as trace:
+            call = {"outcome": "ok", "error": None, "prompt_tokens": None, "response_tokens": None}
+            started = time.perf_counter()
+            generated_text = self._generate_text(prompt, temperature, max_output_tokens, call)
+            latency = time.perf_counter() - started
+            llm_call_duration_seconds.observe(latency, call_type=call_type)
+            llm_calls_total.inc(call_type=call_type, outcome=call["outcome"])
+
+            # Real token counts when Gemini reports them, the local estimate otherwise
+            prompt_tokens = call["prompt_tokens"] or token_counter.count(prompt)
+            response_tokens = call["response_tokens"] or token_counter.count(generated_text)
+            llm_tokens_total.inc(prompt_tokens, call_type=call_type, direction="prompt")
+            llm_tokens_total.inc(response_tokens, call_type=call_type, direction="response")
+            usage_ledger.record(call_type, self.model_name, prompt_tokens, response_tokens, latency * 1000,
+                                call["outcome"], tokens_estimated=call["prompt_tokens"] is None)
+            if trace is not None:
+                trace.set("prompt_tokens", prompt_tokens)
+                trace.set("response_tokens", response_tokens)
+                trace.error = call["error"]
+            return generated_text
+
+    def _generate_text(self, prompt: str, temperature: float, max_output_tokens: int, call: dict) -> str:
+        genai = _genai()
         try:
             # Use safety_settings to prevent blocking on potentially sensitive resume content
             # Adjust these based on your specific needs
@@ -34,19 +94,34 @@ class LLMClient:
                 ),
                 safety_settings=safety_settings
             )
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                call["prompt_tokens"] = usage.prompt_token_count
+                call["response_tokens"] = usage.candidates_token_count
             # Access the text property of the candidate, handling cases where it might not exist
             if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
                 generated_text = "".join(part.text for part in response.candidates[0].content.parts)
                 return generated_text.strip()
+            call["outcome"] = "blocked"
             return "No text generated or response blocked." # Fallback if no content
         except genai.types.BlockedPromptException as e:
             # Handle cases where the prompt itself is blocked by safety settings
-            print(f"Prompt was blocked by safety settings: {e}")
+            logger.warning("Prompt was blocked by safety settings: %s", e)
+            call["outcome"] = "blocked"
+            call["error"] = f"BlockedPromptException: {e}"
             return "Content generation blocked due to safety concerns with the prompt."
         except Exception as e:
-            print(f"Error generating content with Gemini: {e}")
+            logger.error("Error generating content with Gemini: %s", e)
+            call["outcome"] = "error"
+            call["error"] = f"{type(e).__name__}: {e}"
             return f"Error: {str(e)}"
 
+    def count_tokens(self, text: str) -> int:
+        """
+        Number of tokens Gemini counts for `text` (one API call). Used to calibrate the local token estimate.
+        """
+        return self.model.count_tokens(text).total_tokens
+
 # Example usage (for testing this module directly)
 if __name__ == "__main__":
     llm_client = LLMClient()
@@ -0,0 +1,84 @@
+# backend/app/core_ai/llm_scheduler.py
+
+import asyncio
+import time
+
+from ..config import LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE
+
+
+class LLMScheduler:
+    """
+    Runs blocking LLM calls (LLMClient.generate_text) in worker threads, keeping the event loop free,
+    while capping both the number of calls in flight and the request rate sent to Gemini.
+    The rate limit is a token bucket: bursts of up to `max_concurrency` calls, `requests_per_minute` sustained.
+    Limits are per API worker process. `before_dispatch`, if set, is awaited before every call and may raise
+    to refuse it (the daily token quota is enforced this way).
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._semaphore = None
+        self._rate_lock = None
+        self._tokens = float(max_concurrency)
+        self._last_refill = time.monotonic()
+        self.before_dispatch = None
+
+    def _ensure_primitives(self) -> None:
+        # Created lazily so they bind to the running event loop, not the one (if any) at import time
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._rate_lock = asyncio.Lock()
+
+    async def _acquire_rate_token(self) -> None:
+        if self.requests_per_minute <= 0:
+            return
+        async with self._rate_lock:
+            rate = self.requests_per_minute / 60.0
+            while True:
+                now = time.monotonic()
+                self._tokens = min(float(self.max_concurrency), self._tokens + (now - self._last_refill) * rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / rate)
+
+    async def run(self, func, *args, **kwargs):
+        """Awaits `func(*args, **kwargs)` once a concurrency slot and a rate token are available."""
+        if self.before_dispatch is not None:
+            await self.before_dispatch()
+        self._ensure_primitives()
+        async with self._semaphore:
+            await self._acquire_rate_token()
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+
+class ScheduledLLMClient:
+    """
+    An LLMClient for blocking code that runs in a worker thread and makes several calls (e.g. AgenticLearner):
+    each generate_text call waits for its own scheduler slot and rate token on the event loop, instead of
+    the whole job holding a single slot. Create it on the event loop; everything else is delegated.
+    """
+
+    def __init__(self, client, scheduler: LLMScheduler):
+        self.client = client
+        self.scheduler = scheduler
+        self._loop = asyncio.get_running_loop()
+
+    def generate_text(self, *args, **kwargs) -> str:
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            raise RuntimeError("ScheduledLLMClient.generate_text blocks; call it from a worker thread.")
+        future = asyncio.run_coroutine_threadsafe(
+            self.scheduler.run(self.client.generate_text, *args, **kwargs), self._loop)
+        return future.result()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,117 @@
+# backend/app/core_ai/preference_compaction.py
+
+import difflib
+import hashlib
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config import RULE_SIMILARITY_THRESHOLD, RULES_TOKEN_BUDGET
+from ..utils.text_processing import normalize_extracted_text
+from .prompt_budget import token_counter
+
+# Leading phrases that turn a rule into its opposite ("Do not include hobbies" vs "Include hobbies")
+NEGATION_RE = re.compile(r"^(?:(?:please|always) )?(?:do not|dont|never|avoid|no longer|stop|exclude|omit|remove) ")
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+# Words that don't change what a rule asks for; all other words must match for two rules to count as similar
+STOPWORDS = frozenset("""
+a an the my me i im in on of to for and or with at by from as is are be it its this that these those your our
+please always also make sure use should
+""".split())
+
+
+def normalize_rule_text(text: str) -> str:
+    """Lowercased, punctuation-free, whitespace-collapsed rule text."""
+    text = normalize_extracted_text(text).replace("'", "").replace("\u2019", "")
+    return " ".join(PUNCTUATION_RE.sub(" ", text).split())
+
+
+def _rule_key(rule: Dict[str, Any]) -> Tuple[str, bool]:
+    """(normalised text without the negation, whether the rule forbids rather than asks for something)."""
+    text = normalize_rule_text(rule["rule"])
+    stripped = NEGATION_RE.sub("", text)
+    negative = stripped != text or rule.get("type") == "exclusion"
+    return stripped, negative
+
+
+def _is_active_rule(preference: Any) -> bool:
+    return (isinstance(preference, dict) and preference.get("active", True)
+            and isinstance(preference.get("rule"), str) and preference["rule"].strip() != "")
+
+
+def _content_words(text: str) -> frozenset:
+    return frozenset(word for word in text.split() if word not in STOPWORDS)
+
+
+def _similar(matcher: difflib.SequenceMatcher, text: str, threshold: float) -> bool:
+    """
+    Whether `text` is similar to the matcher's seq2 (set once per rule: difflib caches its analysis).
+    Callers first check that both rules have the same content words: a character ratio alone treats
+    "Mention my AWS certification" and "Mention my GCP certification" as the same rule.
+    """
+    other = matcher.b
+    if 2 * min(len(text), len(other)) < threshold * (len(text) + len(other)): # Upper bound of ratio()
+        return False
+    matcher.set_seq1(text)
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def _compaction_verdicts(rules: List[Dict[str, Any]],
+                         threshold: float) -> Iterator[Tuple[int, Optional[str], bool]]:
+    """
+    Yields (index, None | "duplicate" | "contradiction", exact) for the active rules, newest first. A rule is
+    redundant when a newer kept rule says the same thing or the opposite: with the same normalised text
+    (exact), or with the same content words and similar above `threshold` (not exact).
+    """
+    kept_fingerprints: Dict[str, bool] = {} # Normalised-text hash of a kept rule -> whether it is negative
+    kept: List[Tuple[str, bool, frozenset]] = []
+    for index in range(len(rules) - 1, -1, -1):
+        if not _is_active_rule(rules[index]):
+            continue
+        text, negative = _rule_key(rules[index])
+        fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        words = _content_words(text)
+        verdict, exact = None, False
+        if fingerprint in kept_fingerprints:
+            verdict = "duplicate" if kept_fingerprints[fingerprint] == negative else "contradiction"
+            exact = True
+        else:
+            matcher = difflib.SequenceMatcher(None, b=text, autojunk=False)
+            for kept_text, kept_negative, kept_words in kept:
+                if kept_words == words and _similar(matcher, kept_text, threshold):
+                    verdict = "duplicate" if kept_negative == negative else "contradiction"
+                    break
+        if verdict is None:
+            kept_fingerprints[fingerprint] = negative
+            kept.append((text, negative, words))
+        yield index, verdict, exact
+
+
+def plan_rule_compaction(rules: List[Dict[str, Any]],
+                         threshold: float = RULE_SIMILARITY_THRESHOLD) -> Dict[int, Tuple[str, bool]]:
+    """
+    Finds the rules made redundant by a newer one (the newest wins). `rules` must be oldest first.
+    Returns {index: ("duplicate" | "contradiction", exact)}. Only exact matches (same normalised text) are
+    safe to delete; similar ones should just be deactivated. Inactive rules are left alone.
+    """
+    return {index: (verdict, exact) for index, verdict, exact in _compaction_verdicts(rules, threshold) if verdict}
+
+
+def select_prompt_rules(learned_preferences: List[Any], token_budget: int = RULES_TOKEN_BUDGET,
+                        threshold: float = RULE_SIMILARITY_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    The learned rules worth putting into a prompt, oldest first: active rules only (raw feedback entries
+    and deactivated rules are left out), without duplicates or rules overridden by a newer contradicting one,
+    and, when they don't all fit in `token_budget` tokens, only the newest ones that do.
+    """
+    rules = [{"rule": p} if isinstance(p, str) else p for p in learned_preferences or []]
+    selected = []
+    tokens = 0
+    for index, verdict, _ in _compaction_verdicts(rules, threshold):
+        if verdict:
+            continue
+        tokens += token_counter.count(rules[index]["rule"]) + 2 # "- " and the newline
+        if tokens > token_budget:
+            break
+        selected.append(rules[index])
+    selected.reverse()
+    return selected
@@ -0,0 +1,177 @@
+# backend/app/core_ai/prompt_budget.py
+
+import json
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import PROMPT_TOKEN_BUDGET
+from ..utils.metrics import registry
+from ..utils.tracing import span
+
+TRUNCATION_MARKER = "\n[...truncated to fit the prompt budget]"
+
+
+def compact_json(data: Any) -> str:
+    """JSON for prompts: no indentation or spaces after separators, non-ASCII kept as is."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class TokenCounter:
+    """
+    Local token estimate from the character count. The characters-per-token ratio starts at the usual
+    ~4 for English text and can be calibrated against the model's real tokenizer (LLMClient.count_tokens).
+    """
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+        self.calibrated = False
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token) if text else 0
+
+    def calibrate(self, count_tokens: Callable[[str], int], samples: List[str]) -> float:
+        """Sets the ratio from the real token counts of `samples` (one API call each). Returns the new ratio."""
+        chars = tokens = 0
+        for sample in samples:
+            chars += len(sample)
+            tokens += count_tokens(sample)
+        if chars and tokens:
+            self.chars_per_token = chars / tokens
+            self.calibrated = True
+        return self.chars_per_token
+
+
+token_counter = TokenCounter()
+
+
+class PromptSection:
+    """
+    One part of a prompt. `priority` 0 means the section is always kept; when the prompt is over budget,
+    sections are trimmed from the highest priority number down. A `truncatable` section loses the end
+    of its `body` (its `prefix` and `suffix`, e.g. code fences, are kept); other sections are dropped whole.
+    """
+
+    def __init__(self, name: str, body: str, priority: int = 0, truncatable: bool = False,
+                 prefix: str = "", suffix: str = ""):
+        self.name = name
+        self.body = body
+        self.priority = priority
+        self.truncatable = truncatable
+        self.prefix = prefix
+        self.suffix = suffix
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}{self.body}{self.suffix}"
+
+
+class PromptMetrics:
+    """Per prompt kind: prompts built, tokens per section, and how often each section had to be trimmed."""
+
+    def __init__(self):
+        self._lock = threading.Lock() # Prompts are also built in worker threads
+        self.prompts: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+        self.section_tokens: Dict[str, Dict[str, int]] = {}
+        self.trimmed_sections: Dict[str, Dict[str, int]] = {}
+        self.last_breakdown: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, kind: str, breakdown: Dict[str, Any]) -> None:
+        with self._lock:
+            self.prompts[kind] = self.prompts.get(kind, 0) + 1
+            self.tokens[kind] = self.tokens.get(kind, 0) + breakdown["total"]
+            sections = self.section_tokens.setdefault(kind, {})
+            for name, tokens in breakdown["sections"].items():
+                sections[name] = sections.get(name, 0) + tokens
+            trimmed = self.trimmed_sections.setdefault(kind, {})
+            for name in breakdown["trimmed"]:
+                trimmed[name] = trimmed.get(name, 0) + 1
+            self.last_breakdown[kind] = breakdown
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                kind: {
+                    "prompts": count,
+                    "tokens": self.tokens[kind],
+                    "section_tokens": dict(self.section_tokens[kind]),
+                    "trimmed_sections": dict(self.trimmed_sections[kind]),
+                    "last": self.last_breakdown[kind],
+                }
+                for kind, count in self.prompts.items()
+            }
+
+
+prompt_metrics = PromptMetrics()
+
+
+def _prompt_metrics_collector():
+    snapshot = prompt_metrics.snapshot()
+    yield "prompts_built_total", "counter", "Prompts assembled, by kind.", [
+        ((("kind", kind),), stats["prompts"]) for kind, stats in sorted(snapshot.items())]
+    yield "prompt_tokens_total", "counter", "Estimated tokens of the assembled prompts, by kind.", [
+        ((("kind", kind),), stats["tokens"]) for kind, stats in sorted(snapshot.items())]
+    yield "prompt_sections_trimmed_total", "counter", "Prompt sections trimmed to fit the token budget.", [
+        ((("kind", kind), ("section", section)), count)
+        for kind, stats in sorted(snapshot.items()) for section, count in sorted(stats["trimmed_sections"].items())]
+
+
+registry.add_collector(_prompt_metrics_collector)
+
+
+def _truncate_to_tokens(section: PromptSection, max_tokens: int) -> bool:
+    """Shortens the section's body so the section fits `max_tokens`. False if not even the frame fits."""
+    frame = token_counter.count(section.prefix + TRUNCATION_MARKER + section.suffix)
+    if max_tokens <= frame:
+        return False
+    keep_chars = int((max_tokens - frame) * token_counter.chars_per_token)
+    section.body = section.body[:keep_chars].rstrip() + TRUNCATION_MARKER
+    return True
+
+
+def fit_sections(sections: List[PromptSection], budget: int = PROMPT_TOKEN_BUDGET,
+                 separator: str = "\n") -> Tuple[str, Dict[str, Any]]:
+    """
+    Joins the sections into a prompt of at most `budget` estimated tokens, trimming sections by priority.
+    Returns (prompt, breakdown) where breakdown holds the tokens of each kept section, the total and
+    the names of the trimmed sections. Sections with priority 0 are never trimmed, even over budget.
+    """
+    sections = [section for section in sections if section.body]
+    tokens = {id(section): token_counter.count(section.text) for section in sections}
+    separator_tokens = token_counter.count(separator) * max(len(sections) - 1, 0)
+    total = sum(tokens.values()) + separator_tokens
+    trimmed = []
+
+    for section in sorted((s for s in sections if s.priority > 0), key=lambda s: -s.priority):
+        if total <= budget:
+            break
+        excess = total - budget
+        if section.truncatable and _truncate_to_tokens(section, tokens[id(section)] - excess):
+            new_tokens = token_counter.count(section.text)
+        else:
+            sections = [s for s in sections if s is not section]
+            new_tokens = -token_counter.count(separator) # Its separator goes too
+        total -= tokens[id(section)] - new_tokens
+        tokens[id(section)] = max(new_tokens, 0)
+        trimmed.append(section.name)
+
+    breakdown = {
+        "sections": {section.name: tokens[id(section)] for section in sections},
+        "total": total,
+        "budget": budget,
+        "trimmed": trimmed,
+    }
+    return separator.join(section.text for section in sections), breakdown
+
+
+def assemble_prompt(kind: str, sections: List[PromptSection], budget: Optional[int] = None,
+                    separator: str = "\n") -> str:
+    """fit_sections, recording the token breakdown under `kind` in prompt_metrics (and on the trace)."""
+    with span("prompt.build", kind=kind) as trace:
+        prompt, breakdown = fit_sections(sections, PROMPT_TOKEN_BUDGET if budget is None else budget, separator)
+        if trace is not None:
+            trace.set("prompt_tokens", breakdown["total"])
+            trace.set("trimmed_sections", ",".join(breakdown["trimmed"]))
+    prompt_metrics.record(kind, breakdown)
+    return prompt
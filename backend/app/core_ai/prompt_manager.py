@@ -1,11 +1,36 @@
 from typing import Dict, Any, List, Optional
-import json  # Ensure json is imported
+import textwrap
+
+from .preference_compaction import select_prompt_rules
+from .prompt_budget import PromptSection, assemble_prompt, compact_json
+
+# Bump whenever the rendering of the profile fragments changes, so stored fragments get re-rendered.
+PROMPT_FRAGMENTS_VERSION = 3
+# Bump whenever generate_core_data_extraction_prompt changes, so cached upload extractions are redone.
+EXTRACTION_PROMPT_VERSION = 2
+# Bump whenever generate_jd_digest_prompt changes, so cached job description digests are redone.
+JD_DIGEST_PROMPT_VERSION = 1
+
+# JSON shapes of the core data fields, used when only some of them are left for the LLM to extract
+EXTRACTION_FIELD_SCHEMAS = {
+    "full_name": '"string"',
+    "email": '"string"',
+    "phone": '"string"',
+    "linkedin": '"string"',
+    "years_of_experience": "0",
+    "job_history": '[{"title": "string", "company": "string", "start_date": "YYYY-MM or YYYY", '
+                   '"end_date": "YYYY-MM or YYYY or \'Present\'", "responsibilities": ["string"]}]',
+    "education": '[{"degree": "string", "major": "string", "university": "string", '
+                 '"graduation_date": "YYYY-MM or YYYY"}]',
+    "skills": '["string"]',
+    "certifications": '["string"]',
+}
 
 
 class PromptManager:
     def __init__(self):
-        # Base instructions for the LLM
-        self.base_instructions = (
+        # Base instructions for the LLM (dedented: the source indentation would cost prompt tokens)
+        self.base_instructions = textwrap.dedent(
             """
                 You are an AI-powered Senior Resume Writer and Applicant Tracking System (ATS) Optimization Specialist. Your mission is to craft a highly tailored, professional, and impactful resume in Markdown format.
 
@@ -30,16 +55,99 @@ class PromptManager:
                 * **Certifications/Awards (Optional):** List relevant certifications or notable awards.
                 * **Projects (Optional):** If provided, describe relevant projects with their impact, technologies used, and outcomes.
                 """
-        )
+        ).strip()
 
     def generate_resume_prompt(self, user_core_data: Dict[str, Any], learned_preferences: List[Dict[str, Any]],
-                               initial_request: str = "", target_job_description: str = "") -> str:
+                               initial_request: str = "", target_job_description: str = "",
+                               fragments: Optional[Dict[str, Any]] = None) -> str:
         """
         Constructs a comprehensive prompt for Gemini to generate a resume.
         Combines core data, dynamic learned preferences (rules), and specific requests.
+        Pass `fragments` (from `render_profile_fragments`) to skip re-rendering the profile-dependent parts.
+        """
+        if fragments is None:
+            fragments = self.render_profile_fragments(user_core_data, learned_preferences)
+        return self.assemble_resume_prompt(fragments, initial_request, target_job_description)
+
+    def render_profile_fragments(self, user_core_data: Dict[str, Any],
+                                 learned_preferences: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Renders the parts of the resume prompt that depend only on the user's profile:
+        the candidate block and the categorized (stylistic/exclusion/inclusion) rules.
+        These only change when the profile or its preferences change, so they can be computed at write time.
+        Only the compacted, token-budgeted rules are rendered (see preference_compaction.select_prompt_rules);
+        they are kept as `prompt_rules` for the critique and refinement prompts.
+        """
+        prompt_rules = select_prompt_rules(learned_preferences)
+        return {
+            "version": PROMPT_FRAGMENTS_VERSION,
+            "candidate": self.render_candidate_block(user_core_data),
+            "categorized_rules": self.render_categorized_rules_block(prompt_rules),
+            "prompt_rules": prompt_rules,
+        }
+
+    def assemble_resume_prompt(self, fragments: Dict[str, Any], initial_request: str = "",
+                               target_job_description: str = "") -> str:
         """
+        Builds the full resume prompt from pre-rendered profile fragments plus the per-request parts,
+        within PROMPT_TOKEN_BUDGET: over budget, the job description is truncated first, then the learned
+        rules are dropped and the candidate block truncated.
+        """
+        sections = [
+            PromptSection("base_instructions", self.base_instructions),
+            PromptSection("candidate", fragments["candidate"], priority=1, truncatable=True),
+        ]
+
+        # 3. Specific Request (from frontend, e.g., target JD)
+        if initial_request:
+            sections.append(PromptSection(
+                "request", initial_request, prefix="\nUser's specific instruction for this generation: "))
+
+        if target_job_description:
+            sections.append(PromptSection(
+                "job_description", target_job_description, priority=3, truncatable=True,
+                prefix="\n**Target Job Description (CRUCIAL for tailoring):**\n```\n", suffix="\n```"))
+            sections.append(PromptSection(
+                "job_description_instructions",
+                "**CRITICAL INSTRUCTION: You MUST analyze this job description meticulously.** "
+                "The entire resume, especially the summary, skills, and work experience, "
+                "must be heavily tailored to align with the requirements, keywords, and tone of this JD. "
+                "Prioritize experiences, skills, and achievements from the 'Original Candidate Core Data' that are **most relevant** to this specific role. "
+                "**Conversely, you MUST de-emphasize or completely omit details from the 'Original Candidate Core Data' that are not relevant to this JD.** "
+                "For example, if the core data describes extensive AI/ML experience but the Target Job Description is for a purely Frontend Developer, "
+                "you should minimize or entirely exclude the AI/ML details and instead prominently highlight Frontend development experience. "
+                "The goal is a highly focused resume for *this specific target job*."
+                "\n**Integrate keywords, skills, and responsibilities from this JD throughout the resume, especially in the summary and experience bullet points.** "
+                "Prioritize and rephrase content that directly aligns with the job description's requirements. Look for specific keywords and concepts to emphasize."
+            ))
+
+        sections.append(PromptSection(
+            "generate_instruction",
+            "\n\nNow, generate the complete resume based on all the above information. Ensure it is formatted clearly with distinct sections (e.g., Summary, Experience, Education, Skills)."))
+
+        sections.append(PromptSection("learned_rules", fragments.get("categorized_rules", ""), priority=2))
+
+        if not target_job_description:
+            sections.append(PromptSection(
+                "no_job_description", "\n**No specific Target Job Description provided. Generate a strong general resume.**"))
+
+        sections.append(PromptSection(
+            "closing_instructions",
+            "\n\n**Generate the COMPLETE resume now, strictly adhering to all the instructions, candidate data, preferences, and the target job description (if provided).**"
+            "\nYour output MUST be in a clean, professional, and easy-to-read Markdown format."
+            "\nDouble-check for conciseness, impact, quantification, and ATS compatibility."
+            "\nEnsure the resume is distinct and unique, avoiding generic phrasing common to AI-generated text."
+            "\n\n\n**Based on the provided core data, learned preferences, and the critical target job description, generate the complete resume in Markdown format. Your output must be ONLY the resume content.** "
+            "Ensure it is highly relevant, quantified, professional, and directly addresses the target role, selectively emphasizing relevant experiences and de-emphasizing irrelevant ones, as per the CRITICAL INSTRUCTION above."
+        ))
 
-        prompt_parts = [self.base_instructions]
+        return assemble_prompt("resume", sections)
+
+    def render_candidate_block(self, user_core_data: Dict[str, Any]) -> str:
+        """
+        Renders the candidate's core information (contact, experience, education, skills, certifications, projects).
+        """
+        prompt_parts = []
 
         # 1. User Core Data
         prompt_parts.append(f"\nHere is the candidate's core information:")
@@ -151,38 +259,13 @@ class PromptManager:
         else:
             prompt_parts.append("\n- Projects: No project information provided.")
 
-        # 2. Learned Preferences (Dynamic Agentic Rules)
-        # Iterate over the list of rules and add them to the prompt if active
-        if learned_preferences and isinstance(learned_preferences, list):
-            prompt_parts.append(
-                "\nBased on previous interactions and feedback, apply the following specific guidelines and preferences:")
-            for rule_obj in learned_preferences:
-                if isinstance(rule_obj, dict) and rule_obj.get("active", True):  # Only add active rules
-                    rule_text = rule_obj.get("rule")
-                    if rule_text and isinstance(rule_text, str):
-                        prompt_parts.append(f"- {rule_text}")
-
-        # 3. Specific Request (from frontend, e.g., target JD)
-        if initial_request:
-            prompt_parts.append(f"\nUser's specific instruction for this generation: {initial_request}")
-
-        if target_job_description:
-            prompt_parts.append(
-                f"\n**Target Job Description (CRUCIAL for tailoring):**\n```\n{target_job_description}\n```")
-            prompt_parts.append(
-                "**CRITICAL INSTRUCTION: You MUST analyze this job description meticulously.** "
-                "The entire resume, especially the summary, skills, and work experience, "
-                "must be heavily tailored to align with the requirements, keywords, and tone of this JD. "
-                "Prioritize experiences, skills, and achievements from the 'Original Candidate Core Data' that are **most relevant** to this specific role. "
-                "**Conversely, you MUST de-emphasize or completely omit details from the 'Original Candidate Core Data' that are not relevant to this JD.** "
-                "For example, if the core data describes extensive AI/ML experience but the Target Job Description is for a purely Frontend Developer, "
-                "you should minimize or entirely exclude the AI/ML details and instead prominently highlight Frontend development experience. "
-                "The goal is a highly focused resume for *this specific target job*."
-            )
-
-        prompt_parts.append(
-            "\n\nNow, generate the complete resume based on all the above information. Ensure it is formatted clearly with distinct sections (e.g., Summary, Experience, Education, Skills).")
+        return "\n".join(prompt_parts)
 
+    def render_categorized_rules_block(self, learned_preferences: List[Dict[str, Any]]) -> str:
+        """
+        Renders the learned preferences grouped into stylistic, exclusion and inclusion rules. Empty if there are none.
+        """
+        prompt_parts = []
         stylistic_rules = []
         exclusion_rules = []
         inclusion_rules = []  # For potential future "must include X" rules
@@ -196,12 +279,12 @@ class PromptManager:
                     rule_type = rule_obj.get("type", "stylistic")
                     if rule_text and isinstance(rule_text, str):
                         clean_learned_preferences.append(rule_obj)
-                        if rule_type == "stylistic":
-                            stylistic_rules.append(rule_text)
-                        elif rule_type == "exclusion":
+                        if rule_type == "exclusion":
                             exclusion_rules.append(rule_text)
                         elif rule_type == "inclusion":
                             inclusion_rules.append(rule_text)
+                        else:  # "stylistic", or a type this block doesn't know
+                            stylistic_rules.append(rule_text)
                 elif isinstance(rule_obj, str):  # Handle cases where preferences might just be strings
                     stylistic_rules.append(rule_obj)
 
@@ -226,30 +309,6 @@ class PromptManager:
                     for rule_text in inclusion_rules:
                         prompt_parts.append(f"- {rule_text}")
 
-        if initial_request:
-            prompt_parts.append(f"\nUser's specific instruction for this generation: {initial_request}")
-
-        if target_job_description:
-            prompt_parts.append(
-                f"\n**TARGET JOB DESCRIPTION (CRITICAL FOR TAILORING):**\n```\n{target_job_description}\n```\n"
-                f"**Integrate keywords, skills, and responsibilities from this JD throughout the resume, especially in the summary and experience bullet points.** "
-                f"Prioritize and rephrase content that directly aligns with the job description's requirements. Look for specific keywords and concepts to emphasize."
-            )
-        else:
-            prompt_parts.append(
-                "\n**No specific Target Job Description provided. Generate a strong general resume.**")
-
-        prompt_parts.append(
-            "\n\n**Generate the COMPLETE resume now, strictly adhering to all the instructions, candidate data, preferences, and the target job description (if provided).**"
-            "\nYour output MUST be in a clean, professional, and easy-to-read Markdown format."
-            "\nDouble-check for conciseness, impact, quantification, and ATS compatibility."
-            "\nEnsure the resume is distinct and unique, avoiding generic phrasing common to AI-generated text."
-        )
-        prompt_parts.append(
-            "\n\n**Based on the provided core data, learned preferences, and the critical target job description, generate the complete resume in Markdown format. Your output must be ONLY the resume content.** "
-            "Ensure it is highly relevant, quantified, professional, and directly addresses the target role, selectively emphasizing relevant experiences and de-emphasizing irrelevant ones, as per the CRITICAL INSTRUCTION above."
-        )
-
         return "\n".join(prompt_parts)
 
     def generate_suggestions_prompt(self, user_core_data: Dict[str, Any], learned_preferences: List[Dict[str, Any]],
@@ -258,52 +317,52 @@ class PromptManager:
         Constructs a comprehensive prompt for the LLM to generate proactive resume suggestions.
         Analyzes core data, learned preferences, and an optional target job description.
         """
-        core_data_json = json.dumps(user_core_data, indent=2)
-        preferences_json = json.dumps(learned_preferences, indent=2)
-
-        prompt = (
+        sections = [PromptSection(
+            "instructions",
             "You are an expert career coach and resume strategist. Your primary goal is to analyze a candidate's resume data "
             "and their past learned preferences, then provide proactive, actionable suggestions for improving their resume. "
             "Focus on best practices for modern, ATS-friendly resumes (conciseness, quantification, strong action verbs, relevance).\n\n"
-        )
-
-        prompt += (
-            "**Candidate's Current Core Resume Data (JSON format):**\n```json\n"
-            f"{core_data_json}\n```\n\n"
-        )
+        ), PromptSection(
+            "core_data", compact_json(user_core_data),
+            prefix="**Candidate's Current Core Resume Data (JSON format):**\n```json\n", suffix="\n```\n\n"
+        )]
 
         if learned_preferences:
-            prompt += (
-                "**Candidate's Previously Learned Preferences/Rules (JSON format):**\n```json\n"
-                f"{preferences_json}\n```\n"
+            sections.append(PromptSection(
+                "learned_rules", compact_json(learned_preferences), priority=2,
+                prefix="**Candidate's Previously Learned Preferences/Rules (JSON format):**\n```json\n",
+                suffix="\n```\n"
                 "When providing suggestions, acknowledge these existing preferences and do not suggest things already covered by active rules. If a rule is about an area that still needs improvement despite the rule, phrase the suggestion as a reinforcement or a deeper dive.\n\n"
-            )
+            ))
         else:
-            prompt += "Candidate has no specific learned preferences yet.\n\n"
+            sections.append(PromptSection("no_learned_rules", "Candidate has no specific learned preferences yet.\n\n"))
 
         if target_job_description:
-            prompt += (
-                f"**Target Job Description for Contextual Analysis:**\n```\n{target_job_description}\n```\n"
+            sections.append(PromptSection(
+                "job_description", target_job_description, priority=3, truncatable=True,
+                prefix="**Target Job Description for Contextual Analysis:**\n```\n",
+                suffix="\n```\n"
                 "Prioritize suggestions that help align the resume more closely with this job description. Identify potential skill gaps, areas to emphasize, or experiences to rephrase for maximum relevance to this role.\n\n"
-            )
+            ))
 
-        prompt += (
+        sections.append(PromptSection(
+            "output_schema",
             "Based on the above information, provide a list of clear, concise, and professional suggestions. "
             "Focus on actionable advice. Output your suggestions as a JSON array where each object strictly follows this schema:\n"
-            f"```json\n"
-            f"[\n"
-            f"  {{\n"
-            f"    \"category\": \"string\", // Must be one of: \"Content Improvement\", \"Stylistic Tip\", \"Skill Gap\", \"Formatting\", \"Overall Strategy\"\n"
-            f"    \"suggestion\": \"string\", // The natural language suggestion, e.g., \"Consider adding quantified achievements to your job history in the form of numbers and percentages.\"\n"
-            f"    \"action_type\": \"string\" | null, // Optional: e.g., \"add_skill\", \"rephrase_summary\", \"quantify_experience\", \"update_section\"\n"
-            f"    \"relevant_field\": \"string\" | null // Optional: e.g., \"skills\", \"summary\", \"job_history.responsibilities\", \"education\"\n"
-            f"  }}\n"
-            f"]\n"
-            f"```\n\n"
+            "```json\n"
+            "[\n"
+            "  {\n"
+            "    \"category\": \"string\", // Must be one of: \"Content Improvement\", \"Stylistic Tip\", \"Skill Gap\", \"Formatting\", \"Overall Strategy\"\n"
+            "    \"suggestion\": \"string\", // The natural language suggestion, e.g., \"Consider adding quantified achievements to your job history in the form of numbers and percentages.\"\n"
+            "    \"action_type\": \"string\" | null, // Optional: e.g., \"add_skill\", \"rephrase_summary\", \"quantify_experience\", \"update_section\"\n"
+            "    \"relevant_field\": \"string\" | null // Optional: e.g., \"skills\", \"summary\", \"job_history.responsibilities\", \"education\"\n"
+            "  }\n"
+            "]\n"
+            "```\n\n"
             "Provide at least 3 to 5 distinct and valuable suggestions. Do not include any conversational text outside the JSON. Ensure the JSON is valid and complete."
-        )
+        ))
 
-        return prompt
+        return assemble_prompt("suggestions", sections, separator="")
 
     def generate_critique_prompt(self,
                                  resume_draft: str,
@@ -312,61 +371,129 @@ class PromptManager:
         """
         Constructs a prompt for the LLM to critique a generated resume draft.
         """
-        preferences_json = json.dumps(learned_preferences, indent=2)
+        sections = [
+            PromptSection(
+                "instructions",
+                "You are an expert resume reviewer and highly critical AI assistant. Your task is to perform a rigorous quality assurance check on the provided resume draft against best practices, the candidate's core data, and the target job description (if provided). **Your critique must be extremely specific, actionable, and focus on the quantitative and relevance aspects.**\n\n"
+            ),
+            PromptSection("resume_draft", resume_draft, prefix="**Resume to Critique:**\n```\n", suffix="\n```\n\n"),
+            PromptSection(
+                "checks",
+                "**Specific Areas to Rigorously Check:**\n"
+                "-   **Quantification:** Is every achievement in the experience section quantified with a number, percentage, or measurable outcome? If not, identify *exactly which bullet points* lack quantification and suggest specific, plausible numbers to add.\n"
+                "-   **Generic Phrases:** Are any of the forbidden generic phrases present (e.g., 'leveraged', 'utilized', 'results-driven')? List them specifically.\n"
+                "-   **ATS/JD Relevance:** How well does the resume integrate keywords and concepts from the Target Job Description? Point out specific instances where better keyword integration or rephrasing for relevance is needed.\n"
+                "-   **Impact vs. Responsibility:** Does each bullet point focus on the *impact* and *achievement* rather than just a *responsibility*? Identify bullet points that read too much like a job description.\n"
+                "-   **Conciseness:** Is any section unnecessarily verbose? Suggest specific areas for shortening.\n"
+                "-   **Action Verbs:** Does every bullet point start with a strong action verb?\n"
+                "-   **Coherence & Flow:** Does the resume tell a clear, compelling story? Are there any logical gaps?\n\n"
+            ),
+        ]
 
-        prompt = (
-            "You are an expert resume reviewer and highly critical AI assistant. Your task is to perform a rigorous quality assurance check on the provided resume draft against best practices, the candidate's core data, and the target job description (if provided). **Your critique must be extremely specific, actionable, and focus on the quantitative and relevance aspects.**\n\n"
-        )
+        if learned_preferences:
+            sections.append(PromptSection(
+                "learned_rules", compact_json(learned_preferences), priority=2,
+                prefix="**Learned Preferences (Rules to enforce):**\n```json\n",
+                suffix="\n```\n"
+                "Strictly identify if any of these active rules have been violated. For rules with `applies_to_target_job_only: true`, only enforce them if a target job description is provided below.\n\n"
+            ))
 
-        prompt += "**Resume to Critique:**\n```\n"
-        prompt += resume_draft  # Use resume_draft here
-        prompt += "\n```\n\n"
+        if target_job_description:
+            sections.append(PromptSection(
+                "job_description", target_job_description, priority=3, truncatable=True,
+                prefix="**Target Job Description (to tailor the resume to):**\n```\n",
+                suffix="\n```\n"
+                "Assess how well the resume is tailored to this job description. Look for keyword relevance, skill alignment, and emphasis on relevant experiences.\n\n"
+            ))
+
+        sections.append(PromptSection(
+            "output_schema",
+            "Identify specific issues or areas for improvement. Be concise and actionable in your critique. "
+                "Output a JSON object with two keys: `issues` (a list of critique items) and `overall_assessment` (a brief summary). "
+                "Also include a `has_issues` boolean indicating if any issues were found.\n"
+                "**Critique Item Schema:**\n"
+                f"```json\n"
+                f"{{\n"
+                f"  \"issues\": [\n"
+                f"    {{\n"
+                f"      \"category\": \"Rule Violation\" | \"Stylistic\" | \"Content Gap\" | \"Target JD Mismatch\" | \"Best Practice\" | \"Other\" | \"Quantification\" | \"Impact vs. Responsibility\" | \"Generic Phrases\" | \"Action Verbs\" | \"Conciseness\" | \"ATS/JD Relevance\",\n"  # Ensure ALL categories are here
+                f"      \"description\": \"Specific description of the issue, e.g., 'Summary is too long; needs to be under 3 sentences.'\",\n"
+                f"      \"severity\": \"low\" | \"medium\" | \"high\",\n"
+                f"      \"relevant_rule_id\": \"Optional: ID of the rule if applicable\",\n"
+                f"      \"suggested_action\": \"Optional: Actionable advice to fix (e.g., 'shorten', 'add numbers', 'remove')\"\n"
+                f"    }}\n"
+                f"  ],\n"
+                f"  \"overall_assessment\": \"A brief, overall summary of the critique.\",\n"
+                f"  \"has_issues\": true | false\n"
+                f"}}\n"
+                f"```\n\n"
+                "If no issues are found, the `issues` list should be empty and `has_issues` should be `false`. **STRICTLY ADHERE TO THE SPECIFIED CATEGORY VALUES ONLY.**"
+        ))
+        return assemble_prompt("critique", sections, separator="")
+
+    def _generate_remaining_fields_extraction_prompt(self, free_text: str, prefilled: Dict[str, Any]) -> str:
+        remaining = [field for field in EXTRACTION_FIELD_SCHEMAS if field not in prefilled]
+        structure = ",\n".join(f'            "{field}": {EXTRACTION_FIELD_SCHEMAS[field]}' for field in remaining)
+        prompt = f"""
+        You are an expert resume parser and data extractor. Your task is to extract structured information from the provided resume sections.
+        Extract the following fields into a JSON object. If a field is not found, use an empty string for text fields, an empty list for list fields, or 0 for numeric fields.
 
-        prompt += (
-            "**Specific Areas to Rigorously Check:**\n"
-            "-   **Quantification:** Is every achievement in the experience section quantified with a number, percentage, or measurable outcome? If not, identify *exactly which bullet points* lack quantification and suggest specific, plausible numbers to add.\n"
-            "-   **Generic Phrases:** Are any of the forbidden generic phrases present (e.g., 'leveraged', 'utilized', 'results-driven')? List them specifically.\n"
-            "-   **ATS/JD Relevance:** How well does the resume integrate keywords and concepts from the Target Job Description? Point out specific instances where better keyword integration or rephrasing for relevance is needed.\n"
-            "-   **Impact vs. Responsibility:** Does each bullet point focus on the *impact* and *achievement* rather than just a *responsibility*? Identify bullet points that read too much like a job description.\n"
-            "-   **Conciseness:** Is any section unnecessarily verbose? Suggest specific areas for shortening.\n"
-            "-   **Action Verbs:** Does every bullet point start with a strong action verb?\n"
-            "-   **Coherence & Flow:** Does the resume tell a clear, compelling story? Are there any logical gaps?\n\n"
-        )
+        **Output JSON structure (strictly follow this):**
+        ```json
+        {{
+{structure}
+        }}
+        ```
 
-        if learned_preferences:
-            prompt += "**Learned Preferences (Rules to enforce):**\n```json\n"
-            prompt += preferences_json
-            prompt += "\n```\n"
-            prompt += "Strictly identify if any of these active rules have been violated. For rules with `applies_to_target_job_only: true`, only enforce them if a target job description is provided below.\n\n"
+        **Important Notes:**
+        - For `job_history`, extract 'title', 'company', 'start_date', 'end_date', and a concise list of 2-4 key 'responsibilities' for each role.
+        - For `education`, extract 'degree', 'major', 'university', and 'graduation_date'.
+        - Dates should be in "YYYY-MM" or "YYYY" format. For current roles, `end_date` should be "Present".
+        - Do not include any text or explanation outside the JSON object.
 
-        if target_job_description:
-            prompt += "**Target Job Description (to tailor the resume to):**\n```\n"
-            prompt += target_job_description
-            prompt += "\n```\n"
-            prompt += "Assess how well the resume is tailored to this job description. Look for keyword relevance, skill alignment, and emphasis on relevant experiences.\n\n"
+        **Resume Sections to Parse:**
+        ---
+        {free_text}
+        ---
 
-        prompt += (
-            "Identify specific issues or areas for improvement. Be concise and actionable in your critique. "
-            "Output a JSON object with two keys: `issues` (a list of critique items) and `overall_assessment` (a brief summary). "
-            "Also include a `has_issues` boolean indicating if any issues were found.\n"
-            "**Critique Item Schema:**\n"
-            f"```json\n"
-            f"{{\n"
-            f"  \"issues\": [\n"
-            f"    {{\n"
-            f"      \"category\": \"Rule Violation\" | \"Stylistic\" | \"Content Gap\" | \"Target JD Mismatch\" | \"Best Practice\" | \"Other\" | \"Quantification\" | \"Impact vs. Responsibility\" | \"Generic Phrases\" | \"Action Verbs\" | \"Conciseness\" | \"ATS/JD Relevance\",\n"  # Ensure ALL categories are here
-            f"      \"description\": \"Specific description of the issue, e.g., 'Summary is too long; needs to be under 3 sentences.'\",\n"
-            f"      \"severity\": \"low\" | \"medium\" | \"high\",\n"
-            f"      \"relevant_rule_id\": \"Optional: ID of the rule if applicable\",\n"
-            f"      \"suggested_action\": \"Optional: Actionable advice to fix (e.g., 'shorten', 'add numbers', 'remove')\"\n"
-            f"    }}\n"
-            f"  ],\n"
-            f"  \"overall_assessment\": \"A brief, overall summary of the critique.\",\n"
-            f"  \"has_issues\": true | false\n"
-            f"}}\n"
-            f"```\n\n"
-            "If no issues are found, the `issues` list should be empty and `has_issues` should be `false`. **STRICTLY ADHERE TO THE SPECIFIED CATEGORY VALUES ONLY.**"
-        )
+        Extracted JSON:
+        """
+        return prompt
+
+    def generate_jd_digest_prompt(self, job_description: str) -> str:
+        """
+        Generates a prompt to distill a job description into the requirements and keywords that matter
+        for tailoring a resume (see services/jd_digest.py).
+        """
+        prompt = f"""
+        You are an expert technical recruiter. Distill the job description below into what a resume must address to match it.
+        Ignore company marketing, benefits, perks, salary, legal and equal-opportunity text.
+
+        **Output JSON structure (strictly follow this):**
+        ```json
+        {{
+            "title": "string",
+            "seniority": "string",
+            "must_have": ["string"],
+            "nice_to_have": ["string"],
+            "responsibilities": ["string"],
+            "keywords": ["string"]
+        }}
+        ```
+
+        **Important Notes:**
+        - Keep every item short (a few words); at most 10 items per list.
+        - `keywords` are the exact tools, technologies, methodologies and domain terms an ATS would scan for, as written in the posting.
+        - Use an empty string or an empty list when the posting doesn't say.
+        - Do not include any text or explanation outside the JSON object.
+
+        **Job Description:**
+        ---
+        {job_description}
+        ---
+
+        Digest JSON:
+        """
         return prompt
 
     def generate_refinement_prompt(self, previous_resume_content: str, critiques: List[Dict[str, Any]],
@@ -375,9 +502,9 @@ class PromptManager:
         """
         Constructs a prompt for the LLM to refine a resume based on specific critiques.
         """
-        critiques_json = json.dumps(critiques, indent=2)
-        preferences_json = json.dumps(learned_preferences, indent=2)
-        core_data_json = json.dumps(user_core_data, indent=2)
+        critiques_json = compact_json(critiques)
+        preferences_json = compact_json(learned_preferences)
+        core_data_json = compact_json(user_core_data)
 
         prompt = (
             "You are an expert resume writer and AI assistant tasked with refining a resume. "
@@ -432,10 +559,15 @@ class PromptManager:
         )
         return prompt
 
-    def generate_core_data_extraction_prompt(self, resume_text: str) -> str:
+    def generate_core_data_extraction_prompt(self, resume_text: str, prefilled: Optional[Dict[str, Any]] = None) -> str:
         """
         Generates a prompt to extract structured core data from a resume text.
+        If `prefilled` holds fields already extracted locally (see utils/resume_parser.pre_extract_resume_fields),
+        `resume_text` is only the free-text sections and the LLM is asked for the remaining fields only.
         """
+        if prefilled:
+            return self._generate_remaining_fields_extraction_prompt(resume_text, prefilled)
+
         prompt = f"""
         You are an expert resume parser and data extractor. Your task is to extract key personal, experience, education, and skill information from the provided resume text.
         Extract the following fields into a JSON object. If a field is not found, use an empty string for text fields, an empty list for list fields, or 0 for numeric fields.
@@ -493,45 +625,49 @@ class PromptManager:
         """
         Constructs a prompt for Gemini to refine a resume based on previous critiques.
         """
-        prompt_parts = [
-            "You are an expert resume writer. Your task is to refine the provided resume draft based on the critical feedback and specific issues identified. Your goal is to produce a significantly improved version that directly addresses each critique point while also adhering to all original resume generation guidelines.",
-            "\n**Original Candidate Core Data:**",
-            json.dumps(user_core_data, indent=2),  # Pass core data again for context
-            "\n**Previously Generated Resume Draft (to be refined):**",
-            "```markdown",
-            previous_resume_content,
-            "```",
-            "\n**Critiques to Address (MANDATORY TO FIX EACH):**"
-        ]
-
+        critique_lines = []
         # Convert critiques from Pydantic model_dump to a readable list for LLM
-        for i, critique_item in enumerate(critiques):  # This line is correct
-            prompt_parts.append(
+        for i, critique_item in enumerate(critiques):
+            critique_lines.append(
                 f"- Issue {i + 1} (Category: {critique_item.get('category')}, Severity: {critique_item.get('severity')}):")
-            prompt_parts.append(f"  Description: {critique_item.get('description')}")
+            critique_lines.append(f"  Description: {critique_item.get('description')}")
             if critique_item.get('suggested_action'):
-                # CORRECTED LINE:
-                prompt_parts.append(
-                    f"  Suggested Action: {critique_item.get('suggested_action')}")  # Changed critrite_item to critique_item
+                critique_lines.append(f"  Suggested Action: {critique_item.get('suggested_action')}")
             if critique_item.get('relevant_rule_id'):
-                prompt_parts.append(f"  Relevant Rule ID: {critique_item.get('relevant_rule_id')}")
-            prompt_parts.append("")  # Empty line for readability
-
-        if learned_preferences:
-            prompt_parts.append("\n**Learned Preferences (Strictly adhere to these during refinement):**")
-            for rule_obj in learned_preferences:
-                if isinstance(rule_obj, dict) and rule_obj.get("active", True) and rule_obj.get("rule"):
-                    prompt_parts.append(f"- {rule_obj['rule']}")
+                critique_lines.append(f"  Relevant Rule ID: {critique_item.get('relevant_rule_id')}")
+            critique_lines.append("")  # Empty line for readability
+
+        rule_lines = [f"- {rule_obj['rule']}" for rule_obj in learned_preferences or []
+                      if isinstance(rule_obj, dict) and rule_obj.get("active", True) and rule_obj.get("rule")]
+
+        sections = [
+            PromptSection(
+                "instructions",
+                "You are an expert resume writer. Your task is to refine the provided resume draft based on the critical feedback and specific issues identified. Your goal is to produce a significantly improved version that directly addresses each critique point while also adhering to all original resume generation guidelines."
+            ),
+            # Core data is passed again for context; the draft already carries it, so it can go when over budget
+            PromptSection("core_data", compact_json(user_core_data), priority=1,
+                          prefix="\n**Original Candidate Core Data:**\n"),
+            PromptSection("resume_draft", previous_resume_content,
+                          prefix="\n**Previously Generated Resume Draft (to be refined):**\n```markdown\n", suffix="\n```"),
+            PromptSection("critiques", "\n".join(critique_lines),
+                          prefix="\n**Critiques to Address (MANDATORY TO FIX EACH):**\n"),
+            PromptSection("learned_rules", "\n".join(rule_lines), priority=2,
+                          prefix="\n**Learned Preferences (Strictly adhere to these during refinement):**\n"),
+        ]
 
         if target_job_description:
-            prompt_parts.append(
-                f"\n**Target Job Description (Maintain strong relevance):**\n```\n{target_job_description}\n```")
-            prompt_parts.append("Ensure refinement enhances alignment with this job description.")
-
-        prompt_parts.append(
+            sections.append(PromptSection(
+                "job_description", target_job_description, priority=3, truncatable=True,
+                prefix="\n**Target Job Description (Maintain strong relevance):**\n```\n",
+                suffix="\n```\nEnsure refinement enhances alignment with this job description."
+            ))
+
+        sections.append(PromptSection(
+            "closing_instructions",
             "\n\n**Based on the original draft, the identified critiques, and all guidelines/preferences, generate the REFINED resume. Your output must be ONLY the complete, improved resume in Markdown format.** Ensure all critique points have been addressed and the resume is polished, quantified, and tailored."
-        )
-        return "\n".join(prompt_parts)
+        ))
+        return assemble_prompt("refinement", sections)
 
 
 # Example usage (for testing this module directly)
@@ -0,0 +1,65 @@
+# backend/app/db/compact_learned_preferences.py
+#
+# Compacts every user's learned rules: rules a newer one repeats or negates word for word are deleted,
+# rules a newer one only resembles are deactivated, and the prompt-ready profiles are re-rendered (inactive rules dropped, rules block capped at
+# RULES_TOKEN_BUDGET). Prints compaction stats per user.
+# Feedback learning compacts a user's rules after every pass; this job catches up existing data.
+#
+# Run from the backend/ directory:
+#   python -m app.db.compact_learned_preferences            # compact all users
+#   python -m app.db.compact_learned_preferences --dry-run  # only report what would change
+#   python -m app.db.compact_learned_preferences --user 42  # a single user
+
+import argparse
+import asyncio
+import json
+from typing import Optional
+
+from sqlalchemy import select
+
+from .database import engine, SessionLocal
+from .migrations import add_missing_columns
+from . import models
+from ..services.feedback_learning import compact_learned_rules
+from ..services.profile_cache import refresh_prompt_ready_profile
+
+
+async def compact_learned_preferences(dry_run: bool = False, owner_id: Optional[int] = None) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+    async with SessionLocal() as db:
+        query = select(models.LearnedPreference.owner_id).distinct().order_by(models.LearnedPreference.owner_id)
+        if owner_id is not None:
+            query = query.where(models.LearnedPreference.owner_id == owner_id)
+        owner_ids = (await db.execute(query)).scalars().all()
+
+    users = []
+    for user_id in owner_ids:
+        # One transaction per user, so a large run doesn't hold the database
+        async with SessionLocal() as db:
+            stats = await compact_learned_rules(db, user_id)
+            if dry_run:
+                await db.rollback()
+            else:
+                await refresh_prompt_ready_profile(db, user_id)
+                await db.commit()
+        users.append({"owner_id": user_id, **stats})
+    await engine.dispose()
+
+    totals = {key: sum(user[key] for user in users) for key in (
+        "rules_before", "duplicates_removed", "contradictions_resolved", "similar_rules_deactivated", "rules_after",
+        "rules_block_tokens_before", "rules_block_tokens_after",
+    )}
+    return {"dry_run": dry_run, "users": users, "totals": totals}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate learned rules and re-render prompt-ready profiles.")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the report without committing changes.")
+    parser.add_argument("--user", type=int, default=None, help="Only compact this user's rules.")
+    args = parser.parse_args()
+
+    report = asyncio.run(compact_learned_preferences(dry_run=args.dry_run, owner_id=args.user))
+    print(json.dumps(report, indent=2))
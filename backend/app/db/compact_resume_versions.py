@@ -0,0 +1,124 @@
+# backend/app/db/compact_resume_versions.py
+#
+# One-off migration that rewrites legacy ResumeVersion rows (full JSON copies of core data and
+# preferences, uncompressed text) into the compact format used by services/resume_storage.py,
+# then prints how much space was saved.
+#
+# Run from the backend/ directory:
+#   python -m app.db.compact_resume_versions            # rewrite all legacy rows
+#   python -m app.db.compact_resume_versions --dry-run  # only report what would be saved
+#   python -m app.db.compact_resume_versions --vacuum   # also VACUUM the SQLite file afterwards
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Optional
+
+from sqlalchemy import select, func, text
+
+from .database import engine, SessionLocal, SQLALCHEMY_DATABASE_URL
+from .migrations import add_missing_columns
+from . import models
+from ..services.resume_storage import store_compact, read_resume_versions
+
+BATCH_SIZE = 200
+
+
+def _size(value) -> int:
+    if value is None:
+        return 0
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+def _row_bytes(rv: models.ResumeVersion) -> int:
+    """Bytes stored in the row's data columns (ignores ids, names and timestamps)."""
+    return sum(_size(v) for v in (
+        rv.content, rv.content_blob, rv.core_data_used_json, rv.learned_preferences_used_json,
+        rv.target_job_description_used, rv.target_job_description_blob,
+        rv.critique_data_json, rv.critique_data_blob,
+    ))
+
+
+async def _snapshot_bytes(db) -> int:
+    total = 0
+    for model in (models.CoreDataSnapshot, models.PreferenceSetSnapshot):
+        result = await db.execute(select(func.coalesce(func.sum(func.length(model.data_blob)), 0)))
+        total += result.scalar()
+    return total
+
+
+def _sqlite_file_size() -> Optional[int]:
+    if not SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        return None
+    path = SQLALCHEMY_DATABASE_URL.split(":///", 1)[1]
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+async def compact_resume_versions(dry_run: bool = False, vacuum: bool = False) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+    file_size_before = _sqlite_file_size()
+    rows = bytes_before = bytes_after = 0
+    last_id = 0
+
+    async with SessionLocal() as db:
+        snapshot_bytes_before = await _snapshot_bytes(db)
+        while True:
+            result = await db.execute(
+                select(models.ResumeVersion)
+                .where(models.ResumeVersion.core_data_hash.is_(None), models.ResumeVersion.id > last_id)
+                .order_by(models.ResumeVersion.id)
+                .limit(BATCH_SIZE)
+            )
+            batch = result.scalars().all()
+            if not batch:
+                break
+
+            decoded_batch = await read_resume_versions(db, batch)
+            for rv, decoded in zip(batch, decoded_batch):
+                bytes_before += _row_bytes(rv)
+                await store_compact(db, rv, decoded["content"], decoded["core_data_used"],
+                                    decoded["learned_preferences_used"], decoded["target_job_description_used"],
+                                    decoded["critique_json"])
+                bytes_after += _row_bytes(rv)
+                rows += 1
+            last_id = batch[-1].id
+
+            if dry_run:
+                await db.flush()
+            else:
+                await db.commit()
+
+        bytes_after += await _snapshot_bytes(db) - snapshot_bytes_before
+        if dry_run:
+            await db.rollback()
+
+    if vacuum and not dry_run and SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM"))
+    await engine.dispose()
+
+    return {
+        "dry_run": dry_run,
+        "rows_rewritten": rows,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after, # Includes the snapshot rows added for these versions
+        "bytes_saved": bytes_before - bytes_after,
+        "saved_percent": round(100.0 * (bytes_before - bytes_after) / bytes_before, 1) if bytes_before else 0.0,
+        "sqlite_file_bytes_before": file_size_before,
+        "sqlite_file_bytes_after": _sqlite_file_size(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite ResumeVersion rows into compact, deduplicated storage.")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the report without committing changes.")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite database afterwards.")
+    args = parser.parse_args()
+
+    report = asyncio.run(compact_resume_versions(dry_run=args.dry_run, vacuum=args.vacuum))
+    print(json.dumps(report, indent=2))
@@ -1,33 +1,62 @@
 # backend/app/db/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-# SQLite database URL
-# The `///` after sqlite: means it's a relative path to the current working directory.
-# We'll put it in the `data` directory.
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/sql_app.db"
-
-# Create the SQLAlchemy engine
-# connect_args={"check_same_thread": False} is needed for SQLite when using multiple threads,
-# which FastAPI does. For other databases like PostgreSQL, you won't need this.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+
+from ..config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_ECHO, SQLITE_BUSY_TIMEOUT_MS
 )
 
-# Each instance of SessionLocal class will be a database session.
-# The class itself is not a SQLAlchemy Session.
-# We'll use instances of SessionLocal in our code.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _to_async_url(url: str) -> str:
+    """Maps plain database URLs onto their async drivers (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+SQLALCHEMY_DATABASE_URL = _to_async_url(DATABASE_URL)
+
+# SQLite is a single local file, so it doesn't get a sized pool.
+# For PostgreSQL every uvicorn worker keeps its own pool of DB_POOL_SIZE (+ overflow) connections.
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    engine_kwargs = {}
+else:
+    engine_kwargs = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+# Create the async SQLAlchemy engine
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=DB_ECHO, **engine_kwargs)
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        # Request sessions and the background writers (usage ledger, feedback learning, JD digests) write
+        # concurrently. WAL lets readers run alongside a writer, and busy_timeout makes a second writer wait
+        # for the lock instead of failing with "database is locked".
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+# Each instance of SessionLocal class will be an AsyncSession.
+# expire_on_commit=False keeps loaded attributes usable after commit without another (awaited) refresh.
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for our database models.
 Base = declarative_base()
 
 # Dependency to get a database session for each request
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
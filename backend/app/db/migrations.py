@@ -0,0 +1,37 @@
+# backend/app/db/migrations.py
+
+import logging
+
+from sqlalchemy import inspect, text
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(connection) -> None:
+    """
+    Adds columns that are declared on the models but missing from existing tables.
+    `create_all` only creates new tables, so databases created by an older version of the app
+    would otherwise miss newly added (nullable or server-defaulted) columns.
+    Meant to be run through `AsyncConnection.run_sync` right after `create_all`.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = (
+                f"ALTER TABLE {preparer.quote(table.name)} "
+                f"ADD COLUMN {preparer.quote(column.name)} {column.type.compile(dialect=connection.dialect)}"
+            )
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            connection.execute(text(ddl))
+            logger.info("Added missing column %s.%s", table.name, column.name)
+            for index in table.indexes:
+                if column.name in index.columns:
+                    index.create(connection, checkfirst=True)
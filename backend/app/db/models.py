@@ -1,8 +1,8 @@
 # backend/app/db/models.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, LargeBinary, Float, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, false
 from .database import Base
 
 # User Model
@@ -15,6 +15,8 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False) # Example for future roles
+    is_recruiter = Column(Boolean, default=False, server_default=false()) # Agency accounts allowed to batch-ingest resumes
+    daily_token_quota = Column(Integer, nullable=True) # LLM tokens per UTC day; None uses LLM_DAILY_TOKEN_QUOTA, 0 is unlimited
 
     # Define relationships to other user-specific data
     # `uselist=False` for one-to-one or one-to-zero relationship
@@ -32,6 +34,13 @@ class UserProfile(Base):
     # We'll store the core_data as a JSON string for flexibility initially
     # In a more complex app, you might break this into separate tables (e.g., Education, Experience)
     core_data_json = Column(Text, nullable=True)
+    # Bumped on every write to the profile or its learned preferences.
+    # Used to validate the per-user profile cache and as the /user-profile/ ETag.
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+    # Prompt-ready view of the profile, recomputed whenever the profile or its preferences change:
+    # the placeholder-cleaned core data and the rendered candidate/rules prompt fragments.
+    cleaned_core_data_json = Column(Text, nullable=True)
+    prompt_fragments_json = Column(Text, nullable=True)
 
     owner = relationship("User", back_populates="user_profile")
 
@@ -66,4 +75,111 @@ class ResumeVersion(Base):
     target_job_description_used = Column(Text, nullable=True)
     critique_data_json = Column(Text, nullable=True) # The critique data
 
-    owner = relationship("User", back_populates="resume_versions")
\ No newline at end of file
+    # Compact storage (see services/resume_storage.py). New rows reference content-addressed
+    # snapshots instead of copying core data / preferences, and keep large text compressed.
+    # When a *_blob column is set, the matching text column is empty/NULL.
+    core_data_hash = Column(String(64), ForeignKey("core_data_snapshots.hash"), nullable=True, index=True)
+    learned_preferences_hash = Column(String(64), ForeignKey("preference_set_snapshots.hash"), nullable=True, index=True)
+    content_blob = Column(LargeBinary, nullable=True)
+    target_job_description_blob = Column(LargeBinary, nullable=True)
+    critique_data_blob = Column(LargeBinary, nullable=True)
+    # Delta encoding: a version may store only a compressed line delta against its parent version.
+    # delta_depth counts the deltas back to the nearest full keyframe (0 = keyframe).
+    parent_version_id = Column(Integer, ForeignKey("resume_versions.id"), nullable=True, index=True)
+    content_delta_blob = Column(LargeBinary, nullable=True)
+    delta_depth = Column(Integer, nullable=False, default=0, server_default="0")
+
+    owner = relationship("User", back_populates="resume_versions")
+
+
+# Content-addressed snapshots shared by all ResumeVersions that used the same data.
+# `hash` is the SHA-256 of the canonical JSON, `data_blob` the compressed canonical JSON.
+class CoreDataSnapshot(Base):
+    __tablename__ = "core_data_snapshots"
+
+    hash = Column(String(64), primary_key=True)
+    data_blob = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PreferenceSetSnapshot(Base):
+    __tablename__ = "preference_set_snapshots"
+
+    hash = Column(String(64), primary_key=True)
+    data_blob = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Upload fingerprint cache: a repeat upload of the same file (or of a file with the same text)
+# reuses the earlier extraction instead of re-parsing and calling the LLM again.
+class UploadFingerprint(Base):
+    __tablename__ = "upload_fingerprints"
+
+    file_hash = Column(String(64), primary_key=True) # SHA-256 of the uploaded bytes
+    text_hash = Column(String(64), ForeignKey("resume_extractions.text_hash"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ResumeExtraction(Base):
+    __tablename__ = "resume_extractions"
+
+    text_hash = Column(String(64), primary_key=True) # SHA-256 of the normalised extracted text
+    extracted_text_blob = Column(LargeBinary, nullable=False) # Compressed, see services/resume_storage.py
+    extraction_json = Column(Text, nullable=True) # Structured core data returned by the LLM
+    prompt_version = Column(Integer, nullable=False, server_default="0") # EXTRACTION_PROMPT_VERSION used
+    hit_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Job description digests, shared across users: each distinct posting is distilled by the LLM once
+# and the compact digest goes into the generation, critique and refinement prompts instead of the raw text.
+class JobDescriptionDigest(Base):
+    __tablename__ = "job_description_digests"
+
+    jd_hash = Column(String(64), primary_key=True) # SHA-256 of the normalised job description
+    digest_text = Column(Text, nullable=False) # Rendered digest put into prompts
+    digest_json = Column(Text, nullable=True) # Structured digest returned by the LLM (None if the JD was used as is)
+    prompt_version = Column(Integer, nullable=False, server_default="0") # JD_DIGEST_PROMPT_VERSION used
+    source_tokens = Column(Integer, nullable=False, server_default="0") # Estimated tokens of the raw JD
+    digest_tokens = Column(Integer, nullable=False, server_default="0")
+    hit_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# LLM usage ledger: one row per Gemini call, written in batches by services/usage_ledger.py.
+# owner_id is None for calls made outside a user's request; resume_version_id is set once the
+# request that made the call has saved its resume version.
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    __table_args__ = (Index("ix_llm_usage_owner_created", "owner_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    resume_version_id = Column(Integer, ForeignKey("resume_versions.id"), nullable=True, index=True)
+    request_id = Column(String(64), nullable=True, index=True) # X-Request-ID of the API request
+    call_type = Column(String(32), nullable=False) # generate, critique, refine, extract, suggest, learn, jd_digest
+    model = Column(String(64), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, server_default="0")
+    response_tokens = Column(Integer, nullable=False, server_default="0")
+    tokens_estimated = Column(Boolean, nullable=False, server_default=false()) # Gemini reported no usage metadata
+    latency_ms = Column(Float, nullable=False, server_default="0")
+    outcome = Column(String(16), nullable=False) # ok, blocked, error
+    cost_usd = Column(Float, nullable=False, server_default="0") # At the LLM_*_COST_PER_MILLION prices of the time
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Refresh tokens: long-lived, single-use tokens exchanged at /token/refresh for a new access token
+# (and a new refresh token), so sessions are renewed without the password and its bcrypt verify.
+# Only the SHA-256 of a token is stored. Every token descends from one login; they share its family_id,
+# and presenting a token that was already used revokes the whole family (see core/refresh_tokens.py).
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False) # SHA-256 of the token
+    family_id = Column(String(32), nullable=False, index=True) # Shared by the tokens rotated from one login
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True) # Set once used (rotated) or revoked
@@ -1,6 +1,11 @@
+import asyncio
+import logging
 import os
+import time
 import uuid
 import json
+import zipfile
+from contextlib import asynccontextmanager
 from pathlib import Path
 import re
 
@@ -8,31 +13,54 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
 from fastapi.security import OAuth2PasswordRequestForm # For login form data
 
 from pydantic import BaseModel, ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .utils.file_manager import load_json_data
-from .utils.resume_parser import parse_resume_content # NEW Import for parsing
+from .utils.resume_parser import DocumentLimitExceeded, pre_extract_resume_fields, merge_prefilled_fields
 from .utils.text_processing import clean_llm_output
-from .core_ai.llm_client import LLMClient
-from .core_ai.prompt_manager import PromptManager
+from .core_ai.client_registry import clients
+from .core_ai.prompt_manager import PromptManager, EXTRACTION_FIELD_SCHEMAS
+from .core_ai.prompt_budget import token_counter, compact_json
+from .core_ai.llm_scheduler import llm_scheduler, ScheduledLLMClient
+from .core_ai.agentic_learner import AgenticLearner
+from .core_ai.preference_compaction import select_prompt_rules
 
 from .schemas.feedback import ResumeFeedback, ResumeContentResponse, SubmitFeedbackRequest
 from .schemas.requests import SetupUserProfileRequest
 from .schemas.suggestion import GetSuggestionsRequest, SuggestionsResponse, SuggestionItem
 from .schemas.critique import ResumeCritique, CritiqueIssue
-from .schemas.auth import UserCreate, UserLogin, Token, UserInDB
+from .schemas.auth import UserCreate, UserLogin, Token, UserInDB, RefreshTokenRequest
 
-from .db.database import get_db, engine, Base # Import Base for table creation
+from .db.database import get_db, engine, SessionLocal, Base # Import Base for table creation
 from .db import models # Your database models
+from .db.migrations import add_missing_columns
+from .services.profile_cache import load_user_profile, refresh_prompt_ready_profile, bump_profile_revision
+from .services.resume_storage import build_resume_version, read_resume_versions, resume_version_responses, latest_resume_version, cache_content
+from .services.upload_cache import find_extraction_by_file, find_extraction_by_text, remember_extraction, text_fingerprint
+from .services.document_parsing import (
+    parser_pool, spool_upload, UploadTooLarge, DocumentRejected, ParserBusy,
+    upload_limit_message
+)
+from .services.batch_ingestion import prepare_batch, stream_batch_results, BatchTooLarge
+from .services.feedback_learning import feedback_learning_worker
+from .services.jd_digest import digest_job_description
+from .services.usage_ledger import usage_ledger, attribute_usage, enforce_token_quota, enforce_usage_owner_quota, TokenQuotaExceeded, usage_summary, usage_by_user
+from .utils.metrics import registry as metrics_registry, http_requests_total, http_request_duration_seconds, http_requests_in_progress, critique_parse_failures_total
+from .utils.tracing import tracer, span, annotate, configure_tracing, current_request_id, new_request_id, set_request_id, reset_request_id, InMemorySpanSink
+from .utils.profiling import request_profiler, PROFILE_MODES
+from .utils.structured_logging import configure_logging, parse_levels
 
-from .core.security import get_password_hash, verify_password
-from .core.auth import authenticate_user, create_access_token, get_current_user, oauth2_scheme
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USER_PROFILE_JSON_FILE_NAME, RESUME_VERSIONS_JSON_FILE_NAME, DATA_DIR_NAME # Import config variables
+from .core.security import password_hasher, PasswordHasherBusy
+from .core.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token, delete_expired_refresh_tokens, InvalidRefreshToken
+from .core.auth import authenticate_user, create_access_token, get_current_user, get_current_identity, get_identity_by_token, AuthenticatedUser, oauth2_scheme
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USER_PROFILE_JSON_FILE_NAME, RESUME_VERSIONS_JSON_FILE_NAME, DATA_DIR_NAME, MAX_UPLOAD_BYTES, BATCH_MAX_UPLOAD_BYTES, PROMPT_TOKEN_CALIBRATION, TRACE_EXPORTERS, TRACE_MEMORY_MAX_SPANS, TRACE_OTLP_FILE, LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE # Import config variables
 
 
 
@@ -40,14 +68,12 @@ from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USER_PRO
 
 load_dotenv()
 
-# --- Configuration ---
-# The API key is now handled by LLMClient internally, but we can keep this check for startup
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables.")
+logger = logging.getLogger(__name__)
 
-# Initialize LLMClient and PromptManager globally for the app
-llm_client = LLMClient(model_name="gemini-1.5-flash")  # Use the preferred model
+# --- Configuration ---
+# The app's shared LLM client; the Gemini SDK is only imported and configured on its first call.
+# GEMINI_API_KEY is checked when the app starts (see lifespan), not at import.
+llm_client = clients.llm()
 prompt_manager = PromptManager()
 
 USER_PROFILE_FILE = "user_profile.json"
@@ -60,11 +86,8 @@ MAX_REFINEMENT_ITERATIONS = 2 # Set to 0 for no refinement, 1 for one pass, etc.
 
 
 # --- FastAPI App Setup ---
-app = FastAPI(
-    title="Agentic Resume Builder (Full Brain)",
-    description="Full API with enhanced agentic learning and structured prompting.",
-    version="0.4.0",
-)
+# Routes are collected on this router; create_app() (at the end of this module) builds the app around it
+router = APIRouter()
 
 # --- CORS Configuration ---
 # Define allowed origins (where your frontend is running)
@@ -76,52 +99,178 @@ origins = [
     # "https://your-deployed-frontend.com",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True, # Allow cookies and authorization headers
-    allow_methods=["*"],    # Allow all HTTP methods (GET, POST, PUT, DELETE, etc.)
-    allow_headers=["*"],    # Allow all headers
-)
+# Multipart framing overhead allowed on top of MAX_UPLOAD_BYTES before rejecting on Content-Length alone
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
 
-# --- NEW: Function to create database tables ---
-def create_db_tables():
-    models.Base.metadata.create_all(bind=engine)
 
-# In your FastAPI app startup event (before the routes)
-@app.on_event("startup")
-async def startup_event():
+async def reject_oversized_uploads(request: Request, call_next):
+    # Fail fast with 413 before the multipart body is read and spooled
+    if request.url.path.startswith("/upload-resumes/batch"):
+        max_bytes = BATCH_MAX_UPLOAD_BYTES
+    elif request.url.path.startswith("/upload-resume"):
+        max_bytes = MAX_UPLOAD_BYTES
+    else:
+        max_bytes = None
+    if max_bytes is not None:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes + UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": upload_limit_message(max_bytes)}
+            )
+    return await call_next(request)
+
+
+async def is_admin_request(request: Request) -> bool:
+    """Whether the request carries the bearer token of an admin account."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    async with SessionLocal() as db:
+        user = await get_identity_by_token(db, token)
+    return user is not None and user.is_admin
+
+
+async def profile_requests(request: Request, call_next):
+    # Admins profile one request with `X-Profile: sampling|deterministic` (or ?profile=...); a random
+    # PROFILE_SAMPLE_RATE share of all requests is profiled with the sampling profiler
+    mode = request.headers.get("x-profile") or request.query_params.get("profile")
+    trigger = "admin"
+    if mode:
+        if mode not in PROFILE_MODES:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST,
+                                content={"detail": f"Profile mode must be one of: {', '.join(PROFILE_MODES)}."})
+        if not await is_admin_request(request):
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN,
+                                content={"detail": "Profiling is only available to admin accounts."})
+    elif request_profiler.should_sample():
+        mode, trigger = "sampling", "sampled"
+    else:
+        return await call_next(request)
+
+    capture = request_profiler.begin(mode, trigger)
+    if capture is None:
+        # Another profile is being captured by this worker; serve the request unprofiled
+        response = await call_next(request)
+        if trigger == "admin":
+            response.headers["X-Profile-Status"] = "busy"
+        return response
+    try:
+        response = await call_next(request)
+    finally:
+        request_profiler.end(capture)
+    profile_id = await asyncio.to_thread(request_profiler.save, capture, current_request_id(),
+                                         f"{request.method} {request.url.path}")
+    annotate(profile_id=profile_id)
+    if trigger == "admin":
+        response.headers["X-Profile-ID"] = profile_id
+    return response
+
+
+async def trace_requests(request: Request, call_next):
+    # Root span of the request; the request ID (taken from X-Request-ID when the client sends one) ties its spans together
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = set_request_id(request_id)
+    try:
+        with span("http.request", method=request.method, path=request.url.path) as trace:
+            response = await call_next(request)
+            if trace is not None:
+                route = request.scope.get("route")
+                trace.set("route", getattr(route, "path", request.url.path))
+                trace.set("status_code", response.status_code)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+
+async def record_request_metrics(request: Request, call_next):
+    # Routes are labelled by their template (/admin/traces/{request_id}), keeping the series count bounded
+    http_requests_in_progress.inc(method=request.method)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        http_request_duration_seconds.observe(time.perf_counter() - started, method=request.method, route=route)
+        http_requests_total.inc(method=request.method, route=route, status=str(status_code))
+        http_requests_in_progress.dec(method=request.method)
+
+# --- NEW: Function to create database tables ---
+async def create_db_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts the background workers before the app serves requests, and stops them on shutdown."""
+    # Structured logs go through a queue to a writer thread, so logging never blocks a request on stdout.
+    # Set up here rather than at import, so importing the module leaves the host's logging alone.
+    configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE, parse_levels(LOG_LEVELS))
+    if not os.getenv("GEMINI_API_KEY"):
+        raise ValueError("GEMINI_API_KEY not found in environment variables.")
     # Create the 'data' directory if it doesn't exist for SQLite DB file
     if not Path("./data").exists():
         Path("./data").mkdir(parents=True, exist_ok=True)
-    create_db_tables()
-    print("Database tables created/checked.")
-    # Initialize your LLM client here if not already done
-
-
-@app.post("/register", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
-async def register_user(user_create: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user_create.username).first()
+    await create_db_tables()
+    logger.info("Database tables created/checked.")
+    configure_tracing(TRACE_EXPORTERS, TRACE_MEMORY_MAX_SPANS, TRACE_OTLP_FILE)
+    usage_ledger.start()
+    llm_scheduler.before_dispatch = enforce_usage_owner_quota # Every LLM call is checked against its user's quota
+    feedback_learning_worker.start(AgenticLearner(ScheduledLLMClient(llm_client, llm_scheduler)))
+    if PROMPT_TOKEN_CALIBRATION:
+        try:
+            ratio = await asyncio.to_thread(token_counter.calibrate, llm_client.count_tokens,
+                                            [prompt_manager.base_instructions, compact_json(EXTRACTION_FIELD_SCHEMAS)])
+            logger.info("Prompt token estimate calibrated: %.2f characters per token.", ratio)
+        except Exception as e:
+            logger.warning("Prompt token calibration failed, keeping the default estimate: %s", e)
+
+    yield
+
+    # Release pooled DB connections and parser processes so workers exit cleanly
+    await feedback_learning_worker.stop()
+    await usage_ledger.stop() # Writes the LLM usage still pending
+    await engine.dispose()
+    parser_pool.shutdown()
+    password_hasher.shutdown()
+    tracer.flush()
+
+
+@router.post("/register", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
+async def register_user(user_create: UserCreate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.User).where(models.User.username == user_create.username))
+    db_user = result.scalars().first()
     if db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
 
-    hashed_password = get_password_hash(user_create.password)
+    try:
+        hashed_password = await password_hasher.hash(user_create.password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     db_user = models.User(username=user_create.username, email=user_create.email, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # Automatically create an empty user profile for the new user
     user_profile = models.UserProfile(owner_id=db_user.id, core_data_json=json.dumps({}))
     db.add(user_profile)
-    db.commit()
-    db.refresh(user_profile)
+    await db.commit()
 
     return db_user
 
-@app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+@router.post("/token", response_model=Token)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,13 +281,62 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    await delete_expired_refresh_tokens(db, user.id)
+    refresh_token = issue_refresh_token(db, user.id)
+    await db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Renews a session without the password (and its bcrypt verify): trades a refresh token for a new access
+    token and a new refresh token. Each refresh token works once; reusing one logs that session out.
+    """
+    try:
+        user, refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    except InvalidRefreshToken as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e),
+                            headers={"WWW-Authenticate": "Bearer"})
+    access_token = create_access_token(
+        data={"sub": user.username}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_session(body: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """Logout: the session's refresh tokens stop working. Its access token stays valid until it expires."""
+    await revoke_refresh_token(db, body.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-@app.get("/users/me/", response_model=UserInDB)
+@router.get("/users/me/", response_model=UserInDB)
 async def read_users_me(current_user: models.User = Depends(get_current_user)):
     # This is a protected route, accessible only with a valid token
     return current_user
 
+
+@router.get("/users/me/usage")
+async def read_my_usage(days: int = 30, current_user: AuthenticatedUser = Depends(get_current_identity),
+                        db: AsyncSession = Depends(get_db)):
+    """The current user's LLM token usage and estimated cost: by call type, per day, and today against the quota."""
+    return await usage_summary(db, current_user, days=max(1, min(days, 366)))
+
+
+def token_quota_exceeded(e: TokenQuotaExceeded) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after_seconds)})
+
+
+async def require_token_quota(db: AsyncSession, user: AuthenticatedUser) -> None:
+    """
+    Charges the request's LLM calls to `user` and rejects it with 429 once their daily token quota is used up.
+    Each LLM call is checked again when dispatched; handlers turn a TokenQuotaExceeded from one into a 429 too.
+    """
+    attribute_usage(user.id)
+    try:
+        await enforce_token_quota(db, user)
+    except TokenQuotaExceeded as e:
+        raise token_quota_exceeded(e)
+
 # --- Pydantic Models (retained for clarity and type safety) ---
 class GenerateRequest(BaseModel):
     prompt_text: str
@@ -150,13 +348,13 @@ class GenerateResumeRequest(BaseModel):
 
 
 # --- Endpoints ---
-@app.post("/test-gemini/")
+@router.post("/test-gemini/")
 async def test_gemini(request: GenerateRequest):
     """
     Tests the Gemini API by sending a basic text prompt using the LLMClient.
     """
     try:
-        generated_text = llm_client.generate_text(request.prompt_text)
+        generated_text = await llm_scheduler.run(llm_client.generate_text, request.prompt_text)
         return {"success": True, "generated_text": generated_text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM Client Error: {str(e)}")
@@ -171,33 +369,37 @@ async def test_gemini(request: GenerateRequest):
 #         raise HTTPException(status_code=500, detail=f"Error loading user profile: {str(e)}")
 # --- Modify existing routes to require authentication ---
 # Replace your current `get_user_profile` with this version
-@app.get("/user-profile/", response_model=dict)  # Adjust response model if you create a UserProfile schema
-async def get_user_profile(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Load user profile from the database, associated with the current_user
-    db_profile = db.query(models.UserProfile).filter(models.UserProfile.owner_id == current_user.id).first()
-    if not db_profile or not db_profile.core_data_json:
+@router.get("/user-profile/", response_model=dict)  # Adjust response model if you create a UserProfile schema
+async def get_user_profile(
+        request: Request,
+        response: Response,
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
+):
+    # Load user profile (core data + learned preferences) through the per-user cache
+    profile = await load_user_profile(db, current_user.id)
+    if not profile.has_profile:
         # Return an empty profile if not found, or create a default one
         return {"core_data": {}, "learned_preferences": []}
 
-    core_data = json.loads(db_profile.core_data_json)
-
-    # Load learned preferences from the database
-    db_preferences = db.query(models.LearnedPreference).filter(
-        models.LearnedPreference.owner_id == current_user.id).all()
-    learned_preferences = [json.loads(p.preference_data_json) for p in db_preferences]
+    # The profile revision doubles as ETag, so polling clients get a cheap 304 when nothing changed
+    if request.headers.get("if-none-match") == profile.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": profile.etag})
+    response.headers["ETag"] = profile.etag
 
-    return {"core_data": core_data, "learned_preferences": learned_preferences}
+    return {"core_data": profile.core_data, "learned_preferences": profile.learned_preferences}
 
 
 # Replace your current `setup_user_profile` with this version
-@app.post("/setup-user-profile/")
+@router.post("/setup-user-profile/")
 async def setup_user_profile(
         request: SetupUserProfileRequest,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
 ):
     # Retrieve or create the user profile in the database
-    db_profile = db.query(models.UserProfile).filter(models.UserProfile.owner_id == current_user.id).first()
+    result = await db.execute(select(models.UserProfile).where(models.UserProfile.owner_id == current_user.id))
+    db_profile = result.scalars().first()
     if db_profile:
         db_profile.core_data_json = json.dumps(request.core_data)
         # Assuming learned preferences are managed separately or appended
@@ -205,8 +407,8 @@ async def setup_user_profile(
         db_profile = models.UserProfile(owner_id=current_user.id, core_data_json=json.dumps(request.core_data))
         db.add(db_profile)
 
-    db.commit()
-    db.refresh(db_profile)
+    await refresh_prompt_ready_profile(db, current_user.id)
+    await db.commit()
     return {"message": "User profile updated successfully."}
 
 # @app.post("/generate-resume/", response_model=ResumeContentResponse)
@@ -372,240 +574,158 @@ async def setup_user_profile(
 
 # Modify `generate_resume` to use the database for data and associate resume with user
 
-def clean_core_data_for_llm(core_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Cleans and pre-processes core_data to remove or modify generic placeholders
-    before sending to the LLM.
-    """
-    cleaned_data = core_data.copy()
-
-    # Define common placeholder patterns
-    placeholder_patterns = [
-        r"placeholder\s*role", r"placeholder\s*company", r"n/a", r"not\s*applicable",
-        r"example\s*job", r"test\s*role", r"job\s*title\s*\d+", r"company\s*name\s*\d+",
-        r"description\s*of\s*responsibilities", r"lorem\s*ipsum", r"your\s*role",
-        r"your\s*company", r"no\s*responsibilities\s*provided"
-    ]
-    # Compile regex for efficiency
-    compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in placeholder_patterns]
-
-    def is_placeholder(text: str) -> bool:
-        if not text or not text.strip():
-            return True
-        for pattern in compiled_patterns:
-            if pattern.search(text):
-                return True
-        return False
-
-    # Clean Job History
-    if 'job_history' in cleaned_data and isinstance(cleaned_data['job_history'], list):
-        filtered_job_history = []
-        for job in cleaned_data['job_history']:
-            clean_job = job.copy()
-            # Check title and company - if both are placeholders, skip the job
-            if is_placeholder(clean_job.get('title', '')) and is_placeholder(clean_job.get('company', '')):
-                continue
-
-            # Clean individual fields within the job
-            if is_placeholder(clean_job.get('title', '')):
-                clean_job['title'] = "Experienced Professional" # Generic but not a placeholder
-            if is_placeholder(clean_job.get('company', '')):
-                clean_job['company'] = "Undisclosed Company" # Generic but not a placeholder
-
-            if 'responsibilities' in clean_job and isinstance(clean_job['responsibilities'], list):
-                # Filter out placeholder responsibilities
-                clean_job['responsibilities'] = [
-                    resp for resp in clean_job['responsibilities'] if not is_placeholder(resp)
-                ]
-                # If all responsibilities were placeholders, add a default
-                if not clean_job['responsibilities']:
-                    clean_job['responsibilities'] = ["Managed key projects and delivered impactful results."] # Provide a generic for LLM to expand
-
-            filtered_job_history.append(clean_job)
-        cleaned_data['job_history'] = filtered_job_history
-        # If no valid jobs remain, signal this to the LLM later
-        if not filtered_job_history:
-            cleaned_data['has_meaningful_job_history'] = False
-        else:
-            cleaned_data['has_meaningful_job_history'] = True
-
-
-    # Clean Education
-    if 'education' in cleaned_data and isinstance(cleaned_data['education'], list):
-        filtered_education = []
-        for edu in cleaned_data['education']:
-            clean_edu = edu.copy()
-            if is_placeholder(clean_edu.get('degree', '')) and is_placeholder(clean_edu.get('institution', '')):
-                continue
-            if is_placeholder(clean_edu.get('degree', '')): clean_edu['degree'] = "Degree/Certification"
-            if is_placeholder(clean_edu.get('institution', '')): clean_edu['institution'] = "Reputable Institution"
-            filtered_education.append(clean_edu)
-        cleaned_data['education'] = filtered_education
-
-    # Clean Skills
-    if 'skills' in cleaned_data and isinstance(cleaned_data['skills'], list):
-        cleaned_data['skills'] = [skill for skill in cleaned_data['skills'] if not is_placeholder(skill)]
-        if not cleaned_data['skills']:
-            cleaned_data['skills'] = ["Problem Solving", "Communication", "Teamwork"] # Default skills
-
-    # Clean Certifications
-    if 'certifications' in cleaned_data and isinstance(cleaned_data['certifications'], list):
-        cleaned_data['certifications'] = [cert for cert in cleaned_data['certifications'] if not is_placeholder(cert)]
-
-    # Clean Projects
-    if 'projects' in cleaned_data and isinstance(cleaned_data['projects'], list):
-        filtered_projects = []
-        for proj in cleaned_data['projects']:
-            if isinstance(proj, dict) and not is_placeholder(proj.get('name', '')):
-                if is_placeholder(proj.get('description', '')):
-                    proj['description'] = "Successfully completed a significant project."
-                filtered_projects.append(proj)
-        cleaned_data['projects'] = filtered_projects
-
-
-    # Add a flag if core data seems very sparse/placeholder-filled overall
-    if not cleaned_data.get('full_name') or is_placeholder(cleaned_data.get('full_name', '')):
-        cleaned_data['full_name'] = "Valued Candidate"
-    if not cleaned_data.get('email') or is_placeholder(cleaned_data.get('email', '')):
-        cleaned_data['email'] = "contact@example.com"
-
-
-    return cleaned_data
-
-@app.post("/generate-resume/", response_model=ResumeContentResponse)
+@router.post("/generate-resume/", response_model=ResumeContentResponse)
 async def generate_resume(
         request: GenerateResumeRequest,
-        current_user: models.User = Depends(get_current_user),  # <--- PROTECT THIS ROUTE
-        db: Session = Depends(get_db)  # <--- Inject database session
+        current_user: AuthenticatedUser = Depends(get_current_identity),  # <--- PROTECT THIS ROUTE
+        db: AsyncSession = Depends(get_db)  # <--- Inject database session
 ):
     """
     Generates a resume, performs self-critique, and iteratively refines it.
     """
+    await require_token_quota(db, current_user)
     try:
-        # Load user profile and learned preferences from the database for the current_user
-        db_profile = db.query(models.UserProfile).filter(models.UserProfile.owner_id == current_user.id).first()
-        core_data = json.loads(db_profile.core_data_json) if db_profile and db_profile.core_data_json else {}
+        # Load user profile and learned preferences (cached per user) for the current_user
+        profile = await load_user_profile(db, current_user.id)
+        core_data = profile.core_data
+        learned_preferences = profile.learned_preferences
 
-        cleaned_core_data = clean_core_data_for_llm(core_data)
+        # Placeholder cleaning and the profile prompt fragments are computed at write time
+        cleaned_core_data = profile.cleaned_core_data
 
-
-        db_preferences = db.query(models.LearnedPreference).filter(
-            models.LearnedPreference.owner_id == current_user.id).all()
-        learned_preferences = [json.loads(p.preference_data_json) for p in db_preferences]
+        # The prompts get the cached requirements/keywords digest of the posting, not the raw text
+        with span("jd.digest"):
+            job_description = await digest_job_description(llm_client, request.target_job_description)
 
         current_resume_draft = ""
         current_version_name = "Initial Draft"
         final_critique_results: Optional[ResumeCritique] = None
 
         for iteration in range(MAX_REFINEMENT_ITERATIONS + 1):
-            print(f"--- Generation/Refinement Iteration {iteration} ---")
-
-            # ... (Rest of your generate_resume logic, it remains largely the same) ...
-            # The only difference is `save_resume_version` call at the end:
-            if iteration == 0:
-                print("Generating initial resume draft...")
-                resume_prompt = prompt_manager.generate_resume_prompt(
-                    user_core_data=cleaned_core_data,
-                    learned_preferences=learned_preferences,
-                    initial_request=request.initial_prompt,
-                    target_job_description=request.target_job_description
+            with span("resume.iteration", iteration=iteration):
+                logger.info("Generation/refinement iteration %d", iteration, extra={"iteration": iteration})
+
+                # ... (Rest of your generate_resume logic, it remains largely the same) ...
+                # The only difference is `save_resume_version` call at the end:
+                if iteration == 0:
+                    logger.debug("Generating initial resume draft.")
+                    resume_prompt = prompt_manager.assemble_resume_prompt(
+                        fragments=profile.prompt_fragments,
+                        initial_request=request.initial_prompt,
+                        target_job_description=job_description
+                    )
+                    raw_generated_content = await llm_scheduler.run(llm_client.generate_text, resume_prompt,
+                                                                    temperature=0.8, call_type="generate")
+                    current_version_name = f"Resume Draft {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                else:
+                    if not final_critique_results or not final_critique_results.has_issues:
+                        logger.info("No issues found in previous iteration or critique missing. Skipping refinement.")
+                        break
+                    logger.debug("Refining based on previous critiques.", extra={"iteration": iteration})
+                    refinement_prompt = prompt_manager.generate_refinement_prompt(
+                        previous_resume_content=current_resume_draft,
+                        critiques=[c.model_dump() for c in final_critique_results.issues],
+                        user_core_data=cleaned_core_data,
+                        learned_preferences=profile.prompt_rules,
+                        target_job_description=job_description
+                    )
+                    raw_generated_content = await llm_scheduler.run(llm_client.generate_text, refinement_prompt,
+                                                                    temperature=0.7, call_type="refine")
+                    current_version_name = f"Refined Draft {datetime.now().strftime('%Y-%m-%d %H:%M')} (Iter {iteration})"
+
+                cleaned_content = clean_llm_output(raw_generated_content)
+                current_resume_draft = cleaned_content
+
+                logger.debug("Critiquing the current draft.", extra={"iteration": iteration})
+                critique_prompt = prompt_manager.generate_critique_prompt(
+                    resume_draft=current_resume_draft,
+                    learned_preferences=profile.prompt_rules,
+                    target_job_description=job_description
                 )
-                raw_generated_content = llm_client.generate_text(resume_prompt, temperature=0.8)
-                current_version_name = f"Resume Draft {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            else:
-                if not final_critique_results or not final_critique_results.has_issues:
-                    print("No issues found in previous iteration or critique missing. Skipping refinement.")
+                raw_critique_json = await llm_scheduler.run(llm_client.generate_text, critique_prompt,
+                                                            temperature=0.1, call_type="critique")
+
+                cleaned_critique_json = raw_critique_json.strip()
+                if cleaned_critique_json.startswith("```json"):
+                    cleaned_critique_json = cleaned_critique_json[len("```json"):].strip()
+                if cleaned_critique_json.endswith("```"):
+                    cleaned_critique_json = cleaned_critique_json[:-len("```")].strip()
+
+                with span("critique.parse") as trace:
+                    try:
+                        critique_data = json.loads(cleaned_critique_json)
+                        final_critique_results = ResumeCritique(**critique_data)
+                    except (json.JSONDecodeError, ValidationError, ValueError) as e:
+                        logger.warning("Failed to parse critique JSON: %s", e,
+                                       extra={"iteration": iteration, "raw_output": raw_critique_json})
+                        critique_parse_failures_total.inc()
+                        if trace is not None:
+                            trace.set("parse_failed", True)
+                        final_critique_results = ResumeCritique(
+                            issues=[
+                                CritiqueIssue(category="Error", description=f"Critique parsing failed: {e}", severity="high")],
+                            overall_assessment="Critique generation failed/malformed. Cannot trust assessment.",
+                            has_issues=False
+                        )
+
+                if not final_critique_results.has_issues:
+                    logger.info("No issues found. Breaking refinement loop.", extra={"iteration": iteration})
                     break
-                print(f"Refining based on previous critiques (Iteration {iteration})...")
-                refinement_prompt = prompt_manager.generate_refinement_prompt(
-                    previous_resume_content=current_resume_draft,
-                    critiques=[c.model_dump() for c in final_critique_results.issues],
-                    user_core_data=cleaned_core_data,
-                    learned_preferences=learned_preferences,
-                    target_job_description=request.target_job_description
-                )
-                raw_generated_content = llm_client.generate_text(refinement_prompt, temperature=0.7)
-                current_version_name = f"Refined Draft {datetime.now().strftime('%Y-%m-%d %H:%M')} (Iter {iteration})"
-
-            cleaned_content = clean_llm_output(raw_generated_content)
-            current_resume_draft = cleaned_content
-
-            print(f"Critiquing the current draft (Iteration {iteration})...")
-            critique_prompt = prompt_manager.generate_critique_prompt(
-                resume_draft=current_resume_draft,
-                learned_preferences=learned_preferences,
-                target_job_description=request.target_job_description
-            )
-            raw_critique_json = llm_client.generate_text(critique_prompt, temperature=0.1)
-
-            cleaned_critique_json = raw_critique_json.strip()
-            if cleaned_critique_json.startswith("```json"):
-                cleaned_critique_json = cleaned_critique_json[len("```json"):].strip()
-            if cleaned_critique_json.endswith("```"):
-                cleaned_critique_json = cleaned_critique_json[:-len("```")].strip()
 
-            try:
-                critique_data = json.loads(cleaned_critique_json)
-                final_critique_results = ResumeCritique(**critique_data)
-            except (json.JSONDecodeError, ValidationError, ValueError) as e:
-                print(f"ERROR: Failed to parse critique JSON in iteration {iteration}: {e}")
-                print(f"Raw critique output: {raw_critique_json}")
-                final_critique_results = ResumeCritique(
-                    issues=[
-                        CritiqueIssue(category="Error", description=f"Critique parsing failed: {e}", severity="high")],
-                    overall_assessment="Critique generation failed/malformed. Cannot trust assessment.",
-                    has_issues=False
-                )
-
-            if not final_critique_results.has_issues:
-                print(f"No issues found in Iteration {iteration}. Breaking refinement loop.")
-                break
-
-            if iteration == MAX_REFINEMENT_ITERATIONS:
-                print(f"Max refinement iterations ({MAX_REFINEMENT_ITERATIONS}) reached. Returning current draft.")
-                break
+                if iteration == MAX_REFINEMENT_ITERATIONS:
+                    logger.info("Max refinement iterations (%d) reached. Returning current draft.", MAX_REFINEMENT_ITERATIONS)
+                    break
 
         # --- Save the Final Generated/Refined Resume Version to the DATABASE ---
-        db_resume_version = models.ResumeVersion(
-            owner_id=current_user.id,  # Link to the authenticated user
-            resume_uuid=str(uuid.uuid4()),  # Still keep a UUID if you want for external reference
-            version_name=current_version_name,
-            content=current_resume_draft,
-            core_data_used_json=json.dumps(core_data),  # Store as JSON string
-            learned_preferences_used_json=json.dumps(learned_preferences),  # Store as JSON string
-            target_job_description_used=request.target_job_description,
-            critique_data_json=json.dumps(final_critique_results.model_dump()) if final_critique_results else None
-        )
-        db.add(db_resume_version)
-        db.commit()
-        db.refresh(db_resume_version)  # Refresh to get the database-assigned ID
+        # Core data and preferences go to shared content-addressed snapshots, large text is compressed,
+        # and the content is delta-encoded against the user's previous version when that is smaller
+        with span("db.save_version"):
+            parent_version = await latest_resume_version(db, current_user.id)
+            db_resume_version = await build_resume_version(
+                db,
+                owner_id=current_user.id,  # Link to the authenticated user
+                resume_uuid=str(uuid.uuid4()),  # Still keep a UUID if you want for external reference
+                version_name=current_version_name,
+                content=current_resume_draft,
+                core_data_used=core_data,
+                learned_preferences_used=learned_preferences,
+                target_job_description_used=request.target_job_description,
+                critique_data=final_critique_results.model_dump() if final_critique_results else None,
+                parent=parent_version
+            )
+            db.add(db_resume_version)
+            await db.commit()
+            await db.refresh(db_resume_version)  # Refresh to get the database-assigned ID and server-side timestamp
+            cache_content(db_resume_version, current_resume_draft)
+            usage_ledger.link_resume_version(current_request_id(), db_resume_version.id)
 
         # Return the final refined resume and its critique (using Pydantic model)
         return ResumeContentResponse(
             id=str(db_resume_version.id),  # Return DB ID as string for consistency
             version_name=db_resume_version.version_name,
-            content=db_resume_version.content,
+            content=current_resume_draft,
             timestamp=db_resume_version.timestamp.isoformat() + 'Z',  # Convert datetime to string
             feedback_summary="Generated with agentic self-correction and multi-user support.",
-            core_data_used=json.loads(db_resume_version.core_data_used_json),
-            learned_preferences_used=json.loads(db_resume_version.learned_preferences_used_json),
-            target_job_description_used=db_resume_version.target_job_description_used,
+            core_data_used=core_data,
+            learned_preferences_used=learned_preferences,
+            target_job_description_used=request.target_job_description,
             critique=final_critique_results
         )
 
     except HTTPException:
         raise
+    except TokenQuotaExceeded as e:
+        raise token_quota_exceeded(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Resume generation failed.")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during resume generation: {str(e)}")
 
 
-@app.post("/submit-feedback/")
+@router.post("/submit-feedback/")
 async def submit_feedback(
         feedback_request: SubmitFeedbackRequest,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
 ):
     # 1. Update Learned Preferences based on feedback (in DB)
     for feedback_item in feedback_request.feedback_items:
@@ -624,17 +744,18 @@ async def submit_feedback(
         )
         db.add(db_preference)
 
-    db.commit()
+    # Raw feedback entries carry no `rule`, so the prompt-ready view is unchanged; only the cached profile is stale
+    await bump_profile_revision(db, current_user.id)
+    await db.commit()
 
-    # 2. Implement logic to generate a new refined preference list for this user
-    # This part would be more complex and involve the AI processing the new feedback
-    # and previous preferences. For now, simply adding new preference entry.
-    # In a more advanced system, you'd feed this back to your prompt_manager logic.
+    # 2. Distill the feedback into learned rules and core data updates (AgenticLearner) in the background;
+    # bursts of feedback from the same user are coalesced into one learning pass
+    feedback_learning_worker.enqueue(current_user.id, feedback_request.feedback_items)
 
     return {"message": "Feedback submitted successfully. Learned preferences updated."}
 
 
-@app.post("/get-suggestions/", response_model=SuggestionsResponse)
+@router.post("/get-suggestions/", response_model=SuggestionsResponse)
 async def get_suggestions(request: GetSuggestionsRequest):
     """
     Generates proactive suggestions for resume improvement based on user data
@@ -649,12 +770,13 @@ async def get_suggestions(request: GetSuggestionsRequest):
         # Generate the prompt for suggestions using the new method
         suggestions_prompt = prompt_manager.generate_suggestions_prompt(
             user_core_data=core_data,
-            learned_preferences=learned_preferences,
-            target_job_description=request.target_job_description
+            learned_preferences=select_prompt_rules(learned_preferences),
+            target_job_description=await digest_job_description(llm_client, request.target_job_description)
         )
 
         # Get raw suggestions (JSON string) from the LLM
-        raw_suggestions_json = llm_client.generate_text(suggestions_prompt, temperature=0.6)
+        raw_suggestions_json = await llm_scheduler.run(llm_client.generate_text, suggestions_prompt,
+                                                       temperature=0.6, call_type="suggest")
 
         # --- NEW: Clean the raw_suggestions_json to remove markdown code block ---
         cleaned_suggestions_json = raw_suggestions_json.strip()
@@ -670,8 +792,7 @@ async def get_suggestions(request: GetSuggestionsRequest):
                 raise ValueError("LLM did not return a list of suggestions.")
             validated_suggestions = [SuggestionItem(**s) for s in suggestions_data]
         except (json.JSONDecodeError, ValueError, ValidationError) as e:
-            print(f"Error parsing/validating LLM suggestions JSON: {e}")
-            print(f"Raw LLM output for suggestions: {raw_suggestions_json}")
+            logger.warning("Error parsing/validating LLM suggestions JSON: %s", e, extra={"raw_output": raw_suggestions_json})
             raise HTTPException(status_code=500, detail=f"AI returned malformed suggestions: {str(e)}. Raw output: {raw_suggestions_json[:200]}...")
 
         return SuggestionsResponse(suggestions=validated_suggestions)
@@ -679,51 +800,55 @@ async def get_suggestions(request: GetSuggestionsRequest):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Getting suggestions failed.")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred while getting suggestions: {str(e)}")
 
 
 # Add a new route to get all resume versions for the current user
-@app.get("/resume-versions/", response_model=List[ResumeContentResponse])
+@router.get("/resume-versions/", response_model=List[ResumeContentResponse])
 async def get_all_resume_versions(
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
 ):
-    db_resume_versions = db.query(models.ResumeVersion).filter(
-        models.ResumeVersion.owner_id == current_user.id).order_by(models.ResumeVersion.timestamp.desc()).all()
+    result = await db.execute(select(models.ResumeVersion).where(
+        models.ResumeVersion.owner_id == current_user.id).order_by(models.ResumeVersion.timestamp.desc()))
+    db_resume_versions = result.scalars().all()
+    # Resolves snapshot references (one query per snapshot table) and decompresses stored text
+    decoded_versions = await read_resume_versions(db, db_resume_versions)
+    return resume_version_responses(db_resume_versions, decoded_versions)
+
+
+async def extract_core_data_with_llm(extracted_text: str) -> Dict[str, Any]:
+    """Extracts structured core data from resume text with Gemini (through the rate-limited scheduler)."""
+    # Contact details, skills, certifications and years of experience are extracted locally;
+    # the LLM only gets the free-text sections and fills in the rest
+    prefilled, free_text = pre_extract_resume_fields(extracted_text)
+    extraction_prompt = prompt_manager.generate_core_data_extraction_prompt(free_text, prefilled=prefilled)
+    raw_extracted_json = await llm_scheduler.run(llm_client.generate_text, extraction_prompt,
+                                                  temperature=0.1, call_type="extract")  # Low temp for data extraction
+
+    # Clean markdown from JSON response
+    cleaned_json = raw_extracted_json.strip()
+    if cleaned_json.startswith("```json"):
+        cleaned_json = cleaned_json[len("```json"):].strip()
+    if cleaned_json.endswith("```"):
+        cleaned_json = cleaned_json[:-len("```")].strip()
 
-    response_versions = []
-    for rv in db_resume_versions:
-        critique = None
-        if rv.critique_data_json:
-            try:
-                critique = ResumeCritique(**json.loads(rv.critique_data_json))
-            except (json.JSONDecodeError, ValidationError):
-                print(f"Warning: Could not parse critique for resume version {rv.id}")
-
-        response_versions.append(
-            ResumeContentResponse(
-                id=str(rv.id),
-                version_name=rv.version_name,
-                content=rv.content,
-                timestamp=rv.timestamp.isoformat() + 'Z',
-                feedback_summary="Loaded from database.",
-                core_data_used=json.loads(rv.core_data_used_json) if rv.core_data_used_json else {},
-                learned_preferences_used=json.loads(
-                    rv.learned_preferences_used_json) if rv.learned_preferences_used_json else [],
-                target_job_description_used=rv.target_job_description_used,
-                critique=critique
-            )
+    try:
+        return merge_prefilled_fields(json.loads(cleaned_json), prefilled)
+    except json.JSONDecodeError as e:
+        logger.warning("Error parsing LLM extracted JSON: %s", e, extra={"raw_output": raw_extracted_json})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI failed to extract valid JSON data from resume. Error: {e}"
         )
-    return response_versions
 
 
-@app.post("/upload-resume/")
+@router.post("/upload-resume/")
 async def upload_resume(
         file: UploadFile = File(...),
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
 ):
     if not file.filename.endswith(('.pdf', '.docx')):
         raise HTTPException(
@@ -731,46 +856,56 @@ async def upload_resume(
             detail="Unsupported file type. Only PDF and DOCX are allowed."
         )
 
-    try:
-        file_content = await file.read()
-        extracted_text = parse_resume_content(file_content, file.filename)
-
-        if not extracted_text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to extract text from the uploaded resume. Ensure it's a valid PDF or DOCX."
-            )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=upload_limit_message()
+        )
 
-        # Use LLM to extract structured data
-        extraction_prompt = prompt_manager.generate_core_data_extraction_prompt(extracted_text)
-        raw_extracted_json = llm_client.generate_text(extraction_prompt,
-                                                      temperature=0.1)  # Low temp for data extraction
+    upload_path = None
+    try:
+        try:
+            upload_path, file_hash = await spool_upload(file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+        # Exact re-upload: reuse the earlier extraction without parsing or calling the LLM
+        extracted_data = await find_extraction_by_file(db, file_hash)
+        if extracted_data is None:
+            # Parse in a separate process so large or pathological documents can't block the event loop
+            try:
+                extracted_text = await parser_pool.parse(upload_path, file.filename)
+            except DocumentLimitExceeded as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            except DocumentRejected as e:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+            except ParserBusy as e:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+            if not extracted_text:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Failed to extract text from the uploaded resume. Ensure it's a valid PDF or DOCX."
+                )
 
-        # Clean markdown from JSON response
-        cleaned_json = raw_extracted_json.strip()
-        if cleaned_json.startswith("```json"):
-            cleaned_json = cleaned_json[len("```json"):].strip()
-        if cleaned_json.endswith("```"):
-            cleaned_json = cleaned_json[:-len("```")].strip()
+            # Same text from a different file (e.g. re-exported PDF): still no LLM call needed
+            text_hash = text_fingerprint(extracted_text)
+            extracted_data = await find_extraction_by_text(db, text_hash)
+            if extracted_data is None:
+                await require_token_quota(db, current_user)
+                extracted_data = await extract_core_data_with_llm(extracted_text)
 
-        try:
-            extracted_data = json.loads(cleaned_json)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing LLM extracted JSON: {e}")
-            print(f"Raw LLM output: {raw_extracted_json}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"AI failed to extract valid JSON data from resume. Error: {e}"
-            )
+            await remember_extraction(db, file_hash, text_hash, extracted_text, extracted_data)
 
         # Update user profile in the database
-        db_profile = db.query(models.UserProfile).filter(models.UserProfile.owner_id == current_user.id).first()
+        result = await db.execute(select(models.UserProfile).where(models.UserProfile.owner_id == current_user.id))
+        db_profile = result.scalars().first()
         if not db_profile:
             # This case should ideally not happen if user registration creates a profile
             db_profile = models.UserProfile(owner_id=current_user.id, core_data_json="{}")
             db.add(db_profile)
-            db.commit()  # Commit to get an ID for the new profile if needed
-            db.refresh(db_profile)
+            await db.commit()  # Commit to get an ID for the new profile if needed
+            await db.refresh(db_profile)
 
         # Merge extracted data with existing profile data (if any)
         current_profile_data = json.loads(db_profile.core_data_json) if db_profile.core_data_json else {}
@@ -785,19 +920,133 @@ async def upload_resume(
                 merged_profile_data[key] = merged_profile_data[key]  # Keep as list for JSON.dumps
 
         db_profile.core_data_json = json.dumps(merged_profile_data)
-        db.commit()
-        db.refresh(db_profile)
+        await refresh_prompt_ready_profile(db, current_user.id)
+        await db.commit()
 
         return {"message": "Resume uploaded and profile updated successfully!", "extracted_data": extracted_data}
 
     except HTTPException:
         raise  # Re-raise FastAPI HTTP exceptions
+    except TokenQuotaExceeded as e:
+        raise token_quota_exceeded(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()  # Print full traceback to console
+        logger.exception("Resume upload failed.")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred during resume upload or processing: {str(e)}"
         )
+    finally:
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, Gemini, prompt and cache metrics of this worker, in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/admin/usage")
+async def get_usage_by_user(days: int = 30, current_user: AuthenticatedUser = Depends(get_current_identity),
+                            db: AsyncSession = Depends(get_db)):
+    """LLM token usage and estimated cost per user over the last `days` days. Admin only."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usage reports are only available to admin accounts.")
+    return {"days": days, "users": await usage_by_user(db, days=max(1, min(days, 366)))}
+
+
+@router.get("/admin/traces/{request_id}")
+async def get_request_trace(request_id: str, current_user: AuthenticatedUser = Depends(get_current_identity)):
+    """
+    Spans recorded for one request (see the X-Request-ID response header), in start order, from the
+    in-memory trace exporter. Admin only.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Traces are only available to admin accounts.")
+    sink = tracer.sink(InMemorySpanSink)
+    if sink is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The in-memory trace exporter is not enabled.")
+    spans = sorted(sink.spans(request_id), key=lambda s: s.start_ns)
+    if not spans:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No spans recorded for this request ID.")
+    return {"request_id": request_id, "spans": [s.to_dict() for s in spans]}
+
+@router.get("/admin/profiles")
+async def list_profiles(current_user: AuthenticatedUser = Depends(get_current_identity)):
+    """Profiles stored by this deployment, newest first. Admin only."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiles are only available to admin accounts.")
+    return {"profiles": await asyncio.to_thread(request_profiler.list_profiles)}
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, current_user: AuthenticatedUser = Depends(get_current_identity)):
+    """
+    One stored profile (see the X-Profile-ID response header): speedscope JSON, to open at
+    https://www.speedscope.app, or pstats, for `python -m pstats` or snakeviz. Admin only.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiles are only available to admin accounts.")
+    path = request_profiler.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found.")
+    media_type = "application/json" if profile_id.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=profile_id)
+
+@router.post("/upload-resumes/batch")
+async def upload_resumes_batch(
+        files: List[UploadFile] = File(...),
+        current_user: AuthenticatedUser = Depends(get_current_identity),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk ingestion for recruiter accounts: accepts PDF/DOCX files and/or ZIP archives of them and streams
+    one NDJSON line per resume (structured extraction or error) as each finishes, plus progress and a summary.
+    Extractions are cached like single uploads; the recruiter's own profile is not modified.
+    """
+    if not (current_user.is_recruiter or current_user.is_admin):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Batch uploads are only available to recruiter accounts.")
+    await require_token_quota(db, current_user)
+
+    try:
+        items, temp_paths = await prepare_batch(files)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="The uploaded ZIP archive could not be read.")
+
+    return StreamingResponse(
+        stream_batch_results(items, temp_paths, extract_core_data_with_llm),
+        media_type="application/x-ndjson"
+    )
+
+
+def create_app() -> FastAPI:
+    """
+    Builds the API: middleware, routes, and the lifespan that starts and stops the background workers.
+    Importing this module is cheap; the heavy parser and Gemini libraries load on first use.
+    """
+    app = FastAPI(
+        title="Agentic Resume Builder (Full Brain)",
+        description="Full API with enhanced agentic learning and structured prompting.",
+        version="0.4.0",
+        lifespan=lifespan,
+    )
+    # Each one wraps the ones added before it: request metrics, then tracing, profiling, upload limits
+    for middleware in (reject_oversized_uploads, profile_requests, trace_requests, record_request_metrics):
+        app.middleware("http")(middleware)
+    # Added last, so it is outermost: preflights are answered before the upload limit sees them, and
+    # the 413/400/403 responses of the middlewares above carry the CORS headers the browser needs
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True, # Allow cookies and authorization headers
+        allow_methods=["*"],    # Allow all HTTP methods (GET, POST, PUT, DELETE, etc.)
+        allow_headers=["*"],    # Allow all headers
+    )
+    app.include_router(router)
+    return app
+
+
+app = create_app()
 
- # uvicorn app.main:app --reload
\ No newline at end of file
+# uvicorn app.main:app --reload   (or: uvicorn app.main:create_app --factory)
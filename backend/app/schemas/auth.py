@@ -20,6 +20,7 @@ class UserInDB(BaseModel):
     hashed_password: str
     is_active: bool
     is_admin: bool
+    is_recruiter: bool = False
 
     class Config:
         from_attributes = True # Changed from orm_mode = True in Pydantic v2
@@ -27,7 +28,12 @@ class UserInDB(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None # Single use: exchange it at /token/refresh for a new token pair
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    expires_at: Optional[int] = None # `exp` claim, seconds since the epoch
     scopes: list[str] = []
\ No newline at end of file
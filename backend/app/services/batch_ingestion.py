@@ -0,0 +1,238 @@
+# backend/app/services/batch_ingestion.py
+
+import asyncio
+import hashlib
+import json
+import os
+import logging
+import tempfile
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from ..config import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, BATCH_MAX_UPLOAD_BYTES, BATCH_MAX_FILES, BATCH_CONCURRENCY
+from ..db.database import SessionLocal
+from ..utils.resume_parser import DocumentLimitExceeded
+from .document_parsing import (
+    parser_pool, spool_upload, upload_limit_message, UploadTooLarge, DocumentRejected, ParserBusy
+)
+from .upload_cache import find_extraction_by_file, find_extraction_by_text, remember_extraction, text_fingerprint
+from .usage_ledger import TokenQuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+PARSER_BUSY_RETRIES = 5
+
+
+class BatchTooLarge(Exception):
+    """The batch has more files, or more bytes, than allowed."""
+
+
+class BatchItem:
+    """
+    One resume of a batch. Uploaded files are spooled to disk before the response starts streaming
+    (FastAPI closes the form files when the endpoint returns); ZIP members are only unpacked when
+    the item is processed, so at most BATCH_CONCURRENCY of them are on disk at a time.
+    """
+
+    def __init__(self, index: int, filename: str, path: Optional[str] = None, file_hash: Optional[str] = None,
+                 zip_path: Optional[str] = None, zip_member: Optional[zipfile.ZipInfo] = None,
+                 error: Optional[str] = None):
+        self.index = index
+        self.filename = filename
+        self.path = path
+        self.file_hash = file_hash
+        self.zip_path = zip_path
+        self.zip_member = zip_member
+        self.error = error # Set when the item was rejected while preparing the batch
+
+    async def materialize(self) -> Tuple[str, str]:
+        """Returns (path, sha256) of the item's bytes on disk, unpacking it from the ZIP if needed."""
+        if self.path is None and self.zip_member is not None:
+            self.path, self.file_hash = await asyncio.to_thread(_unpack_zip_member, self.zip_path, self.zip_member)
+        return self.path, self.file_hash
+
+    def cleanup(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+
+def _unpack_zip_member(zip_path: str, member: zipfile.ZipInfo) -> Tuple[str, str]:
+    """Streams one ZIP member to a temp file, enforcing MAX_UPLOAD_BYTES on the actual decompressed bytes."""
+    if member.file_size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(upload_limit_message())
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=os.path.splitext(member.filename)[1].lower())
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        # A ZipFile per member: members are unpacked from several threads at once
+        with zipfile.ZipFile(zip_path) as archive, archive.open(member) as source, os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES: # The header's file_size can lie
+                    raise UploadTooLarge(upload_limit_message())
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _list_zip_members(zip_path: str) -> List[zipfile.ZipInfo]:
+    with zipfile.ZipFile(zip_path) as archive:
+        return [
+            member for member in archive.infolist()
+            if not member.is_dir()
+            and not member.filename.startswith("__MACOSX/")
+            and not os.path.basename(member.filename).startswith(".")
+        ]
+
+
+def _is_supported(filename: str) -> bool:
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+async def prepare_batch(files: List[UploadFile]) -> Tuple[List[BatchItem], List[str]]:
+    """
+    Turns the uploaded files (resumes and/or ZIP archives of resumes) into batch items.
+    Returns the items and the temp files to delete once the batch is done.
+    Raises BatchTooLarge, or zipfile.BadZipFile for an unreadable archive.
+    """
+    items: List[BatchItem] = []
+    temp_paths: List[str] = []
+    total_bytes = 0
+    try:
+        for upload in files:
+            filename = upload.filename or "upload"
+            if filename.lower().endswith(".zip"):
+                zip_path, _ = await spool_upload(upload, max_bytes=BATCH_MAX_UPLOAD_BYTES - total_bytes)
+                temp_paths.append(zip_path)
+                total_bytes += os.path.getsize(zip_path)
+                for member in await asyncio.to_thread(_list_zip_members, zip_path):
+                    item = BatchItem(len(items), member.filename, zip_path=zip_path, zip_member=member)
+                    if not _is_supported(member.filename):
+                        item.error = "Unsupported file type. Only PDF and DOCX are allowed."
+                    items.append(item)
+            elif not _is_supported(filename):
+                items.append(BatchItem(len(items), filename, error="Unsupported file type. Only PDF and DOCX are allowed."))
+            else:
+                try:
+                    path, file_hash = await spool_upload(upload)
+                except UploadTooLarge as e:
+                    items.append(BatchItem(len(items), filename, error=str(e)))
+                    continue
+                total_bytes += os.path.getsize(path)
+                items.append(BatchItem(len(items), filename, path=path, file_hash=file_hash))
+            if total_bytes > BATCH_MAX_UPLOAD_BYTES:
+                raise BatchTooLarge(upload_limit_message(BATCH_MAX_UPLOAD_BYTES))
+            if len(items) > BATCH_MAX_FILES:
+                raise BatchTooLarge(f"A batch may contain at most {BATCH_MAX_FILES} files.")
+    except UploadTooLarge as e: # Only raised for ZIP archives; single files become item errors
+        _remove_files(temp_paths, items)
+        raise BatchTooLarge(str(e))
+    except BaseException:
+        _remove_files(temp_paths, items)
+        raise
+    return items, temp_paths
+
+
+def _remove_files(temp_paths: List[str], items: List[BatchItem]) -> None:
+    for item in items:
+        item.cleanup()
+    for path in temp_paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def _parse_with_retry(path: str, filename: str) -> Optional[str]:
+    # Other uploads share the parser pool; back off instead of failing the item when it's momentarily full
+    for attempt in range(PARSER_BUSY_RETRIES):
+        try:
+            return await parser_pool.parse(path, filename)
+        except ParserBusy:
+            if attempt == PARSER_BUSY_RETRIES - 1:
+                raise
+            await asyncio.sleep(0.5 * (attempt + 1))
+
+
+async def ingest_item(item: BatchItem, extract_core_data: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Parses and extracts one resume of the batch. Never raises: failures are reported in the result."""
+    result: Dict[str, Any] = {"index": item.index, "filename": item.filename}
+    if item.error:
+        return {**result, "status": "error", "detail": item.error}
+    try:
+        path, file_hash = await item.materialize()
+
+        # Short-lived sessions: the parse and the LLM call below must not hold a database connection
+        async with SessionLocal() as db:
+            extracted_data = await find_extraction_by_file(db, file_hash)
+            await db.commit()
+        if extracted_data is not None:
+            return {**result, "status": "ok", "cached": True, "extracted_data": extracted_data}
+
+        extracted_text = await _parse_with_retry(path, item.filename)
+        if not extracted_text:
+            return {**result, "status": "error",
+                    "detail": "Failed to extract text from the uploaded resume. Ensure it's a valid PDF or DOCX."}
+
+        text_hash = text_fingerprint(extracted_text)
+        async with SessionLocal() as db:
+            extracted_data = await find_extraction_by_text(db, text_hash)
+            await db.commit()
+        cached = extracted_data is not None
+        if not cached:
+            extracted_data = await extract_core_data(extracted_text)
+
+        async with SessionLocal() as db:
+            await remember_extraction(db, file_hash, text_hash, extracted_text, extracted_data)
+            await db.commit()
+        return {**result, "status": "ok", "cached": cached, "extracted_data": extracted_data}
+    except (UploadTooLarge, DocumentLimitExceeded, DocumentRejected, ParserBusy, TokenQuotaExceeded,
+            zipfile.BadZipFile) as e:
+        return {**result, "status": "error", "detail": str(e)}
+    except HTTPException as e:
+        return {**result, "status": "error", "detail": e.detail}
+    except Exception as e:
+        logger.exception("Batch item %s failed.", item.filename)
+        return {**result, "status": "error", "detail": f"An unexpected error occurred while processing this file: {e}"}
+    finally:
+        item.cleanup()
+
+
+async def stream_batch_results(items: List[BatchItem], temp_paths: List[str],
+                               extract_core_data: Callable[[str], Awaitable[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """
+    Processes the batch BATCH_CONCURRENCY files at a time and yields NDJSON lines: a "start" event,
+    one "result" event per file as soon as it finishes (with progress counters), and a final "summary".
+    """
+    total = len(items)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item: BatchItem) -> Dict[str, Any]:
+        async with semaphore:
+            return await ingest_item(item, extract_core_data)
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    completed = succeeded = 0
+    try:
+        yield json.dumps({"event": "start", "total": total}) + "\n"
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            completed += 1
+            succeeded += result["status"] == "ok"
+            yield json.dumps({"event": "result", **result, "completed": completed, "total": total}) + "\n"
+        yield json.dumps({"event": "summary", "total": total, "succeeded": succeeded,
+                          "failed": total - succeeded}) + "\n"
+    finally:
+        # Also reached when the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _remove_files(temp_paths, items)
@@ -0,0 +1,231 @@
+# backend/app/services/document_parsing.py
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from ..config import (
+    MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, PARSE_WORKERS, PARSE_MAX_PENDING,
+    PARSE_TIMEOUT_SECONDS, PARSE_MAX_PAGES, PARSE_WORKER_MEMORY_MB, PDF_SHARD_MIN_PAGES,
+    LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE,
+)
+from ..utils.resume_parser import parse_resume_file, pdf_page_count, extract_pdf_pages, DocumentLimitExceeded
+from ..utils.structured_logging import configure_logging, parse_levels
+from ..utils.tracing import span
+
+try:
+    import resource # POSIX only
+except ImportError:
+    resource = None
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeds MAX_UPLOAD_BYTES."""
+
+
+def upload_limit_message(max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    return f"Upload exceeds the {max_bytes / (1024 * 1024):.1f} MB limit."
+
+
+class DocumentRejected(Exception):
+    """The document could not be parsed within the time or memory limits."""
+
+
+class ParserBusy(Exception):
+    """Too many documents are already waiting for a parser process."""
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, str]:
+    """
+    Copies an upload to a named temp file in UPLOAD_CHUNK_BYTES chunks, so the whole file is never held
+    in memory and parser processes can open it by path. Raises UploadTooLarge past `max_bytes`.
+    Returns the temp file path (which the caller must delete) and the SHA-256 of the contents.
+    """
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(upload_limit_message(max_bytes))
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _init_parser_worker(memory_mb: int) -> None:
+    """
+    Runs once in every parser process: caps its address space so a pathological file can't eat the host,
+    and sets up the same structured logging as the API process (spawned processes start unconfigured).
+    """
+    configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE, parse_levels(LOG_LEVELS))
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+
+class ParseTimeout(BaseException):
+    """
+    Raised inside a parser process when its time is up. Derives from BaseException so the
+    parsers' own `except Exception` fallbacks can't swallow it.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise ParseTimeout()
+
+
+def _with_time_limit(timeout: float, func, *args):
+    """Runs `func` in a parser process, raising ParseTimeout inside it after `timeout` seconds so a stuck parse frees the process."""
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class PdfShardPlan:
+    """Returned by a parser process instead of text when a PDF is large enough to be split across processes."""
+
+    def __init__(self, page_count: int):
+        self.page_count = page_count
+
+
+def _parse_document(file_path: str, filename: str, max_pages: int, shard_min_pages: Optional[int]):
+    if shard_min_pages and filename.lower().endswith(".pdf"):
+        page_count = pdf_page_count(file_path)
+        if page_count is not None and page_count >= shard_min_pages:
+            if max_pages is not None and page_count > max_pages:
+                raise DocumentLimitExceeded(f"PDF has {page_count} pages; the limit is {max_pages}.")
+            return PdfShardPlan(page_count)
+    return parse_resume_file(file_path, filename, max_pages=max_pages)
+
+
+def _parse_in_worker(file_path: str, filename: str, max_pages: int, timeout: float,
+                     shard_min_pages: Optional[int] = None):
+    """Parser process entry point: the document's text, or a PdfShardPlan for large PDFs."""
+    return _with_time_limit(timeout, _parse_document, file_path, filename, max_pages, shard_min_pages)
+
+
+def _extract_pages_in_worker(file_path: str, start: int, stop: int, timeout: float) -> Optional[str]:
+    return _with_time_limit(timeout, extract_pdf_pages, file_path, start, stop)
+
+
+def pdf_page_ranges(page_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Splits [0, page_count) into `shards` contiguous ranges of (nearly) equal size."""
+    size, extra = divmod(page_count, shards)
+    ranges, start = [], 0
+    for shard in range(shards):
+        stop = start + size + (1 if shard < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+class DocumentParserPool:
+    """
+    Bounded pool of parser processes, so PDF/DOCX extraction never runs on the event loop.
+    At most `max_pending` documents may be queued or running; each one gets `timeout` seconds.
+    PDFs with at least `shard_min_pages` pages are split into page ranges extracted by several processes.
+    """
+
+    def __init__(self, max_workers: int = PARSE_WORKERS, max_pending: int = PARSE_MAX_PENDING,
+                 timeout: float = PARSE_TIMEOUT_SECONDS, max_pages: int = PARSE_MAX_PAGES,
+                 memory_mb: int = PARSE_WORKER_MEMORY_MB, shard_min_pages: int = PDF_SHARD_MIN_PAGES):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.memory_mb = memory_mb
+        self.shard_min_pages = shard_min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"), # Don't fork the event loop / DB threads
+                initializer=_init_parser_worker,
+                initargs=(self.memory_mb,),
+            )
+        return self._executor
+
+    def _reset_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _parse(self, file_path: str, filename: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        shard_min_pages = self.shard_min_pages if self.max_workers > 1 else None
+        result = await loop.run_in_executor(
+            executor, _parse_in_worker, file_path, filename, self.max_pages, self.timeout, shard_min_pages)
+        if not isinstance(result, PdfShardPlan):
+            return result
+
+        # At least half of shard_min_pages pages per shard, so small PDFs aren't split into tiny tasks
+        shards = max(1, min(self.max_workers, result.page_count // max(1, self.shard_min_pages // 2)))
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_pages_in_worker, file_path, start, stop, self.timeout)
+            for start, stop in pdf_page_ranges(result.page_count, shards)
+        ))
+        if any(part is None for part in parts):
+            return None
+        return "".join(parts)
+
+    async def parse(self, file_path: str, filename: str) -> Optional[str]:
+        """Extracts the text of a spooled document in a parser process."""
+        if self._pending >= self.max_pending:
+            raise ParserBusy("Too many documents are being parsed right now. Please retry shortly.")
+        self._pending += 1
+        try:
+            with span("parse.document", file_type=os.path.splitext(filename)[1].lower()) as trace:
+                # Workers stop themselves at `timeout`; the extra second only covers a worker that can't be interrupted
+                text = await asyncio.wait_for(self._parse(file_path, filename), timeout=self.timeout + 1)
+                if trace is not None:
+                    trace.set("text_chars", len(text or ""))
+                return text
+        except DocumentLimitExceeded:
+            raise
+        except (ParseTimeout, asyncio.TimeoutError):
+            raise DocumentRejected(f"Parsing did not finish within {self.timeout:g} seconds.")
+        except (BrokenProcessPool, MemoryError):
+            # A worker died (e.g. hit its memory limit); start from a fresh pool for the next document
+            self._reset_executor()
+            raise DocumentRejected("The document could not be parsed within the resource limits.")
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+parser_pool = DocumentParserPool()
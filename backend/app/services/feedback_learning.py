@@ -0,0 +1,217 @@
+# backend/app/services/feedback_learning.py
+
+import asyncio
+import copy
+import json
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import FEEDBACK_COALESCE_SECONDS, FEEDBACK_LEARNING_CONCURRENCY
+from ..core_ai.agentic_learner import AgenticLearner
+from ..core_ai.preference_compaction import plan_rule_compaction, select_prompt_rules
+from ..core_ai.prompt_budget import token_counter
+from ..db import models
+from ..db.database import SessionLocal
+from ..schemas.feedback import FeedbackItem
+from .profile_cache import prompt_manager, refresh_prompt_ready_profile
+from .usage_ledger import attribute_usage, enforce_token_quota, TokenQuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def is_learned_rule(preference: Dict[str, Any]) -> bool:
+    """LearnedPreference rows hold either raw feedback entries or rules distilled from them; only rules have a `rule`."""
+    return isinstance(preference, dict) and "rule" in preference
+
+
+async def _load_learning_state(db: AsyncSession, owner_id: int):
+    """Returns (profile row or None, core data, {rule id: (row, rule dict)})."""
+    result = await db.execute(select(models.UserProfile).where(models.UserProfile.owner_id == owner_id))
+    db_profile = result.scalars().first()
+    core_data = json.loads(db_profile.core_data_json) if db_profile and db_profile.core_data_json else {}
+
+    result = await db.execute(select(models.LearnedPreference).where(models.LearnedPreference.owner_id == owner_id))
+    rules = {}
+    for row in result.scalars().all():
+        preference = json.loads(row.preference_data_json)
+        if is_learned_rule(preference):
+            preference.setdefault("id", f"pref_{row.id}")
+            rules[preference["id"]] = (row, preference)
+    return db_profile, core_data, rules
+
+
+async def learn_from_feedback(learner: AgenticLearner, owner_id: int, feedback_items: List[FeedbackItem]) -> None:
+    """
+    One learning pass: runs AgenticLearner on a snapshot of the user's DB profile, then applies the
+    resulting rule add/update/remove ops and core data changes in a single transaction.
+    The LLM call happens outside any transaction, so the changes are applied as a diff against the
+    snapshot: edits the user made to other fields in the meantime are kept.
+    """
+    async with SessionLocal() as db:
+        _, snapshot_core_data, snapshot_rules = await _load_learning_state(db, owner_id)
+    snapshot_profile = {
+        "core_data": snapshot_core_data,
+        "learned_preferences": [rule for _, rule in snapshot_rules.values()],
+    }
+    # The learner mutates rule dicts and core data in place; keep the snapshot intact for the diff
+    working_profile = copy.deepcopy(snapshot_profile)
+    original_rules = {id(rule): rule["id"] for rule in working_profile["learned_preferences"]}
+
+    # Not run through llm_scheduler as a whole: a pass makes several LLM calls (one per comment when the
+    # batched interpretation fails), and each one takes its own slot through the learner's ScheduledLLMClient
+    updated_profile = await asyncio.to_thread(learner.update_user_profile_from_feedback, working_profile, feedback_items)
+
+    async with SessionLocal() as db:
+        db_profile, current_core_data, current_rules = await _load_learning_state(db, owner_id)
+
+        # --- Rules: rows of removed rules are deleted, changed ones rewritten, new ones inserted ---
+        kept_rule_ids = set()
+        for rule in updated_profile.get("learned_preferences", []):
+            rule_id = original_rules.get(id(rule))
+            if rule_id is None: # Added by the learner; its generated id may collide with existing ones
+                rule = {**rule, "id": f"pref_{uuid.uuid4().hex[:12]}"}
+                db.add(models.LearnedPreference(owner_id=owner_id, preference_data_json=json.dumps(rule)))
+                continue
+            kept_rule_ids.add(rule_id)
+            if rule != snapshot_rules[rule_id][1] and rule_id in current_rules:
+                current_rules[rule_id][0].preference_data_json = json.dumps(rule)
+        for rule_id in snapshot_rules:
+            if rule_id not in kept_rule_ids and rule_id in current_rules:
+                await db.delete(current_rules[rule_id][0])
+
+        # --- Core data: only the top-level fields the learner changed ---
+        changed_fields = {key: value for key, value in updated_profile.get("core_data", {}).items()
+                          if snapshot_core_data.get(key) != value}
+        if changed_fields:
+            if db_profile is None:
+                db_profile = models.UserProfile(owner_id=owner_id, core_data_json="{}")
+                db.add(db_profile)
+            db_profile.core_data_json = json.dumps({**current_core_data, **changed_fields})
+
+        await db.flush()
+        stats = await compact_learned_rules(db, owner_id)
+        if stats["duplicates_removed"] or stats["contradictions_resolved"] or stats["similar_rules_deactivated"]:
+            logger.info("Compacted learned rules.", extra={"owner_id": owner_id, **stats})
+
+        await refresh_prompt_ready_profile(db, owner_id)
+        await db.commit()
+
+
+async def compact_learned_rules(db: AsyncSession, owner_id: int) -> Dict[str, Any]:
+    """
+    Deletes the user's learned rules that a newer rule repeats or negates word for word, deactivates those
+    a newer rule only resembles (see preference_compaction.plan_rule_compaction), and returns compaction
+    stats. Raw feedback entries and deactivated rules are kept; they are just never rendered into prompts.
+    The caller refreshes the prompt-ready profile and commits.
+    """
+    result = await db.execute(select(models.LearnedPreference)
+                              .where(models.LearnedPreference.owner_id == owner_id)
+                              .order_by(models.LearnedPreference.id))
+    rows, rules = [], []
+    raw_feedback = 0
+    for row in result.scalars().all():
+        preference = json.loads(row.preference_data_json)
+        if is_learned_rule(preference):
+            rows.append(row)
+            rules.append(preference)
+        else:
+            raw_feedback += 1
+
+    redundant = plan_rule_compaction(rules)
+    dropped = {index: verdict for index, (verdict, exact) in redundant.items() if exact}
+    deactivated = 0
+    for index, (verdict, exact) in redundant.items():
+        if exact:
+            await db.delete(rows[index])
+        else:
+            # A similarity heuristic doesn't get to delete data: the rule stays, out of the prompt
+            rules[index] = {**rules[index], "active": False, "deactivated_as": verdict}
+            rows[index].preference_data_json = json.dumps(rules[index])
+            deactivated += 1
+    remaining = [rule for index, rule in enumerate(rules) if index not in dropped]
+    active = [rule for rule in remaining if rule.get("active", True)]
+    prompt_rules = select_prompt_rules(remaining)
+    return {
+        "rules_before": len(rules),
+        "duplicates_removed": sum(reason == "duplicate" for reason in dropped.values()),
+        "contradictions_resolved": sum(reason == "contradiction" for reason in dropped.values()),
+        "similar_rules_deactivated": deactivated,
+        "rules_after": len(remaining),
+        "inactive_rules": len(remaining) - len(active),
+        "rules_over_budget": len(active) - len(prompt_rules),
+        "raw_feedback_entries": raw_feedback,
+        # Estimated tokens of the rules block: every rule (as rendered before compaction) vs. now
+        "rules_block_tokens_before": token_counter.count(prompt_manager.render_categorized_rules_block(rules)),
+        "rules_block_tokens_after": token_counter.count(prompt_manager.render_categorized_rules_block(prompt_rules)),
+    }
+
+
+class FeedbackLearningWorker:
+    """
+    Background worker that turns submitted feedback into learned rules and core data updates.
+    Feedback for a user is held for FEEDBACK_COALESCE_SECONDS, so a burst of submissions becomes one
+    learning pass; at most FEEDBACK_LEARNING_CONCURRENCY passes run at a time. Feedback arriving while
+    a user's pass runs is learned in a follow-up pass. Queued feedback lives in memory (per API worker).
+    """
+
+    def __init__(self, coalesce_seconds: float = FEEDBACK_COALESCE_SECONDS,
+                 max_concurrency: int = FEEDBACK_LEARNING_CONCURRENCY):
+        self.coalesce_seconds = coalesce_seconds
+        self.max_concurrency = max_concurrency
+        self.learner: Optional[AgenticLearner] = None
+        self._pending: Dict[int, List[FeedbackItem]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self, learner: AgenticLearner) -> None:
+        """`learner` should use a ScheduledLLMClient, so its LLM calls go through llm_scheduler one by one."""
+        self.learner = learner
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def enqueue(self, owner_id: int, feedback_items: List[FeedbackItem]) -> None:
+        """Queues feedback for learning. Returns immediately."""
+        items = [item for item in feedback_items if item.comment]
+        if not items or self.learner is None:
+            return
+        self._pending.setdefault(owner_id, []).extend(items)
+        if owner_id not in self._tasks:
+            self._tasks[owner_id] = asyncio.create_task(self._run_user(owner_id))
+
+    async def _run_user(self, owner_id: int) -> None:
+        try:
+            while self._pending.get(owner_id):
+                await asyncio.sleep(self.coalesce_seconds)
+                async with self._semaphore:
+                    items = self._pending.pop(owner_id, [])
+                    if not items:
+                        continue
+                    try:
+                        attribute_usage(owner_id)
+                        async with SessionLocal() as db:
+                            user = await db.get(models.User, owner_id)
+                            if user is not None:
+                                await enforce_token_quota(db, user)
+                        await learn_from_feedback(self.learner, owner_id, items)
+                        logger.info("Learned from %d feedback item(s).", len(items), extra={"owner_id": owner_id})
+                    except TokenQuotaExceeded as e:
+                        # The feedback stays stored as raw LearnedPreference rows
+                        logger.info("Skipped feedback learning: %s", e, extra={"owner_id": owner_id})
+                    except Exception:
+                        logger.exception("Feedback learning failed.", extra={"owner_id": owner_id})
+        finally:
+            self._tasks.pop(owner_id, None)
+
+    async def stop(self) -> None:
+        """Cancels pending passes (their feedback stays stored as raw LearnedPreference rows)."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+
+
+feedback_learning_worker = FeedbackLearningWorker()
@@ -1,15 +1,17 @@
 import json
+import logging
 from typing import Dict, Any, List
 from ..utils.file_manager import load_json_data, save_json_data
 from ..schemas.feedback import ResumeFeedback, FeedbackItem
 from ..core_ai.agentic_learner import AgenticLearner
-from ..core_ai.llm_client import LLMClient # Need LLMClient to initialize AgenticLearner
+from ..core_ai.client_registry import clients
+
+logger = logging.getLogger(__name__)
 
 USER_PROFILE_FILE = "user_profile.json"
 
-# Initialize LLMClient and AgenticLearner globally for robustness
-llm_client_instance = LLMClient()
-agentic_learner_instance = AgenticLearner(llm_client_instance)
+# The AgenticLearner uses the app's shared LLM client (created lazily, so importing this module is cheap)
+agentic_learner_instance = AgenticLearner(clients.llm())
 
 def process_feedback_and_update_preferences(feedback: ResumeFeedback) -> None:
     """
@@ -25,4 +27,5 @@ def process_feedback_and_update_preferences(feedback: ResumeFeedback) -> None:
     )
 
     save_json_data(USER_PROFILE_FILE, updated_profile)
-    print(f"User profile updated based on feedback. New profile:\n{json.dumps(updated_profile, indent=2)}")
\ No newline at end of file
+    logger.info("User profile updated based on feedback.")
+    logger.debug("Updated user profile.", extra={"profile": json.dumps(updated_profile)})
\ No newline at end of file
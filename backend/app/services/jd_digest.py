@@ -0,0 +1,194 @@
+# backend/app/services/jd_digest.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update, func
+
+from ..config import JD_DIGEST_MIN_TOKENS
+from ..core_ai.llm_scheduler import llm_scheduler
+from ..core_ai.prompt_budget import token_counter
+from ..core_ai.prompt_manager import PromptManager, JD_DIGEST_PROMPT_VERSION
+from ..db import models
+from ..db.database import SessionLocal
+from ..utils.metrics import record_cache_lookup
+from ..utils.text_processing import normalize_extracted_text, clean_llm_output
+from .resume_storage import insert_ignore_conflicts
+
+logger = logging.getLogger(__name__)
+
+prompt_manager = PromptManager()
+
+# Section headings whose content never helps tailoring a resume (matched against the whole heading, alone
+# or combined as in "Benefits & Perks"), and the ones that end such a section
+_BOILERPLATE_HEADING = (
+    r"(?:benefits|perks|what we offer|what you(?:'|’)?ll get|why (?:join|work (?:at|for|with)) [\w .&'-]+"
+    r"|about (?:us|the company|the team)|who we are|our (?:benefits|culture|values|mission|story)"
+    r"|compensation|salary|pay range|equal (?:employment )?opportunity(?: employer)?|eeo|diversity(?: and inclusion)?"
+    r"|how to apply|application process|privacy(?: notice| policy)?|disclaimer|life at [\w .&'-]+)"
+)
+BOILERPLATE_HEADING_RE = re.compile(
+    rf"{_BOILERPLATE_HEADING}(?:\s*(?:&|and|/|,)\s*{_BOILERPLATE_HEADING})*[.!?]?", re.IGNORECASE)
+CONTENT_HEADING_RE = re.compile(
+    r"(?:requirement|qualification|responsibilit|what you(?:'|’)?ll do|what you will do|about the (?:role|job|position)"
+    r"|the role|your role|skill|nice to have|preferred|must have|you have|you will|who you are|experience|stack|tools"
+    r"|technolog|duties|job description)", re.IGNORECASE)
+# Legal / EEO sentences that show up outside any heading
+BOILERPLATE_LINE_RE = re.compile(
+    r"equal opportunity|without regard to|national origin|sexual orientation|gender identity|veteran status"
+    r"|reasonable accommodation|e-verify|background check|privacy (?:policy|notice)|right to work", re.IGNORECASE)
+BULLET_RE = re.compile(r"^[•●▪‣⁃*·]\s*")
+
+
+def jd_fingerprint(job_description: str) -> str:
+    """SHA-256 of the normalised job description: the same posting pasted by different users shares a digest."""
+    return hashlib.sha256(normalize_extracted_text(job_description).encode("utf-8")).hexdigest()
+
+
+def normalize_job_description(job_description: str) -> str:
+    """NFKC, one space between words, "-" bullets, at most one blank line in a row."""
+    lines = []
+    for line in unicodedata.normalize("NFKC", job_description).splitlines():
+        line = BULLET_RE.sub("- ", " ".join(line.split()))
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _is_heading(line: str) -> bool:
+    # Only explicit headings: a short unbulleted line such as "Privacy engineering background" is often a requirement
+    text = line.lstrip("#").strip()
+    return bool(text) and len(text) <= 60 and not line.startswith("- ") and (
+        line.startswith("#") or text.endswith(":") or text.isupper()
+    )
+
+
+def strip_boilerplate(job_description: str) -> str:
+    """
+    Drops benefits, company marketing, salary and legal/EEO sections and sentences from a normalised
+    job description. A boilerplate section lasts until the next heading that introduces actual job content.
+    """
+    kept: List[str] = []
+    skipping = False
+    for line in job_description.splitlines():
+        if _is_heading(line):
+            heading = line.lstrip("#").strip().rstrip(":")
+            if BOILERPLATE_HEADING_RE.fullmatch(heading):
+                skipping = True
+                continue
+            if CONTENT_HEADING_RE.search(heading) or line.startswith("#") or line.endswith(":"):
+                skipping = False
+        if skipping or BOILERPLATE_LINE_RE.search(line):
+            continue
+        if line or (kept and kept[-1]):
+            kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def render_digest(digest: Dict[str, Any]) -> str:
+    """Compact text form of the LLM digest, as it goes into prompts."""
+    lines = []
+    role = " / ".join(str(digest[key]) for key in ("title", "seniority") if digest.get(key))
+    if role:
+        lines.append(f"Role: {role}")
+    for key, label in (("must_have", "Must have"), ("nice_to_have", "Nice to have"),
+                       ("responsibilities", "Responsibilities"), ("keywords", "Keywords")):
+        items = [str(item) for item in digest.get(key) or [] if item]
+        if items:
+            lines.append(f"{label}: {'; '.join(items)}")
+    return "\n".join(lines)
+
+
+async def _load_cached_digest(jd_hash: str) -> Optional[str]:
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(models.JobDescriptionDigest.digest_text).where(
+                models.JobDescriptionDigest.jd_hash == jd_hash,
+                models.JobDescriptionDigest.prompt_version == JD_DIGEST_PROMPT_VERSION,
+            )
+        )
+        digest_text = result.scalar()
+        record_cache_lookup("jd_digest", digest_text is not None)
+        if digest_text is not None:
+            await db.execute(
+                update(models.JobDescriptionDigest)
+                .where(models.JobDescriptionDigest.jd_hash == jd_hash)
+                .values(hit_count=models.JobDescriptionDigest.hit_count + 1, last_used_at=func.now())
+            )
+            await db.commit()
+        return digest_text
+
+
+async def _remember_digest(jd_hash: str, digest_text: str, digest: Optional[Dict[str, Any]], source_tokens: int) -> None:
+    values = {
+        "digest_text": digest_text,
+        "digest_json": json.dumps(digest) if digest is not None else None,
+        "prompt_version": JD_DIGEST_PROMPT_VERSION,
+        "source_tokens": source_tokens,
+        "digest_tokens": token_counter.count(digest_text),
+    }
+    async with SessionLocal() as db:
+        await insert_ignore_conflicts(db, models.JobDescriptionDigest, {"jd_hash": jd_hash, **values})
+        # The row may predate the current digest prompt
+        await db.execute(
+            update(models.JobDescriptionDigest)
+            .where(models.JobDescriptionDigest.jd_hash == jd_hash,
+                   models.JobDescriptionDigest.prompt_version != JD_DIGEST_PROMPT_VERSION)
+            .values(**values)
+        )
+        await db.commit()
+
+
+async def _build_digest(llm_client, jd_hash: str, job_description: str) -> str:
+    cleaned = strip_boilerplate(normalize_job_description(job_description))
+    if not cleaned: # Nothing but boilerplate (or misdetected); better the posting than nothing
+        cleaned = normalize_job_description(job_description)
+    source_tokens = token_counter.count(job_description)
+    if token_counter.count(cleaned) < JD_DIGEST_MIN_TOKENS:
+        # Short enough that an LLM call would cost more than it saves
+        await _remember_digest(jd_hash, cleaned, None, source_tokens)
+        return cleaned
+
+    raw_digest = await llm_scheduler.run(llm_client.generate_text, prompt_manager.generate_jd_digest_prompt(cleaned),
+                                         temperature=0.1, call_type="jd_digest")
+    try:
+        digest = json.loads(clean_llm_output(raw_digest))
+        digest_text = render_digest(digest) if isinstance(digest, dict) else ""
+    except json.JSONDecodeError as e:
+        logger.warning("Error parsing job description digest JSON: %s", e, extra={"raw_output": raw_digest})
+        digest_text = ""
+    if not digest_text:
+        return cleaned # Not cached: the next request retries the digest
+    await _remember_digest(jd_hash, digest_text, digest, source_tokens)
+    return digest_text
+
+
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+
+async def digest_job_description(llm_client, job_description: Optional[str]) -> str:
+    """
+    Returns the digest to put into prompts in place of the raw job description: normalised, stripped of
+    boilerplate and, for long postings, distilled by the LLM into requirements and keywords. Digests are
+    cached by JD hash across users; concurrent requests for the same new posting share one LLM call.
+    Uses its own short-lived sessions, so the LLM call never holds the caller's database connection.
+    """
+    if not job_description or not job_description.strip():
+        return ""
+    jd_hash = jd_fingerprint(job_description)
+
+    digest_text = await _load_cached_digest(jd_hash)
+    if digest_text is not None:
+        return digest_text
+
+    task = _inflight.get(jd_hash)
+    if task is None:
+        task = asyncio.create_task(_build_digest(llm_client, jd_hash, job_description))
+        _inflight[jd_hash] = task
+        task.add_done_callback(lambda _: _inflight.pop(jd_hash, None))
+    return await asyncio.shield(task) # A cancelled request must not cancel the digest others wait for
@@ -0,0 +1,178 @@
+# backend/app/services/profile_cache.py
+
+import json
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import models
+from ..config import PROFILE_CACHE_MAX_USERS
+from ..core_ai.prompt_manager import PromptManager, PROMPT_FRAGMENTS_VERSION
+from ..utils.metrics import record_cache_lookup
+from ..utils.text_processing import clean_core_data_for_llm
+from ..utils.tracing import traced, annotate
+
+prompt_manager = PromptManager()
+
+
+class CachedProfile:
+    """
+    Decoded core data and learned preferences of one user, tagged with the profile revision,
+    together with the prompt-ready view (cleaned core data and rendered prompt fragments).
+    """
+
+    def __init__(self, owner_id: int, revision: Optional[int], core_data: Dict[str, Any],
+                 learned_preferences: List[Dict[str, Any]], has_profile: bool = True,
+                 cleaned_core_data: Optional[Dict[str, Any]] = None,
+                 prompt_fragments: Optional[Dict[str, Any]] = None):
+        self.owner_id = owner_id
+        self.revision = revision
+        self.core_data = core_data
+        self.learned_preferences = learned_preferences
+        self.has_profile = has_profile # False if the user has no profile row / empty core data
+        if cleaned_core_data is None or prompt_fragments is None:
+            cleaned_core_data, prompt_fragments = build_prompt_ready_profile(core_data, learned_preferences)
+        self.cleaned_core_data = cleaned_core_data
+        self.prompt_fragments = prompt_fragments
+
+    @property
+    def prompt_rules(self) -> List[Dict[str, Any]]:
+        """The compacted learned rules to put into prompts."""
+        return self.prompt_fragments.get("prompt_rules", [])
+
+    @property
+    def etag(self) -> str:
+        return f'"profile-{self.owner_id}-{self.revision}"'
+
+
+class ProfileCache:
+    """
+    Bounded LRU cache of decoded user profiles, keyed by owner_id.
+    Entries are validated against `UserProfile.revision`, so a write made by another worker
+    is picked up on the next read even though only the local entry gets invalidated.
+    Cached dicts are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_MAX_USERS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CachedProfile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, owner_id: int, revision: Optional[int]) -> Optional[CachedProfile]:
+        entry = self._entries.get(owner_id)
+        if entry is None or revision is None or entry.revision != revision:
+            self.misses += 1
+            record_cache_lookup("profile", False)
+            return None
+        self._entries.move_to_end(owner_id)
+        self.hits += 1
+        record_cache_lookup("profile", True)
+        return entry
+
+    def put(self, entry: CachedProfile) -> None:
+        self._entries[entry.owner_id] = entry
+        self._entries.move_to_end(entry.owner_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, owner_id: int) -> None:
+        self._entries.pop(owner_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+profile_cache = ProfileCache()
+
+
+@traced("profile.load")
+async def load_user_profile(db: AsyncSession, owner_id: int) -> CachedProfile:
+    """
+    Returns the decoded profile of a user. A cache hit costs a single indexed revision lookup
+    instead of loading the profile and every LearnedPreference row and decoding their JSON.
+    """
+    result = await db.execute(select(models.UserProfile.revision).where(models.UserProfile.owner_id == owner_id))
+    revision = result.scalar()
+
+    cached = profile_cache.get(owner_id, revision)
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(models.UserProfile).where(models.UserProfile.owner_id == owner_id))
+    db_profile = result.scalars().first()
+    if not db_profile or not db_profile.core_data_json:
+        # Nothing worth caching: no profile yet (keeps the previous behaviour of returning no preferences)
+        return CachedProfile(owner_id, revision, {}, [], has_profile=False)
+
+    result = await db.execute(select(models.LearnedPreference).where(
+        models.LearnedPreference.owner_id == owner_id))
+    db_preferences = result.scalars().all()
+
+    # Rows written before the prompt-ready view existed (or with outdated fragments) are rendered here,
+    # in memory only; the next profile write persists them.
+    cleaned_core_data, prompt_fragments = None, None
+    if db_profile.cleaned_core_data_json and db_profile.prompt_fragments_json:
+        prompt_fragments = json.loads(db_profile.prompt_fragments_json)
+        if prompt_fragments.get("version") == PROMPT_FRAGMENTS_VERSION:
+            cleaned_core_data = json.loads(db_profile.cleaned_core_data_json)
+        else:
+            prompt_fragments = None
+
+    entry = CachedProfile(
+        owner_id=owner_id,
+        revision=db_profile.revision,
+        core_data=json.loads(db_profile.core_data_json),
+        learned_preferences=[json.loads(p.preference_data_json) for p in db_preferences],
+        cleaned_core_data=cleaned_core_data,
+        prompt_fragments=prompt_fragments,
+    )
+    profile_cache.put(entry)
+    return entry
+
+
+@traced("profile.prepare")
+def build_prompt_ready_profile(core_data: Dict[str, Any],
+                               learned_preferences: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Returns the placeholder-cleaned core data and the resume prompt fragments rendered from it."""
+    cleaned_core_data = clean_core_data_for_llm(core_data)
+    prompt_fragments = prompt_manager.render_profile_fragments(cleaned_core_data, learned_preferences)
+    return cleaned_core_data, prompt_fragments
+
+
+async def refresh_prompt_ready_profile(db: AsyncSession, owner_id: int) -> None:
+    """
+    Recomputes and stores the prompt-ready view of a user's profile, then bumps its revision.
+    Call this from every write to a user's profile or learned preferences, before committing,
+    so generation only has to concatenate the stored fragments with the request.
+    """
+    await db.flush() # Make pending profile/preference changes visible to the queries below
+
+    result = await db.execute(select(models.UserProfile).where(models.UserProfile.owner_id == owner_id))
+    db_profile = result.scalars().first()
+    if db_profile is not None:
+        result = await db.execute(select(models.LearnedPreference).where(
+            models.LearnedPreference.owner_id == owner_id))
+        learned_preferences = [json.loads(p.preference_data_json) for p in result.scalars().all()]
+        core_data = json.loads(db_profile.core_data_json) if db_profile.core_data_json else {}
+
+        cleaned_core_data, prompt_fragments = build_prompt_ready_profile(core_data, learned_preferences)
+        db_profile.cleaned_core_data_json = json.dumps(cleaned_core_data)
+        db_profile.prompt_fragments_json = json.dumps(prompt_fragments)
+
+    await bump_profile_revision(db, owner_id)
+
+
+async def bump_profile_revision(db: AsyncSession, owner_id: int) -> None:
+    """
+    Increments the profile revision inside the caller's transaction and drops the local cache entry.
+    """
+    await db.execute(
+        update(models.UserProfile)
+        .where(models.UserProfile.owner_id == owner_id)
+        .values(revision=models.UserProfile.revision + 1)
+    )
+    profile_cache.invalidate(owner_id)
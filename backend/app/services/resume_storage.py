@@ -0,0 +1,338 @@
+# backend/app/services/resume_storage.py
+
+import hashlib
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterable
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import models
+from ..schemas.critique import ResumeCritique
+from ..schemas.feedback import ResumeContentResponse
+from ..config import (
+    RESUME_COMPRESSION_CODEC, RESUME_COMPRESSION_MIN_BYTES,
+    RESUME_DELTA_ENCODING, RESUME_KEYFRAME_INTERVAL, RESUME_CONTENT_CACHE_SIZE
+)
+from ..utils.metrics import record_cache_lookup
+from ..utils.text_processing import get_line_delta, apply_line_delta
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard # Optional, only needed for RESUME_COMPRESSION_CODEC=zstd or reading zstd blobs
+except ImportError:
+    zstandard = None
+
+# Every compressed blob starts with a one-byte codec marker, so the codec can be changed
+# without rewriting existing rows.
+_ZLIB_MARKER = b"z"
+_ZSTD_MARKER = b"s"
+
+
+def compress_text(text: str, codec: str = RESUME_COMPRESSION_CODEC) -> bytes:
+    """Compresses a string into a marker-prefixed blob."""
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("RESUME_COMPRESSION_CODEC=zstd requires the 'zstandard' package.")
+        return _ZSTD_MARKER + zstandard.ZstdCompressor(level=10).compress(raw)
+    return _ZLIB_MARKER + zlib.compress(raw, 9)
+
+
+def decompress_text(blob: bytes) -> str:
+    """Inverse of compress_text."""
+    marker, payload = blob[:1], blob[1:]
+    if marker == _ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Found a zstd-compressed blob but the 'zstandard' package is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+    if marker == _ZLIB_MARKER:
+        return zlib.decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown compression marker: {marker!r}")
+
+
+def maybe_compress(text: Optional[str]) -> Optional[bytes]:
+    """Returns a compressed blob for texts large enough to benefit, None otherwise."""
+    if text is None or len(text) < RESUME_COMPRESSION_MIN_BYTES:
+        return None
+    return compress_text(text)
+
+
+def canonical_json(data: Any) -> str:
+    """Stable JSON encoding, so equal data always hashes to the same snapshot."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def snapshot_hash(data: Any) -> str:
+    return hashlib.sha256(canonical_json(data).encode("utf-8")).hexdigest()
+
+
+class SnapshotCache:
+    """Small LRU of decoded snapshots. Snapshots are immutable, so entries never need invalidation."""
+
+    def __init__(self, name: str, max_entries: int = 512):
+        self.name = name # Label in the cache metrics
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._entries:
+            record_cache_lookup(self.name, False)
+            return None
+        record_cache_lookup(self.name, True)
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+snapshot_cache = SnapshotCache("snapshot")
+# Reconstructed resume contents by version id. Versions are never edited, so entries stay valid.
+content_cache = SnapshotCache("resume_content", max_entries=RESUME_CONTENT_CACHE_SIZE)
+
+
+async def insert_ignore_conflicts(db: AsyncSession, model, values: Dict[str, Any]) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING for SQLite and PostgreSQL."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    await db.execute(dialect_insert(model).values(**values).on_conflict_do_nothing())
+
+
+async def store_snapshot(db: AsyncSession, snapshot_model, data: Any) -> str:
+    """
+    Stores `data` in a content-addressed snapshot table (CoreDataSnapshot / PreferenceSetSnapshot)
+    unless an identical snapshot already exists, and returns its hash.
+    """
+    digest = snapshot_hash(data)
+
+    # Always checked against the table (not the cache): a cached snapshot may come from a rolled back transaction.
+    result = await db.execute(select(snapshot_model.hash).where(snapshot_model.hash == digest))
+    if result.scalar() is None:
+        # A concurrent request (or worker) may insert the same snapshot first; that's fine.
+        await insert_ignore_conflicts(
+            db, snapshot_model, {"hash": digest, "data_blob": compress_text(canonical_json(data), codec="zlib")})
+    snapshot_cache.put(f"{snapshot_model.__tablename__}:{digest}", data)
+    return digest
+
+
+async def load_snapshots(db: AsyncSession, snapshot_model, hashes: Iterable[str]) -> Dict[str, Any]:
+    """Loads and decodes several snapshots in one query (cached ones are not re-queried)."""
+    decoded: Dict[str, Any] = {}
+    missing = []
+    for digest in set(h for h in hashes if h):
+        cached = snapshot_cache.get(f"{snapshot_model.__tablename__}:{digest}")
+        if cached is not None:
+            decoded[digest] = cached
+        else:
+            missing.append(digest)
+
+    if missing:
+        result = await db.execute(select(snapshot_model).where(snapshot_model.hash.in_(missing)))
+        for snapshot in result.scalars().all():
+            data = json.loads(decompress_text(snapshot.data_blob))
+            snapshot_cache.put(f"{snapshot_model.__tablename__}:{snapshot.hash}", data)
+            decoded[snapshot.hash] = data
+    return decoded
+
+
+async def build_resume_version(db: AsyncSession, owner_id: int, resume_uuid: str, version_name: str, content: str,
+                               core_data_used: Dict[str, Any], learned_preferences_used: List[Dict[str, Any]],
+                               target_job_description_used: Optional[str],
+                               critique_data: Optional[Dict[str, Any]],
+                               parent: Optional[models.ResumeVersion] = None) -> models.ResumeVersion:
+    """
+    Creates (but does not add/commit) a ResumeVersion in the compact storage format.
+    With a `parent` version the content may be stored as a delta against it (see store_content_delta).
+    """
+    rv = models.ResumeVersion(owner_id=owner_id, resume_uuid=resume_uuid, version_name=version_name)
+    critique_json = json.dumps(critique_data) if critique_data is not None else None
+    await store_compact(db, rv, content, core_data_used, learned_preferences_used,
+                        target_job_description_used, critique_json)
+    if parent is not None and RESUME_DELTA_ENCODING:
+        await store_content_delta(db, rv, content, parent)
+    return rv
+
+
+async def store_content_delta(db: AsyncSession, rv: models.ResumeVersion, content: str,
+                              parent: models.ResumeVersion) -> None:
+    """
+    Replaces the full content of `rv` with a compressed line delta against `parent`, unless the parent chain
+    already holds RESUME_KEYFRAME_INTERVAL deltas (bounding reconstruction cost) or the delta isn't smaller.
+    """
+    if (parent.delta_depth or 0) + 1 >= RESUME_KEYFRAME_INTERVAL:
+        return # Keep this version as a full keyframe
+
+    parent_content = (await reconstruct_contents(db, [parent]))[parent.id]
+    delta_blob = compress_text(json.dumps(get_line_delta(parent_content, content), separators=(",", ":")))
+    full_size = len(rv.content_blob) if rv.content_blob is not None else len(rv.content.encode("utf-8"))
+    if len(delta_blob) >= full_size:
+        return
+
+    rv.parent_version_id = parent.id
+    rv.delta_depth = (parent.delta_depth or 0) + 1
+    rv.content_delta_blob = delta_blob
+    rv.content = ""
+    rv.content_blob = None
+
+
+async def store_compact(db: AsyncSession, rv: models.ResumeVersion, content: str,
+                        core_data_used: Dict[str, Any], learned_preferences_used: List[Dict[str, Any]],
+                        target_job_description_used: Optional[str], critique_json: Optional[str]) -> None:
+    """Writes the given data onto `rv` in the compact format (snapshot references + compressed text)."""
+    content_blob = maybe_compress(content)
+    jd_blob = maybe_compress(target_job_description_used)
+    critique_blob = maybe_compress(critique_json)
+
+    rv.core_data_hash = await store_snapshot(db, models.CoreDataSnapshot, core_data_used)
+    rv.learned_preferences_hash = await store_snapshot(db, models.PreferenceSetSnapshot, learned_preferences_used)
+    rv.core_data_used_json = None
+    rv.learned_preferences_used_json = None
+    rv.content = "" if content_blob is not None else content # `content` is NOT NULL
+    rv.content_blob = content_blob
+    rv.target_job_description_used = None if jd_blob is not None else target_job_description_used
+    rv.target_job_description_blob = jd_blob
+    rv.critique_data_json = None if critique_blob is not None else critique_json
+    rv.critique_data_blob = critique_blob
+
+
+def cache_content(rv: models.ResumeVersion, content: str) -> None:
+    """Seeds the content cache after saving a version, so the next delta against it needs no reconstruction."""
+    content_cache.put(str(rv.id), content)
+
+
+async def latest_resume_version(db: AsyncSession, owner_id: int) -> Optional[models.ResumeVersion]:
+    """The user's most recent version: the parent candidate for delta-encoding the next one."""
+    result = await db.execute(
+        select(models.ResumeVersion)
+        .where(models.ResumeVersion.owner_id == owner_id)
+        .order_by(models.ResumeVersion.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+def read_keyframe_content(rv: models.ResumeVersion) -> str:
+    """Content of a version that is stored in full (plain or compressed), i.e. not as a delta."""
+    return decompress_text(rv.content_blob) if rv.content_blob is not None else rv.content
+
+
+async def reconstruct_contents(db: AsyncSession, versions: List[models.ResumeVersion]) -> Dict[int, str]:
+    """
+    Returns {version id: full content} for the given versions, applying deltas from the nearest keyframe
+    or cached ancestor. Parents already in `versions` are reused; missing ones are loaded by id.
+    Every reconstructed content is cached, so reading a history newest-first touches each delta once.
+    """
+    known = {rv.id: rv for rv in versions}
+    contents: Dict[int, str] = {}
+    for rv in versions:
+        chain = []
+        current = rv
+        while True:
+            cached = content_cache.get(str(current.id)) if current.id is not None else None
+            if cached is not None:
+                base = cached
+                break
+            if current.content_delta_blob is None:
+                base = read_keyframe_content(current)
+                if current.id is not None:
+                    content_cache.put(str(current.id), base)
+                break
+            chain.append(current)
+            parent = known.get(current.parent_version_id)
+            if parent is None:
+                parent = await db.get(models.ResumeVersion, current.parent_version_id)
+                known[parent.id] = parent
+            current = parent
+
+        for delta_version in reversed(chain):
+            base = apply_line_delta(base, json.loads(decompress_text(delta_version.content_delta_blob)))
+            content_cache.put(str(delta_version.id), base)
+        contents[rv.id] = base
+    return contents
+
+
+def read_target_job_description(rv: models.ResumeVersion) -> Optional[str]:
+    if rv.target_job_description_blob is not None:
+        return decompress_text(rv.target_job_description_blob)
+    return rv.target_job_description_used
+
+
+def read_critique_json(rv: models.ResumeVersion) -> Optional[str]:
+    if rv.critique_data_blob is not None:
+        return decompress_text(rv.critique_data_blob)
+    return rv.critique_data_json
+
+
+async def read_resume_versions(db: AsyncSession, versions: List[models.ResumeVersion]) -> List[Dict[str, Any]]:
+    """
+    Decodes ResumeVersion rows (compact or legacy format) into plain dicts with
+    content, core_data_used, learned_preferences_used, target_job_description_used and critique_json.
+    Snapshots are fetched in one batch for the whole list.
+    """
+    core_snapshots = await load_snapshots(db, models.CoreDataSnapshot, (rv.core_data_hash for rv in versions))
+    preference_snapshots = await load_snapshots(
+        db, models.PreferenceSetSnapshot, (rv.learned_preferences_hash for rv in versions))
+    contents = await reconstruct_contents(db, versions)
+
+    decoded = []
+    for rv in versions:
+        if rv.core_data_hash:
+            core_data_used = core_snapshots.get(rv.core_data_hash, {})
+        else:
+            core_data_used = json.loads(rv.core_data_used_json) if rv.core_data_used_json else {}
+        if rv.learned_preferences_hash:
+            learned_preferences_used = preference_snapshots.get(rv.learned_preferences_hash, [])
+        else:
+            learned_preferences_used = json.loads(
+                rv.learned_preferences_used_json) if rv.learned_preferences_used_json else []
+
+        decoded.append({
+            "content": contents[rv.id],
+            "core_data_used": core_data_used,
+            "learned_preferences_used": learned_preferences_used,
+            "target_job_description_used": read_target_job_description(rv),
+            "critique_json": read_critique_json(rv),
+        })
+    return decoded
+
+
+def resume_version_responses(versions: List[models.ResumeVersion],
+                             decoded_versions: List[Dict[str, Any]]) -> List[ResumeContentResponse]:
+    """/resume-versions/ response items for rows decoded by read_resume_versions."""
+    responses = []
+    for rv, decoded in zip(versions, decoded_versions):
+        critique = None
+        if decoded["critique_json"]:
+            try:
+                critique = ResumeCritique(**json.loads(decoded["critique_json"]))
+            except (json.JSONDecodeError, ValidationError):
+                logger.warning("Could not parse critique for resume version %s", rv.id)
+
+        responses.append(
+            ResumeContentResponse(
+                id=str(rv.id),
+                version_name=rv.version_name,
+                content=decoded["content"],
+                timestamp=rv.timestamp.isoformat() + 'Z',
+                feedback_summary="Loaded from database.",
+                core_data_used=decoded["core_data_used"],
+                learned_preferences_used=decoded["learned_preferences_used"],
+                target_job_description_used=decoded["target_job_description_used"],
+                critique=critique
+            )
+        )
+    return responses
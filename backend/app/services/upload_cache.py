@@ -0,0 +1,83 @@
+# backend/app/services/upload_cache.py
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import models
+from ..core_ai.prompt_manager import EXTRACTION_PROMPT_VERSION
+from ..utils.metrics import record_cache_lookup
+from ..utils.text_processing import normalize_extracted_text
+from .resume_storage import compress_text, insert_ignore_conflicts
+
+
+def text_fingerprint(extracted_text: str) -> str:
+    """SHA-256 of the normalised extracted text (the second cache key, for re-exports of the same resume)."""
+    return hashlib.sha256(normalize_extracted_text(extracted_text).encode("utf-8")).hexdigest()
+
+
+async def _mark_used(db: AsyncSession, text_hash: str) -> None:
+    await db.execute(
+        update(models.ResumeExtraction)
+        .where(models.ResumeExtraction.text_hash == text_hash)
+        .values(hit_count=models.ResumeExtraction.hit_count + 1, last_used_at=func.now())
+    )
+
+
+async def find_extraction_by_file(db: AsyncSession, file_hash: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached structured extraction for an exact re-upload, or None."""
+    result = await db.execute(
+        select(models.ResumeExtraction.text_hash, models.ResumeExtraction.extraction_json)
+        .join(models.UploadFingerprint, models.UploadFingerprint.text_hash == models.ResumeExtraction.text_hash)
+        .where(
+            models.UploadFingerprint.file_hash == file_hash,
+            models.ResumeExtraction.prompt_version == EXTRACTION_PROMPT_VERSION,
+            models.ResumeExtraction.extraction_json.is_not(None),
+        )
+    )
+    row = result.first()
+    record_cache_lookup("upload_file", row is not None)
+    if row is None:
+        return None
+    await _mark_used(db, row.text_hash)
+    return json.loads(row.extraction_json)
+
+
+async def find_extraction_by_text(db: AsyncSession, text_hash: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached structured extraction for a different file with the same (normalised) text, or None."""
+    result = await db.execute(
+        select(models.ResumeExtraction.extraction_json).where(
+            models.ResumeExtraction.text_hash == text_hash,
+            models.ResumeExtraction.prompt_version == EXTRACTION_PROMPT_VERSION,
+            models.ResumeExtraction.extraction_json.is_not(None),
+        )
+    )
+    extraction_json = result.scalar()
+    record_cache_lookup("upload_text", extraction_json is not None)
+    if extraction_json is None:
+        return None
+    await _mark_used(db, text_hash)
+    return json.loads(extraction_json)
+
+
+async def remember_extraction(db: AsyncSession, file_hash: str, text_hash: str,
+                              extracted_text: str, extraction: Dict[str, Any]) -> None:
+    """Caches an extraction under both keys. Safe to call concurrently for the same file."""
+    extraction_json = json.dumps(extraction)
+    await insert_ignore_conflicts(db, models.ResumeExtraction, {
+        "text_hash": text_hash,
+        "extracted_text_blob": compress_text(extracted_text),
+        "extraction_json": extraction_json,
+        "prompt_version": EXTRACTION_PROMPT_VERSION,
+    })
+    # The row may predate the current extraction prompt; keep it in sync with what we just extracted
+    await db.execute(
+        update(models.ResumeExtraction)
+        .where(models.ResumeExtraction.text_hash == text_hash,
+               models.ResumeExtraction.prompt_version != EXTRACTION_PROMPT_VERSION)
+        .values(extraction_json=extraction_json, prompt_version=EXTRACTION_PROMPT_VERSION)
+    )
+    await insert_ignore_conflicts(db, models.UploadFingerprint, {"file_hash": file_hash, "text_hash": text_hash})
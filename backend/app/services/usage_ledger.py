@@ -0,0 +1,247 @@
+# backend/app/services/usage_ledger.py
+
+import asyncio
+import contextvars
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import (
+    LLM_USAGE_FLUSH_SECONDS, LLM_USAGE_BATCH_SIZE, LLM_DAILY_TOKEN_QUOTA,
+    LLM_PROMPT_COST_PER_MILLION, LLM_RESPONSE_COST_PER_MILLION,
+)
+from ..db import models
+from ..db.database import SessionLocal
+from ..utils.tracing import current_request_id
+
+logger = logging.getLogger(__name__)
+
+# User whose request (or background job) is making LLM calls; copied into worker threads and tasks
+_usage_owner: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("usage_owner", default=None)
+
+
+def attribute_usage(owner_id: Optional[int]) -> None:
+    """Charges the LLM calls made from here on, in the current request or task, to `owner_id`."""
+    _usage_owner.set(owner_id)
+
+
+class TokenQuotaExceeded(Exception):
+    """The user has used up their daily LLM token quota."""
+
+    def __init__(self, quota: int, retry_after_seconds: int):
+        super().__init__(f"Daily quota of {quota} LLM tokens used up. It resets at 00:00 UTC.")
+        self.quota = quota
+        self.retry_after_seconds = retry_after_seconds
+
+
+def call_cost(prompt_tokens: int, response_tokens: int) -> float:
+    return (prompt_tokens * LLM_PROMPT_COST_PER_MILLION + response_tokens * LLM_RESPONSE_COST_PER_MILLION) / 1_000_000
+
+
+def start_of_day(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class UsageLedger:
+    """
+    Records every LLM call (tokens, latency, model, call type, owner) into the llm_usage table.
+    record() only appends to an in-memory queue, so it is safe to call from worker threads and costs
+    nothing on the request path; a background task writes the queue in one INSERT per batch every
+    LLM_USAGE_FLUSH_SECONDS, or sooner once LLM_USAGE_BATCH_SIZE calls are pending. Per API worker.
+    """
+
+    def __init__(self, flush_seconds: float = LLM_USAGE_FLUSH_SECONDS, batch_size: int = LLM_USAGE_BATCH_SIZE):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        # ("usage", row) and ("link", request_id, resume_version_id) ops, written in order
+        self._pending: deque = deque() # append/popleft are thread-safe
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, call_type: str, model: str, prompt_tokens: int, response_tokens: int,
+               latency_ms: float, outcome: str, tokens_estimated: bool = False) -> None:
+        self._pending.append(("usage", {
+            "owner_id": _usage_owner.get(),
+            "request_id": current_request_id(),
+            "call_type": call_type,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "tokens_estimated": tokens_estimated,
+            "latency_ms": round(latency_ms, 3),
+            "outcome": outcome,
+            "cost_usd": call_cost(prompt_tokens, response_tokens),
+            "created_at": datetime.now(timezone.utc),
+        }))
+        if len(self._pending) >= self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def link_resume_version(self, request_id: Optional[str], resume_version_id: int) -> None:
+        """Ties the calls already recorded for `request_id` to the resume version the request saved."""
+        if request_id:
+            self._pending.append(("link", request_id, resume_version_id))
+
+    def pending_tokens(self, owner_id: int, since: datetime) -> int:
+        """Tokens of this user's calls that are recorded but not written yet."""
+        return sum(op[1]["prompt_tokens"] + op[1]["response_tokens"] for op in list(self._pending)
+                   if op[0] == "usage" and op[1]["owner_id"] == owner_id and op[1]["created_at"] >= since)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Writes everything pending: consecutive usage rows as one bulk INSERT, links as UPDATEs."""
+        ops = [self._pending.popleft() for _ in range(len(self._pending))]
+        if not ops:
+            return
+        try:
+            async with SessionLocal() as db:
+                rows: List[Dict[str, Any]] = []
+                for op in ops:
+                    if op[0] == "usage":
+                        rows.append(op[1])
+                        continue
+                    if rows:
+                        await db.execute(insert(models.LLMUsage), rows)
+                        rows = []
+                    await db.execute(
+                        update(models.LLMUsage)
+                        .where(models.LLMUsage.request_id == op[1], models.LLMUsage.resume_version_id.is_(None))
+                        .values(resume_version_id=op[2])
+                    )
+                if rows:
+                    await db.execute(insert(models.LLMUsage), rows)
+                await db.commit()
+        except Exception:
+            # Usage accounting must never take the API down; the batch is dropped
+            logger.exception("Failed to write %d LLM usage ledger entries.", len(ops))
+
+    async def stop(self) -> None:
+        """Stops the writer and writes what is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+        await self.flush()
+
+
+usage_ledger = UsageLedger()
+
+
+async def tokens_used_today(db: AsyncSession, owner_id: int) -> int:
+    since = start_of_day()
+    result = await db.execute(
+        select(func.coalesce(func.sum(models.LLMUsage.prompt_tokens + models.LLMUsage.response_tokens), 0))
+        .where(models.LLMUsage.owner_id == owner_id, models.LLMUsage.created_at >= since)
+    )
+    return int(result.scalar()) + usage_ledger.pending_tokens(owner_id, since)
+
+
+def daily_token_quota(user: models.User) -> int:
+    """The user's tokens per UTC day; 0 means unlimited."""
+    return user.daily_token_quota if user.daily_token_quota is not None else LLM_DAILY_TOKEN_QUOTA
+
+
+async def enforce_token_quota(db: AsyncSession, user: models.User) -> None:
+    """
+    Raises TokenQuotaExceeded if the user has no tokens left today. Checked before each LLM call (see
+    enforce_usage_owner_quota), so the call that crosses the quota completes and the next one is refused.
+    """
+    quota = daily_token_quota(user)
+    if quota <= 0:
+        return
+    if await tokens_used_today(db, user.id) >= quota:
+        now = datetime.now(timezone.utc)
+        retry_after = int((start_of_day(now) + timedelta(days=1) - now).total_seconds()) + 1
+        raise TokenQuotaExceeded(quota, retry_after)
+
+
+async def enforce_usage_owner_quota() -> None:
+    """
+    LLMScheduler.before_dispatch hook: enforces the quota of the user the current request or task charges
+    its LLM calls to, so a request making several calls can't run far past it. Unattributed calls are not limited.
+    """
+    owner_id = _usage_owner.get()
+    if owner_id is None:
+        return
+    async with SessionLocal() as db:
+        user = await db.get(models.User, owner_id)
+        if user is not None:
+            await enforce_token_quota(db, user)
+
+
+def _totals_columns():
+    return (
+        func.count(models.LLMUsage.id).label("calls"),
+        func.coalesce(func.sum(models.LLMUsage.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(models.LLMUsage.response_tokens), 0).label("response_tokens"),
+        func.coalesce(func.sum(models.LLMUsage.cost_usd), 0).label("cost_usd"),
+        func.coalesce(func.avg(models.LLMUsage.latency_ms), 0).label("avg_latency_ms"),
+    )
+
+
+def _totals(row) -> Dict[str, Any]:
+    return {
+        "calls": row.calls,
+        "prompt_tokens": int(row.prompt_tokens),
+        "response_tokens": int(row.response_tokens),
+        "cost_usd": round(float(row.cost_usd), 6),
+        "avg_latency_ms": round(float(row.avg_latency_ms), 1),
+    }
+
+
+async def usage_summary(db: AsyncSession, user: models.User, days: int = 30) -> Dict[str, Any]:
+    """A user's LLM usage of the last `days` days: by call type, per day, and today against the quota."""
+    since = start_of_day() - timedelta(days=days - 1)
+    scope = (models.LLMUsage.owner_id == user.id, models.LLMUsage.created_at >= since)
+
+    by_call_type = await db.execute(
+        select(models.LLMUsage.call_type, *_totals_columns()).where(*scope)
+        .group_by(models.LLMUsage.call_type).order_by(models.LLMUsage.call_type)
+    )
+    day = func.date(models.LLMUsage.created_at)
+    daily = await db.execute(select(day.label("day"), *_totals_columns()).where(*scope).group_by(day).order_by(day))
+
+    quota = daily_token_quota(user)
+    used_today = await tokens_used_today(db, user.id)
+    return {
+        "days": days,
+        "today": {
+            "tokens": used_today,
+            "quota": quota or None,
+            "remaining": max(quota - used_today, 0) if quota else None,
+        },
+        "by_call_type": [{"call_type": row.call_type, **_totals(row)} for row in by_call_type],
+        "daily": [{"day": str(row.day), **_totals(row)} for row in daily],
+    }
+
+
+async def usage_by_user(db: AsyncSession, days: int = 30) -> List[Dict[str, Any]]:
+    """Totals per user (None for calls made outside a user's request) of the last `days` days, costliest first."""
+    since = start_of_day() - timedelta(days=days - 1)
+    result = await db.execute(
+        select(models.LLMUsage.owner_id, models.User.username, *_totals_columns())
+        .outerjoin(models.User, models.User.id == models.LLMUsage.owner_id)
+        .where(models.LLMUsage.created_at >= since)
+        .group_by(models.LLMUsage.owner_id, models.User.username)
+        .order_by(func.sum(models.LLMUsage.cost_usd).desc())
+    )
+    return [{"owner_id": row.owner_id, "username": row.username, **_totals(row)} for row in result]
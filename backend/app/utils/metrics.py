@@ -0,0 +1,207 @@
+# backend/app/utils/metrics.py
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds: API routes answer in milliseconds, Gemini calls take seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[Tuple[Tuple[str, str], ...], float] # ((label, value) pairs, value)
+
+
+class MetricsRegistry:
+    """
+    In-process metrics with no external dependency, rendered in the Prometheus text format.
+    Every thread adds to its own shard of counters, so recording never takes a lock (the event loop and
+    each LLM worker thread write to separate dicts); shards are only summed when /metrics is scraped.
+    Values are per API worker process.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, float]] = []
+        self._shards_lock = threading.Lock() # Taken once per thread, when its shard is created
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def _add(self, key: tuple, amount: float) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        shard[key] = shard.get(key, 0) + amount
+
+    def totals(self) -> Dict[tuple, float]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals: Dict[tuple, float] = {}
+        for shard in shards:
+            for key, value in dict(shard).items(): # dict() copies atomically under the GIL
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def register(self, metric: "_Metric") -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """`collector()` yields (name, type, help, samples) for values read from elsewhere at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        totals = self.totals()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(totals))
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.extend(_header(name, metric_type, help_text))
+                lines.extend(_sample_line(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _sample_line(name: str, labels: Iterable[Tuple[str, str]], value: float) -> str:
+    label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+    return f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}"
+
+
+def _header(name: str, metric_type: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _series(self, totals: Dict[tuple, float]) -> Dict[Tuple[str, ...], Dict[object, float]]:
+        """{label values: {suffix key: value}} of this metric's series."""
+        series: Dict[Tuple[str, ...], Dict[object, float]] = {}
+        for key, value in totals.items():
+            if key[0] == self.name:
+                series.setdefault(key[1], {})[key[2]] = value
+        return series
+
+    def render(self, totals: Dict[tuple, float]) -> List[str]:
+        lines = _header(self.name, self.type, self.help_text)
+        for label_values, values in sorted(self._series(totals).items()):
+            lines.append(_sample_line(self.name, zip(self.labelnames, label_values), values[None]))
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self.registry._add((self.name, self._label_values(labels), None), amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (e.g. requests in progress); shards hold each thread's net change."""
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self.registry._add((self.name, self._label_values(labels), None), amount)
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.registry._add((self.name, self._label_values(labels), None), -amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        label_values = self._label_values(labels)
+        # Only the bucket the value falls in is counted; buckets are made cumulative when rendered
+        self.registry._add((self.name, label_values, bisect.bisect_left(self.buckets, value)), 1)
+        self.registry._add((self.name, label_values, "sum"), value)
+
+    def render(self, totals: Dict[tuple, float]) -> List[str]:
+        lines = _header(self.name, self.type, self.help_text)
+        for label_values, values in sorted(self._series(totals).items()):
+            labels = list(zip(self.labelnames, label_values))
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets + (math.inf,)):
+                cumulative += values.get(index, 0)
+                lines.append(_sample_line(f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative))
+            lines.append(_sample_line(f"{self.name}_sum", labels, values.get("sum", 0)))
+            lines.append(_sample_line(f"{self.name}_count", labels, cumulative))
+        return lines
+
+
+registry = MetricsRegistry()
+
+# --- Metrics recorded by the API ---
+http_requests_total = Counter(registry, "http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    registry, "http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route"))
+http_requests_in_progress = Gauge(registry, "http_requests_in_progress", "HTTP requests being handled.", ("method",))
+
+llm_calls_total = Counter(registry, "llm_calls_total", "Gemini calls by call type and outcome (ok, blocked, error).",
+                          ("call_type", "outcome"))
+llm_call_duration_seconds = Histogram(
+    registry, "llm_call_duration_seconds", "Gemini call latency in seconds.", ("call_type",))
+llm_tokens_total = Counter(registry, "llm_tokens_total", "Tokens sent to (prompt) and received from (response) Gemini.",
+                           ("call_type", "direction"))
+
+critique_parse_failures_total = Counter(
+    registry, "critique_parse_failures_total", "Critique responses that were not valid critique JSON.")
+
+cache_requests_total = Counter(registry, "cache_requests_total", "Cache lookups by cache and result (hit, miss).",
+                               ("cache", "result"))
+
+password_hash_duration_seconds = Histogram(
+    registry, "password_hash_duration_seconds", "bcrypt hash/verify latency in seconds, queueing included.",
+    ("operation",))
+
+log_records_dropped_total = Counter(
+    registry, "log_records_dropped_total", "Log records dropped because the log writer queue was full.")
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_ratios(totals: Optional[Dict[tuple, float]] = None) -> Dict[str, float]:
+    """Hit ratio per cache since start, from cache_requests_total."""
+    counts: Dict[str, List[float]] = {}
+    for key, value in (totals if totals is not None else registry.totals()).items():
+        if key[0] == cache_requests_total.name:
+            cache, result = key[1]
+            counts.setdefault(cache, [0, 0])[0 if result == "hit" else 1] += value
+    return {cache: hits / (hits + misses) for cache, (hits, misses) in counts.items() if hits + misses}
+
+
+def _cache_hit_ratio_collector():
+    samples = [((("cache", cache),), ratio) for cache, ratio in sorted(cache_hit_ratios().items())]
+    yield "cache_hit_ratio", "gauge", "Cache hit ratio since the worker started.", samples
+
+
+registry.add_collector(_cache_hit_ratio_collector)
@@ -0,0 +1,224 @@
+# backend/app/utils/profiling.py
+
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_RATE, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_MAX_SECONDS
+
+# "sampling": stack samples of every thread, saved as speedscope JSON (https://www.speedscope.app)
+# "deterministic": cProfile of the event-loop thread, saved as pstats
+PROFILE_MODES = ("sampling", "deterministic")
+PROFILE_SUFFIXES = {"sampling": ".speedscope.json", "deterministic": ".pstats"}
+
+_PROFILE_ID = re.compile(r"[A-Za-z0-9_-]+(\.speedscope\.json|\.pstats)")
+
+
+class StackSampler:
+    """
+    Samples the Python stack of every thread each `interval` seconds from a daemon thread
+    (sys._current_frames), so the profiled code runs unmodified. The cost is one stack walk per
+    thread per sample, paid by the sampler thread; it stops by itself after `max_seconds`.
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 120):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        # thread id: (stacks as frame indexes from the root, seconds each stack stands for)
+        self._threads: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._origin: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._origin = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _frame_index(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # A sample stands for the time since the previous one, which covers late wake-ups
+            weight, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                stacks, weights = self._threads.setdefault(thread_id, ([], []))
+                stacks.append(stack)
+                weights.append(weight)
+            if now - started >= self.max_seconds:
+                break
+        self._thread_names = {t.ident: t.name for t in threading.enumerate()}
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """The samples in speedscope's file format: one sampled profile per thread."""
+        thread_ids = sorted(self._threads, key=lambda t: t != self._origin) # The profiled thread opens first
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "app.utils.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": func, "file": path, "line": line}
+                                  for (func, path, line) in self._frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self._thread_names.get(thread_id, f"thread {thread_id}"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self._threads[thread_id][1]),
+                "samples": self._threads[thread_id][0],
+                "weights": self._threads[thread_id][1],
+            } for thread_id in thread_ids],
+        }
+
+
+class ProfileCapture:
+    """One running profile; created by RequestProfiler.begin()."""
+
+    def __init__(self, mode: str, trigger: str, sample_interval: float, max_seconds: float):
+        self.mode = mode
+        self.trigger = trigger
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+        if mode == "sampling":
+            self._profiler = StackSampler(sample_interval, max_seconds)
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.mode == "sampling":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        """Must run on the thread that started the capture (cProfile only sees that thread)."""
+        if self.mode == "sampling":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        self.seconds = time.perf_counter() - self._started
+
+    def write(self, path: str, name: str) -> None:
+        if self.mode == "sampling":
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self._profiler.to_speedscope(name), f, separators=(",", ":"))
+        else:
+            self._profiler.dump_stats(path)
+
+
+class RequestProfiler:
+    """
+    Profiles single requests on demand, plus a random `sample_rate` share of all requests with the
+    low-overhead sampling profiler. One capture runs at a time per worker (cProfile cannot nest, and it
+    bounds the overhead); profiles are written under `directory`, keeping the newest `max_files`.
+    The event loop interleaves requests, so a profile also shows whatever else the worker ran meanwhile.
+    """
+
+    def __init__(self, directory: str, max_files: int = 200, sample_rate: float = 0.0,
+                 sample_interval: float = 0.005, max_seconds: float = 120):
+        self.directory = directory
+        self.max_files = max_files
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        self.max_seconds = max_seconds
+        self._busy = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self, mode: str, trigger: str) -> Optional[ProfileCapture]:
+        """Starts a capture, or returns None while another one is running."""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'.")
+        if not self._busy.acquire(blocking=False):
+            return None
+        capture = ProfileCapture(mode, trigger, self.sample_interval, self.max_seconds)
+        try:
+            capture.start()
+        except Exception:
+            self._busy.release()
+            raise
+        return capture
+
+    def end(self, capture: ProfileCapture) -> None:
+        """Stops the capture; write it afterwards with save(), off the event loop."""
+        try:
+            capture.stop()
+        finally:
+            self._busy.release()
+
+    def save(self, capture: ProfileCapture, request_id: Optional[str], label: str) -> str:
+        """Writes the capture and returns its profile ID (the file name)."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = capture.started_at.strftime("%Y%m%dT%H%M%S%fZ")
+        profile_id = f"{stamp}-{capture.trigger}-{(request_id or 'none')[:16]}{PROFILE_SUFFIXES[capture.mode]}"
+        if not _PROFILE_ID.fullmatch(profile_id): # A client-chosen X-Request-ID ends up in the name
+            profile_id = f"{stamp}-{capture.trigger}{PROFILE_SUFFIXES[capture.mode]}"
+        capture.write(os.path.join(self.directory, profile_id), f"{label} ({capture.seconds * 1000:.0f} ms)")
+        self._prune()
+        return profile_id
+
+    def _prune(self) -> None:
+        profiles = self.list_profiles()
+        for profile in profiles[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, profile["profile_id"]))
+            except OSError:
+                pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and _PROFILE_ID.fullmatch(entry.name):
+                stat = entry.stat()
+                profiles.append({
+                    "profile_id": entry.name,
+                    "format": "speedscope" if entry.name.endswith(".speedscope.json") else "pstats",
+                    "bytes": stat.st_size,
+                    "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                })
+        return sorted(profiles, key=lambda p: p["profile_id"], reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Path of a stored profile; None for unknown IDs (and anything that is not a plain profile file name)."""
+        if not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id)
+        return path if os.path.isfile(path) else None
+
+
+request_profiler = RequestProfiler(PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_RATE,
+                                   PROFILE_SAMPLE_INTERVAL_MS / 1000, PROFILE_MAX_SECONDS)
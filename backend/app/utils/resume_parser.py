@@ -1,15 +1,30 @@
 # backend/app/utils/resume_parser.py
 
 import io
-from docx import Document # For DOCX files
-import fitz # PyMuPDF for PDF files (import as fitz)
-from typing import Optional
+import logging
+import mmap
+import re
+from contextlib import contextmanager
+from datetime import date
+from typing import Optional, Dict, Any, List, Tuple
+
+from .tracing import traced
+
+# python-docx and PyMuPDF (fitz) are imported where they are used: they are only needed in the parser
+# processes, and importing them would slow down the API's startup
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentLimitExceeded(Exception):
+    """Raised when a document exceeds a parsing limit (e.g. too many pages)."""
 
 def extract_text_from_docx(docx_file: io.BytesIO) -> Optional[str]:
     """
     Extracts text from a DOCX file.
     Takes a BytesIO object representing the DOCX file.
     """
+    from docx import Document
     try:
         document = Document(docx_file)
         full_text = []
@@ -17,7 +32,7 @@ def extract_text_from_docx(docx_file: io.BytesIO) -> Optional[str]:
             full_text.append(para.text)
         return "\n".join(full_text)
     except Exception as e:
-        print(f"Error extracting text from DOCX: {e}")
+        logger.warning("Error extracting text from DOCX: %s", e)
         return None
 
 def extract_text_from_pdf(pdf_file: io.BytesIO) -> Optional[str]:
@@ -25,18 +40,61 @@ def extract_text_from_pdf(pdf_file: io.BytesIO) -> Optional[str]:
     Extracts text from a PDF file.
     Takes a BytesIO object representing the PDF file.
     """
+    import fitz # PyMuPDF
+    try:
+        # getbuffer() hands PyMuPDF a view of the BytesIO contents instead of a copy
+        data = pdf_file.getbuffer() if isinstance(pdf_file, io.BytesIO) else pdf_file.read()
+        doc = fitz.open(stream=data, filetype="pdf")
+        try:
+            return "".join(page.get_text() for page in doc)
+        finally:
+            doc.close()
+    except Exception as e:
+        logger.warning("Error extracting text from PDF: %s", e)
+        return None
+
+@contextmanager
+def open_pdf(file_path: str):
+    """
+    Opens a PDF from a read-only memory map of the file, so pages are read from the OS page cache
+    on demand instead of the whole file being copied into memory. Processes extracting different
+    page ranges of the same file share those cached pages.
+    """
+    import fitz # PyMuPDF
+    with open(file_path, 'rb') as pdf_file:
+        mapped = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    doc = None
+    try:
+        doc = fitz.open(stream=view, filetype="pdf")
+        yield doc
+    finally:
+        if doc is not None:
+            doc.close()
+            doc = None # Drop PyMuPDF's reference to the view before unmapping
+        view.release()
+        mapped.close()
+
+def pdf_page_count(file_path: str) -> Optional[int]:
+    """Returns the number of pages of a PDF on disk, or None if it can't be opened."""
+    try:
+        with open_pdf(file_path) as doc:
+            return doc.page_count
+    except Exception as e:
+        logger.warning("Error extracting text from PDF: %s", e)
+        return None
+
+def extract_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> Optional[str]:
+    """Extracts the text of pages [start, stop) of a PDF on disk."""
     try:
-        doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-        text = ""
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-        doc.close()
-        return text
+        with open_pdf(file_path) as doc:
+            stop = doc.page_count if stop is None else min(stop, doc.page_count)
+            return "".join(doc.load_page(page_num).get_text() for page_num in range(start, stop))
     except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
+        logger.warning("Error extracting text from PDF: %s", e)
         return None
 
+@traced("parse.extract_text")
 def parse_resume_content(file_content: bytes, filename: str) -> Optional[str]:
     """
     Parses the content of an uploaded resume file and returns its text.
@@ -50,5 +108,217 @@ def parse_resume_content(file_content: bytes, filename: str) -> Optional[str]:
     elif file_extension == 'docx':
         return extract_text_from_docx(file_stream)
     else:
-        print(f"Unsupported file type: {file_extension}")
-        return None
\ No newline at end of file
+        logger.warning("Unsupported file type: %s", file_extension)
+        return None
+
+@traced("parse.extract_text")
+def parse_resume_file(file_path: str, filename: str, max_pages: Optional[int] = None) -> Optional[str]:
+    """
+    Parses a resume stored on disk and returns its text. Supports .pdf and .docx.
+    Raises DocumentLimitExceeded if a PDF has more than `max_pages` pages.
+    """
+    file_extension = filename.split('.')[-1].lower()
+
+    if file_extension == 'pdf':
+        try:
+            with open_pdf(file_path) as doc:
+                if max_pages is not None and doc.page_count > max_pages:
+                    raise DocumentLimitExceeded(f"PDF has {doc.page_count} pages; the limit is {max_pages}.")
+                return "".join(page.get_text() for page in doc)
+        except DocumentLimitExceeded:
+            raise
+        except Exception as e:
+            logger.warning("Error extracting text from PDF: %s", e)
+            return None
+    elif file_extension == 'docx':
+        with open(file_path, 'rb') as docx_file:
+            return extract_text_from_docx(docx_file)
+    else:
+        logger.warning("Unsupported file type: %s", file_extension)
+        return None
+
+
+# --- Local section segmenter ---
+# Pulls the fields that can be found deterministically (contact info, skills, certifications,
+# years of experience) out of the extracted text, so only the free-text sections need the LLM.
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment history",
+                   "employment", "work history", "career history", "relevant experience"),
+    "education": ("education", "academic background", "education and training", "qualifications"),
+    "skills": ("skills", "technical skills", "core skills", "key skills", "core competencies",
+               "technologies", "skills and tools", "tools and technologies"),
+    "certifications": ("certifications", "certificates", "licenses and certifications",
+                       "licenses & certifications", "certifications and licenses"),
+    "projects": ("projects", "personal projects", "selected projects", "key projects", "side projects"),
+}
+_HEADING_LOOKUP = {alias: section for section, aliases in SECTION_HEADINGS.items() for alias in aliases}
+
+# Sections whose content still needs the LLM (responsibilities, degrees, project descriptions)
+FREE_TEXT_SECTIONS = ("experience", "education", "projects")
+
+EXTRACTION_FIELD_DEFAULTS = {
+    "full_name": "", "email": "", "phone": "", "linkedin": "", "years_of_experience": 0,
+    "job_history": [], "education": [], "skills": [], "certifications": [],
+}
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"(?<![\w])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{2,4}\)[\s.-]?)?\d{2,4}(?:[\s.-]\d{2,4}){1,4}(?![\w])")
+_LINKEDIN_RE = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[\w%-]+/?", re.IGNORECASE)
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+_DATE = r"(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{4}|\d{1,2}/\d{4}|\d{4}(?:-\d{2})?)"
+_DATE_RANGE_RE = re.compile(
+    rf"({_DATE})\s*(?:-|\u2013|\u2014|to)\s*({_DATE}|present|current|now)", re.IGNORECASE)
+_BULLET_CHARS = "-*\u2022\u25cf\u25aa\u2023\u00b7"
+
+
+def _heading_for_line(line: str) -> Optional[str]:
+    """Returns the canonical section name if `line` is a section heading."""
+    candidate = line.strip().strip("#").strip().rstrip(":").strip()
+    if not candidate or len(candidate) > 40:
+        return None
+    return _HEADING_LOOKUP.get(" ".join(candidate.lower().split()))
+
+
+def segment_resume(text: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Splits resume text into the header (lines before the first recognised heading) and
+    sections keyed by canonical name. Lines under unrecognised headings stay in the current section.
+    """
+    header: List[str] = []
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for line in text.splitlines():
+        section = _heading_for_line(line)
+        if section:
+            current = section
+            sections.setdefault(section, [])
+        elif line.strip():
+            (sections[current] if current else header).append(line.strip())
+    return header, sections
+
+
+def _guess_full_name(header: List[str]) -> str:
+    """The first short header line made only of letters (e.g. "Jane A. Doe") is taken as the name."""
+    for line in header[:5]:
+        words = line.split()
+        if 2 <= len(words) <= 5 and all(re.fullmatch(r"[^\W\d_][\w.'-]*", w) for w in words):
+            if not _heading_for_line(line):
+                return line
+    return ""
+
+
+def extract_contact_info(text: str, header: Optional[List[str]] = None) -> Dict[str, str]:
+    """Finds the name, email, phone number and LinkedIn URL."""
+    email = _EMAIL_RE.search(text)
+    linkedin = _LINKEDIN_RE.search(text)
+    search_text = _DATE_RANGE_RE.sub(" ", text) # Date ranges look like phone numbers
+    phone = next((m.group(0).strip() for m in _PHONE_RE.finditer(search_text)
+                  if 9 <= sum(c.isdigit() for c in m.group(0)) <= 15), "")
+    return {
+        "full_name": _guess_full_name(header if header is not None else text.splitlines()),
+        "email": email.group(0) if email else "",
+        "phone": phone,
+        "linkedin": linkedin.group(0) if linkedin else "",
+    }
+
+
+def extract_list_items(lines: List[str]) -> List[str]:
+    """
+    Splits a skills/certifications section into items: one per bullet, line, or comma/pipe/semicolon
+    separated entry. "Languages: Python, Go" yields "Python" and "Go".
+    """
+    items: List[str] = []
+    for line in lines:
+        line = line.strip().lstrip(_BULLET_CHARS).strip()
+        if ":" in line and len(line.split(":", 1)[0].split()) <= 3:
+            line = line.split(":", 1)[1]
+        separators = r"[,;|\u2022]" if re.search(r"[,;|\u2022]", line) else r"$^"
+        for item in re.split(separators, line):
+            item = item.strip().strip(".").strip()
+            if item and item not in items:
+                items.append(item)
+    return items
+
+
+def _parse_date(token: str, today: date) -> Optional[Tuple[int, int]]:
+    token = token.strip().lower()
+    if token in ("present", "current", "now"):
+        return today.year, today.month
+    if "/" in token:
+        month, year = token.split("/")
+        return int(year), int(month)
+    match = re.match(r"([a-z]+)\.?\s+(\d{4})", token)
+    if match:
+        return int(match.group(2)), _MONTHS.get(match.group(1)[:3], 1)
+    if "-" in token:
+        year, month = token.split("-")
+        return int(year), int(month)
+    return int(token), 1
+
+
+def _valid_date(value: Optional[Tuple[int, int]]) -> bool:
+    return value is not None and 1900 <= value[0] <= 2100 and 1 <= value[1] <= 12
+
+
+def find_date_ranges(text: str, today: Optional[date] = None) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """All "start - end" date ranges in the text, as ((year, month), (year, month)) pairs."""
+    today = today or date.today()
+    ranges = []
+    for match in _DATE_RANGE_RE.finditer(text):
+        start, end = _parse_date(match.group(1), today), _parse_date(match.group(2), today)
+        if _valid_date(start) and _valid_date(end) and start <= end:
+            ranges.append((start, end))
+    return ranges
+
+
+def estimate_years_of_experience(ranges: List[Tuple[Tuple[int, int], Tuple[int, int]]]) -> int:
+    """Total years covered by the date ranges, counting overlapping roles once."""
+    months = set()
+    for (start_year, start_month), (end_year, end_month) in ranges:
+        months.update(range(start_year * 12 + start_month, end_year * 12 + end_month))
+    return len(months) // 12
+
+
+@traced("parse.pre_extract")
+def pre_extract_resume_fields(text: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Returns (prefilled fields, free text for the LLM). The free text is only the experience,
+    education and project sections. If no such sections are recognised, the whole text is
+    returned so the LLM still sees everything. Only values that were found are prefilled: a contact
+    field the patterns miss (e.g. "jane.doe [at] gmail.com") is left to the LLM, which then also gets
+    the header lines.
+    """
+    header, sections = segment_resume(text)
+    contact = extract_contact_info(text, header)
+    prefilled: Dict[str, Any] = {field: value for field, value in contact.items() if value}
+
+    for section in ("skills", "certifications"):
+        if sections.get(section):
+            prefilled[section] = extract_list_items(sections[section])
+    if sections.get("experience"):
+        ranges = find_date_ranges("\n".join(sections["experience"]))
+        if ranges:
+            prefilled["years_of_experience"] = estimate_years_of_experience(ranges)
+
+    free_sections = [name for name in FREE_TEXT_SECTIONS if sections.get(name)]
+    if not free_sections:
+        return prefilled, text
+
+    parts = []
+    if len(prefilled.keys() & contact.keys()) < len(contact) and header:
+        parts.append("\n".join(header)) # Let the LLM find the missing contact details
+    for name in free_sections:
+        parts.append(f"{name.upper()}\n" + "\n".join(sections[name]))
+    return prefilled, "\n\n".join(parts)
+
+
+def merge_prefilled_fields(llm_extracted: Dict[str, Any], prefilled: Dict[str, Any]) -> Dict[str, Any]:
+    """Combines the LLM's extraction with the locally extracted fields; non-empty local values win."""
+    merged = dict(EXTRACTION_FIELD_DEFAULTS)
+    merged.update(llm_extracted)
+    merged.update({field: value for field, value in prefilled.items() if value or not merged.get(field)})
+    return merged
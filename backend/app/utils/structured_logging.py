@@ -0,0 +1,133 @@
+# backend/app/utils/structured_logging.py
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from .metrics import log_records_dropped_total
+from .tracing import current_request_id
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Cuts long strings (LLM outputs, profiles) down to `max_chars`, saying how much was left out."""
+    if isinstance(value, str) and max_chars and len(value) > max_chars:
+        return f"{value[:max_chars]}...[{len(value) - max_chars} more chars]"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID and the record's `extra` fields."""
+
+    def __init__(self, max_field_chars: int = 1000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def fields(self, record: logging.LogRecord) -> Dict[str, Any]:
+        return {key: truncate(value, self.max_field_chars) for key, value in vars(record).items()
+                if key not in _RECORD_ATTRIBUTES and not key.startswith("_")}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage(), self.max_field_chars),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(self.fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(JsonFormatter):
+    """The same fields as a readable line, for local development."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        created = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        request = f" [{record.request_id[:8]}]" if getattr(record, "request_id", None) else ""
+        fields = "".join(f" {key}={value!r}" for key, value in self.fields(record).items())
+        line = f"{created} {record.levelname:<7} {record.name}{request}: " \
+               f"{truncate(record.getMessage(), self.max_field_chars)}{fields}"
+        return f"{line}\n{record.exc_text}" if record.exc_text else line
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without ever blocking the caller: the message is merged and the
+    request ID captured here (they depend on the caller's context), formatting and the stdout write happen
+    on the writer thread. When the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            # Formatted now, so the queued record doesn't keep the traceback's frames alive
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = current_request_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'app.core_ai=DEBUG,sqlalchemy.engine=WARNING' -> {logger name: level}."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", log_format: str = "json", max_field_chars: int = 1000,
+                      queue_size: int = 10000, levels: Optional[Dict[str, str]] = None) -> None:
+    """
+    Routes the root logger through a bounded queue to a background thread writing to stdout.
+    Safe to call again (e.g. with other settings); the writer is drained at interpreter exit.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    else:
+        atexit.register(stop_logging)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter(max_field_chars) if log_format == "text" else JsonFormatter(max_field_chars))
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=False)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_NonBlockingQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Writes the records still queued and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,4 +1,7 @@
 import difflib
+import re
+import unicodedata
+from typing import Dict, Any, List
 
 def get_text_diff(old_text: str, new_text: str) -> str:
     """
@@ -14,6 +17,34 @@ def get_text_diff(old_text: str, new_text: str) -> str:
     )
     return ''.join(d)
 
+def get_line_delta(old_text: str, new_text: str) -> List[list]:
+    """
+    Generates a compact, line-based delta that turns old_text into new_text.
+    Unlike get_text_diff it carries no context lines and can be applied back with apply_line_delta:
+    ["=", start, end] copies old lines [start:end], ["+", [lines]] inserts new lines.
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append(["=", i1, i2])
+        elif j2 > j1: # 'replace' or 'insert'; for 'delete' there is nothing to emit
+            delta.append(["+", new_lines[j1:j2]])
+    return delta
+
+def apply_line_delta(old_text: str, delta: List[list]) -> str:
+    """Rebuilds the new text from old_text and a delta produced by get_line_delta."""
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = []
+    for op in delta:
+        if op[0] == "=":
+            new_lines.extend(old_lines[op[1]:op[2]])
+        else:
+            new_lines.extend(op[1])
+    return "".join(new_lines)
+
 def clean_llm_output(text: str) -> str:
     """
     Cleans common issues in LLM output (e.g., Markdown code blocks, extra whitespace).
@@ -26,6 +57,113 @@ def clean_llm_output(text: str) -> str:
             text = text[text.find('\n')+1:].strip()
     return text.strip()
 
+# Common placeholder patterns, combined into one regex compiled once at import
+PLACEHOLDER_PATTERNS = [
+    r"placeholder\s*role", r"placeholder\s*company", r"n/a", r"not\s*applicable",
+    r"example\s*job", r"test\s*role", r"job\s*title\s*\d+", r"company\s*name\s*\d+",
+    r"description\s*of\s*responsibilities", r"lorem\s*ipsum", r"your\s*role",
+    r"your\s*company", r"no\s*responsibilities\s*provided"
+]
+_PLACEHOLDER_RE = re.compile("|".join(f"(?:{pattern})" for pattern in PLACEHOLDER_PATTERNS), re.IGNORECASE)
+
+
+def _is_placeholder(text: str) -> bool:
+    if not text or not text.strip():
+        return True
+    return _PLACEHOLDER_RE.search(text) is not None
+
+
+def clean_core_data_for_llm(core_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cleans and pre-processes core_data to remove or modify generic placeholders
+    before sending to the LLM.
+    """
+    cleaned_data = core_data.copy()
+
+    # Clean Job History
+    if 'job_history' in cleaned_data and isinstance(cleaned_data['job_history'], list):
+        filtered_job_history = []
+        for job in cleaned_data['job_history']:
+            clean_job = job.copy()
+            # Check title and company - if both are placeholders, skip the job
+            if _is_placeholder(clean_job.get('title', '')) and _is_placeholder(clean_job.get('company', '')):
+                continue
+
+            # Clean individual fields within the job
+            if _is_placeholder(clean_job.get('title', '')):
+                clean_job['title'] = "Experienced Professional" # Generic but not a placeholder
+            if _is_placeholder(clean_job.get('company', '')):
+                clean_job['company'] = "Undisclosed Company" # Generic but not a placeholder
+
+            if 'responsibilities' in clean_job and isinstance(clean_job['responsibilities'], list):
+                # Filter out placeholder responsibilities
+                clean_job['responsibilities'] = [
+                    resp for resp in clean_job['responsibilities'] if not _is_placeholder(resp)
+                ]
+                # If all responsibilities were placeholders, add a default
+                if not clean_job['responsibilities']:
+                    clean_job['responsibilities'] = ["Managed key projects and delivered impactful results."] # Provide a generic for LLM to expand
+
+            filtered_job_history.append(clean_job)
+        cleaned_data['job_history'] = filtered_job_history
+        # If no valid jobs remain, signal this to the LLM later
+        if not filtered_job_history:
+            cleaned_data['has_meaningful_job_history'] = False
+        else:
+            cleaned_data['has_meaningful_job_history'] = True
+
+
+    # Clean Education
+    if 'education' in cleaned_data and isinstance(cleaned_data['education'], list):
+        filtered_education = []
+        for edu in cleaned_data['education']:
+            clean_edu = edu.copy()
+            if _is_placeholder(clean_edu.get('degree', '')) and _is_placeholder(clean_edu.get('institution', '')):
+                continue
+            if _is_placeholder(clean_edu.get('degree', '')): clean_edu['degree'] = "Degree/Certification"
+            if _is_placeholder(clean_edu.get('institution', '')): clean_edu['institution'] = "Reputable Institution"
+            filtered_education.append(clean_edu)
+        cleaned_data['education'] = filtered_education
+
+    # Clean Skills
+    if 'skills' in cleaned_data and isinstance(cleaned_data['skills'], list):
+        cleaned_data['skills'] = [skill for skill in cleaned_data['skills'] if not _is_placeholder(skill)]
+        if not cleaned_data['skills']:
+            cleaned_data['skills'] = ["Problem Solving", "Communication", "Teamwork"] # Default skills
+
+    # Clean Certifications
+    if 'certifications' in cleaned_data and isinstance(cleaned_data['certifications'], list):
+        cleaned_data['certifications'] = [cert for cert in cleaned_data['certifications'] if not _is_placeholder(cert)]
+
+    # Clean Projects
+    if 'projects' in cleaned_data and isinstance(cleaned_data['projects'], list):
+        filtered_projects = []
+        for proj in cleaned_data['projects']:
+            if isinstance(proj, dict) and not _is_placeholder(proj.get('name', '')):
+                proj = proj.copy() # Don't modify the caller's (possibly cached) profile
+                if _is_placeholder(proj.get('description', '')):
+                    proj['description'] = "Successfully completed a significant project."
+                filtered_projects.append(proj)
+        cleaned_data['projects'] = filtered_projects
+
+
+    # Add a flag if core data seems very sparse/placeholder-filled overall
+    if not cleaned_data.get('full_name') or _is_placeholder(cleaned_data.get('full_name', '')):
+        cleaned_data['full_name'] = "Valued Candidate"
+    if not cleaned_data.get('email') or _is_placeholder(cleaned_data.get('email', '')):
+        cleaned_data['email'] = "contact@example.com"
+
+    return cleaned_data
+
+
+def normalize_extracted_text(text: str) -> str:
+    """
+    Normalises text extracted from a resume so that re-exports of the same document
+    (different PDF producer, line wrapping, ligatures, trailing spaces) compare equal.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).lower()
+
 if __name__ == "__main__":
     # Test get_text_diff
     text1 = "Line 1\nLine 2\nLine 3"
@@ -44,4 +182,4 @@ if __name__ == "__main__":
     llm_output_code = "```json\n{\n\"key\": \"value\"\n}\n```"
     cleaned_code = clean_llm_output(llm_output_code)
     print(f"Original LLM Output (Code):\n'{llm_output_code}'")
-    print(f"Cleaned LLM Output (Code):\n'{cleaned_code}'")
\ No newline at end of file
+    print(f"Cleaned LLM Output (Code):\n'{cleaned_code}'")
@@ -0,0 +1,266 @@
+# backend/app/utils/tracing.py
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Attributes a span passes down to the spans opened inside it (e.g. the refinement iteration)
+INHERITED_ATTRIBUTES = ("iteration",)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id: str) -> contextvars.Token:
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def _trace_id(request_id: Optional[str]) -> str:
+    """32 hex chars, as OTLP wants: the request ID itself when it already is one."""
+    if request_id and len(request_id) == 32 and all(c in "0123456789abcdef" for c in request_id):
+        return request_id
+    return hashlib.sha256((request_id or uuid.uuid4().hex).encode("utf-8")).hexdigest()[:32]
+
+
+class Span:
+    """One timed stage of a request. Times are wall-clock nanoseconds; the duration is measured monotonically."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.request_id = parent.request_id if parent else current_request_id()
+        self.trace_id = parent.trace_id if parent else _trace_id(self.request_id)
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        if parent:
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    self.attributes.setdefault(key, parent.attributes[key])
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self._start_perf = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self) -> None:
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start_perf)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanSink:
+    """Receives finished spans. Implementations must be cheap: export runs on the request path."""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+
+class InMemorySpanSink(SpanSink):
+    """Keeps the last `max_spans` spans, for inspecting recent requests without any collector."""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span) # deque.append is thread-safe
+
+    def spans(self, request_id: Optional[str] = None) -> List[Span]:
+        spans = list(self._spans)
+        return [s for s in spans if s.request_id == request_id] if request_id else spans
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_json(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Spans in the OTLP/JSON trace format (ExportTraceServiceRequest), ready for any OTLP collector."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "app.utils.tracing"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 1, # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)}
+                               for key, value in {**span.attributes, "request.id": span.request_id}.items()
+                               if value is not None],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            } for span in spans],
+        }],
+    }]}
+
+
+class OTLPFileSpanSink(SpanSink):
+    """
+    Appends batches of spans as OTLP/JSON lines to a local file, so traces work offline and can be
+    replayed into any OTLP-compatible collector later.
+    """
+
+    def __init__(self, path: str, service_name: str = "resume-builder-api", batch_size: int = 256):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(to_otlp_json(batch, self.service_name), separators=(",", ":"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    """Opens spans and hands finished ones to the configured sinks. With no sinks, spans cost next to nothing."""
+
+    def __init__(self):
+        self.sinks: List[SpanSink] = []
+
+    def add_sink(self, sink: SpanSink) -> None:
+        self.sinks.append(sink)
+
+    def sink(self, sink_type: type) -> Optional[SpanSink]:
+        return next((s for s in self.sinks if isinstance(s, sink_type)), None)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Times the block as a child of the current span. Yields None when tracing is off."""
+        if not self.sinks:
+            yield None
+            return
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+            for sink in self.sinks:
+                sink.export(span)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush()
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attributes: Any):
+    """`with span("stage", key=value) as s:` on the global tracer; `s` is None when tracing is off."""
+    return tracer.span(name, **attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """Sets attributes on the current span, if any (e.g. whether a cache was hit)."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced(name: str):
+    """Decorator: runs a function (or coroutine function) inside a span."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_tracing(exporters: List[str], memory_max_spans: int, otlp_file: str) -> None:
+    """Installs the sinks named in `exporters` ("memory", "otlp-file") on the global tracer."""
+    tracer.sinks.clear()
+    for exporter in exporters:
+        if exporter == "memory":
+            tracer.add_sink(InMemorySpanSink(memory_max_spans))
+        elif exporter == "otlp-file":
+            tracer.add_sink(OTLPFileSpanSink(otlp_file))
+        elif exporter:
+            logger.warning("Unknown trace exporter '%s' ignored.", exporter)
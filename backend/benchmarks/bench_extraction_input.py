@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_extraction_input.py
+#
+# Size of the core data extraction prompt with and without the local section segmenter, and how
+# accurately the segmenter pre-fills fields, on a locally built corpus (see resume_corpus.py).
+# Token counts are estimated at ~4 characters per token. Run from the backend/ directory:
+#   python -m benchmarks.bench_extraction_input [--docs 30] [--keep DIR]
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.core_ai.prompt_manager import PromptManager
+from app.utils.resume_parser import parse_resume_file, pre_extract_resume_fields
+
+from benchmarks.resume_corpus import build_corpus
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def main(count: int, keep: str = None):
+    directory = keep or tempfile.mkdtemp(prefix="bench_extraction_")
+    os.makedirs(directory, exist_ok=True)
+    prompt_manager = PromptManager()
+    full_tokens, reduced_tokens, segment_ms = [], [], []
+    correct = {"full_name": 0, "email": 0, "phone": 0, "linkedin": 0, "skills": 0, "certifications": 0,
+               "years_of_experience": 0}
+    try:
+        corpus = build_corpus(directory, count)
+        for path, truth in corpus:
+            text = parse_resume_file(path, os.path.basename(path))
+            start = time.perf_counter()
+            prefilled, free_text = pre_extract_resume_fields(text)
+            segment_ms.append((time.perf_counter() - start) * 1000)
+
+            full_tokens.append(estimate_tokens(prompt_manager.generate_core_data_extraction_prompt(text)))
+            reduced_tokens.append(estimate_tokens(
+                prompt_manager.generate_core_data_extraction_prompt(free_text, prefilled=prefilled)))
+
+            for field in ("full_name", "email", "phone", "linkedin", "skills", "certifications"):
+                # Fields the patterns didn't find are not prefilled; count them as found empty
+                correct[field] += prefilled.get(field, type(truth[field])()) == truth[field]
+            # Partial months are dropped, so allow one year of slack
+            correct["years_of_experience"] += abs(
+                prefilled.get("years_of_experience", -99) - truth["years_of_experience_months"] / 12) <= 1
+    finally:
+        if not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    full, reduced = sum(full_tokens), sum(reduced_tokens)
+    print(f"{count} documents (half PDF / half DOCX)")
+    print(f"extraction prompt tokens (est.): full text {full:,}, segmented {reduced:,} "
+          f"({100.0 * (full - reduced) / full:.0f}% smaller)")
+    print(f"per document: full p50 {statistics.median(full_tokens)}, segmented p50 {statistics.median(reduced_tokens)}")
+    print(f"segmenter time: p50 {statistics.median(segment_ms):.2f} ms, max {max(segment_ms):.2f} ms")
+    print("pre-filled field accuracy:")
+    for field, hits in correct.items():
+        print(f"  {field:<22}{hits}/{count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=30)
+    parser.add_argument("--keep", help="Write the corpus to this directory and keep it.")
+    args = parser.parse_args()
+    main(args.docs, args.keep)
@@ -0,0 +1,227 @@
+# backend/benchmarks/bench_hot_functions.py
+#
+# Timing of the backend's hot functions on small, medium and huge fixtures: prompt building
+# (resume, critique, refinement), clean_core_data_for_llm, clean_llm_output, get_text_diff,
+# parse_resume_content on PDF and DOCX, and the /resume-versions/ read + serialization path
+# (on a throwaway SQLite database).
+# Every run is appended to hot_functions_history.jsonl; a case whose median time is more than
+# --threshold above the median of the last --window runs on the same host is flagged as a
+# regression and the run exits with status 1. Run from the backend/ directory:
+#   python -m benchmarks.bench_hot_functions                     # all cases
+#   python -m benchmarks.bench_hot_functions --only prompt      # cases whose name contains "prompt"
+#   python -m benchmarks.bench_hot_functions --no-record        # compare without appending to the history
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_hot_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+import docx  # noqa: E402
+import fitz  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.core_ai.prompt_manager import PromptManager  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.database import engine, SessionLocal  # noqa: E402
+from app.schemas.feedback import ResumeContentResponse  # noqa: E402
+from app.services import resume_storage  # noqa: E402
+from app.utils.resume_parser import parse_resume_content  # noqa: E402
+from app.utils.text_processing import clean_core_data_for_llm, clean_llm_output, get_text_diff  # noqa: E402
+
+from benchmarks.bench_prompt_size import make_fixture  # noqa: E402
+from benchmarks.resume_corpus import LAYOUTS, make_resume  # noqa: E402
+
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), "hot_functions_history.jsonl")
+
+# size: (jobs, learned rules, job description paragraphs, critiques, resume versions)
+SIZES = {
+    "small": (1, 2, 1, 2, 5),
+    "medium": (5, 15, 5, 5, 25),
+    "huge": (40, 200, 100, 20, 200),
+}
+LINES_PER_PDF_PAGE = 60
+
+
+def write_pdf_bytes(text: str) -> bytes:
+    doc = fitz.open()
+    lines = text.splitlines()
+    for start in range(0, len(lines), LINES_PER_PDF_PAGE):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), "\n".join(lines[start:start + LINES_PER_PDF_PAGE]), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def write_docx_bytes(text: str) -> bytes:
+    path = os.path.join(_tmp_dir, "resume.docx")
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    document.save(path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def edited(text: str, seed: int) -> str:
+    """The text with every fifth line reworded, as a user edit or a refinement pass would."""
+    rng = random.Random(seed)
+    return "\n".join(f"{line} (reworded {rng.randint(1, 99)})" if i % 5 == 0 else line
+                     for i, line in enumerate(text.splitlines())) + "\n"
+
+
+async def build_versions(count: int, draft: str, core_data: dict, learned_preferences: list) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+    critique = {"issues": [{"category": "Quantification", "severity": "medium", "description": "Add numbers."}],
+                "overall_assessment": "Good.", "has_issues": True}
+    async with SessionLocal() as db:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        parent = None
+        for i in range(count):
+            draft = edited(draft, seed=i)
+            rv = await resume_storage.build_resume_version(
+                db, owner_id=user.id, resume_uuid=f"bench-{i}", version_name=f"v{i}", content=draft,
+                core_data_used=core_data, learned_preferences_used=learned_preferences,
+                target_job_description_used="Backend engineer", critique_data=critique, parent=parent)
+            db.add(rv)
+            await db.flush()
+            parent = rv
+        await db.commit()
+
+
+async def list_resume_versions() -> bytes:
+    """The body of GET /resume-versions/ for the benchmark user, as the endpoint builds it."""
+    async with SessionLocal() as db:
+        result = await db.execute(select(models.ResumeVersion).order_by(models.ResumeVersion.timestamp.desc()))
+        versions = result.scalars().all()
+        decoded = await resume_storage.read_resume_versions(db, versions)
+        responses = resume_storage.resume_version_responses(versions, decoded)
+    return TypeAdapter(list[ResumeContentResponse]).dump_json(responses)
+
+
+def size_cases(size: str, prompt_manager: PromptManager, loop: asyncio.AbstractEventLoop) -> list:
+    """[(case name, callable, setup or None)] on the fixtures of one size, prepared up front."""
+    jobs, rules, jd_paragraphs, critique_count, version_count = SIZES[size]
+    core_data, learned_preferences, job_description = make_fixture(
+        seed=jobs, jobs=jobs, rules=rules, jd_paragraphs=jd_paragraphs)
+    draft, _ = make_resume(random.Random(jobs), LAYOUTS[0], jobs=jobs)
+    prompt_rules = prompt_manager.render_profile_fragments(core_data, learned_preferences)["prompt_rules"]
+    critiques = [{"category": "Quantification", "severity": "high", "description": f"Bullet {i} lacks numbers.",
+                  "suggested_action": "Add numbers.", "relevant_rule_id": None} for i in range(critique_count)]
+    llm_output = f"```markdown\n{draft}\n```"
+    revised = edited(draft, seed=0)
+    pdf_bytes, docx_bytes = write_pdf_bytes(draft), write_docx_bytes(draft)
+
+    cases = [
+        ("generate_resume_prompt", lambda: prompt_manager.generate_resume_prompt(
+            core_data, learned_preferences, "Keep it to one page.", job_description), None),
+        ("generate_critique_prompt", lambda: prompt_manager.generate_critique_prompt(
+            draft, prompt_rules, job_description), None),
+        ("generate_refinement_prompt", lambda: prompt_manager.generate_refinement_prompt(
+            draft, critiques, core_data, prompt_rules, job_description), None),
+        ("clean_core_data_for_llm", lambda: clean_core_data_for_llm(core_data), None),
+        ("clean_llm_output", lambda: clean_llm_output(llm_output), None),
+        ("get_text_diff", lambda: get_text_diff(draft, revised), None),
+        ("parse_resume_content_pdf", lambda: parse_resume_content(pdf_bytes, "resume.pdf"), None),
+        ("parse_resume_content_docx", lambda: parse_resume_content(docx_bytes, "resume.docx"), None),
+        # The version history is built right before timing; the content cache stays warm, as in a running worker
+        ("resume_versions_response", lambda: loop.run_until_complete(list_resume_versions()),
+         lambda: loop.run_until_complete(build_versions(version_count, draft, core_data, learned_preferences))),
+    ]
+    return [(f"{name}[{size}]", func, setup) for name, func, setup in cases]
+
+
+def build_cases(only: str = None) -> list:
+    """
+    [(case name, callable, setup or None)] for every size. `setup` runs right before the case is timed,
+    so only the function itself is measured.
+    """
+    prompt_manager = PromptManager()
+    loop = asyncio.new_event_loop()
+    return [case for size in SIZES for case in size_cases(size, prompt_manager, loop) if not only or only in case[0]]
+
+
+def time_case(func, repeat: int) -> dict:
+    """Median and best time per call in microseconds, over `repeat` rounds of at least ~0.2 s each."""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    per_call = [total / loops for total in timer.repeat(repeat=repeat, number=loops)]
+    return {"median_us": round(statistics.median(per_call) * 1e6, 2), "min_us": round(min(per_call) * 1e6, 2)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(host: str) -> list:
+    if not os.path.exists(HISTORY_PATH):
+        return []
+    with open(HISTORY_PATH) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    # Timings are only comparable on the same machine and interpreter
+    return [run for run in runs if run.get("host") == host and run.get("python") == platform.python_version()]
+
+
+def main(only: str, repeat: int, threshold: float, window: int, record: bool) -> int:
+    host = platform.node()
+    history = load_history(host)[-window:]
+    results = {}
+    regressions = []
+
+    print(f"{'case':<40}{'median (us)':>14}{'best (us)':>12}{'baseline':>12}{'change':>9}")
+    for case, func, setup in build_cases(only):
+        if setup is not None:
+            setup()
+        results[case] = time_case(func, repeat)
+        previous = [run["results"][case]["median_us"] for run in history if case in run["results"]]
+        baseline = statistics.median(previous) if previous else None
+        change = "" if baseline is None else f"{results[case]['median_us'] / baseline - 1:+.0%}"
+        print(f"{case:<40}{results[case]['median_us']:>14,.1f}{results[case]['min_us']:>12,.1f}"
+              f"{'' if baseline is None else f'{baseline:,.1f}':>12}{change:>9}")
+        if baseline is not None and results[case]["median_us"] > baseline * (1 + threshold):
+            regressions.append(f"{case}: {baseline:,.1f} -> {results[case]['median_us']:,.1f} us ({change})")
+
+    if record:
+        run = {"timestamp": datetime.now(timezone.utc).isoformat(), "commit": git_commit(), "host": host,
+               "python": platform.python_version(), "results": results}
+        with open(HISTORY_PATH, "a") as f:
+            f.write(json.dumps(run) + "\n")
+    if regressions:
+        print(f"\nRegressions beyond {threshold:.0%} of the last {len(history)} run(s):\n  " + "\n  ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default=None, help="Only run cases whose name contains this string.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown (0.2 = 20%%) flagged as a regression.")
+    parser.add_argument("--window", type=int, default=5, help="Previous runs the baseline median is taken over.")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this run to the history.")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    status = main(args.only, args.repeat, args.threshold, args.window, not args.no_record)
+    print(f"\nDone in {time.perf_counter() - started:.1f} s")
+    sys.exit(status)
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_import_time.py
+#
+# Cold-start budget: imports `app.main` (which builds the app with create_app()) in fresh interpreters
+# under `python -X importtime`, without GEMINI_API_KEY set, and fails (exit status 1) when the median
+# import time exceeds --budget-ms or when a library that must load lazily (Gemini SDK, PyMuPDF,
+# python-docx) was imported. Prints the slowest imports to show where the time goes.
+# FastAPI and SQLAlchemy alone take ~0.9-1.0 s to import on a small cloud VM; the default budget leaves
+# room for the app's own modules on top of that. Tighten it with --budget-ms on faster hosts.
+# Run from the backend/ directory:
+#   python -m benchmarks.bench_import_time
+#   python -m benchmarks.bench_import_time --budget-ms 600 --repeat 9
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+# Only needed on first use (an LLM call, a parse in the parser processes); importing them at startup
+# costs more than a second
+LAZY_MODULES = ("google.generativeai", "fitz", "pymupdf", "docx", "IPython")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """[(module, depth, self us, cumulative us)] from `-X importtime` output, in import order."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"} # Import must not need it
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_import_'), 'import.db')}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def module_import(entries: List[Tuple[str, int, int, int]], module: str) -> Tuple[float, Dict[str, float]]:
+    """Cumulative ms of importing `module`, and of each of its direct imports (modules the interpreter
+    loaded at startup, e.g. by `site`, are already cached and don't count)."""
+    children: Dict[str, float] = {}
+    for name, depth, _, cumulative in entries:
+        if depth == 0:
+            if name == module:
+                return cumulative / 1000, children
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative / 1000
+    raise SystemExit(f"{module} not found in the -X importtime output.")
+
+
+def main(module: str, repeat: int, budget_ms: float, top: int) -> int:
+    runs = [measure(module) for _ in range(repeat)]
+    totals_ms = [module_import(entries, module)[0] for entries in runs]
+    median_ms = statistics.median(totals_ms)
+
+    # The slowest direct imports, from the run closest to the median
+    entries = min(runs, key=lambda e: abs(module_import(e, module)[0] - median_ms))
+    print(f"{'import':<50}{'cumulative (ms)':>16}")
+    for name, cumulative in sorted(module_import(entries, module)[1].items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<50}{cumulative:>16,.1f}")
+
+    imported = {name for name, _, _, _ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    print(f"\n{module}: median {median_ms:,.0f} ms over {repeat} runs "
+          f"(min {min(totals_ms):,.0f}, max {max(totals_ms):,.0f}); budget {budget_ms:,.0f} ms")
+
+    failed = False
+    if median_ms > budget_ms:
+        print(f"Over budget by {median_ms - budget_ms:,.0f} ms.")
+        failed = True
+    if eager:
+        print(f"Imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main", help="Module to import.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to measure; the median counts.")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Maximum median import time.")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list.")
+    args = parser.parse_args()
+    sys.exit(main(args.module, args.repeat, args.budget_ms, args.top))
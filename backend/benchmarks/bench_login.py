@@ -0,0 +1,147 @@
+# backend/benchmarks/bench_login.py
+#
+# Login throughput of one in-process worker (on a throwaway SQLite database): concurrent clients log in
+# with their password (one bcrypt verify each, on the password hashing pool) for --seconds, then renew
+# their session with refresh tokens (no bcrypt) for as long. Reports requests per second, p50/p95/p99
+# latency and the event loop's lag in each phase. --compare-inline adds a password-login phase with bcrypt
+# run on the event loop, as /token did before the hashing pool. Run from the backend/ directory:
+#   python -m benchmarks.bench_login
+#   python -m benchmarks.bench_login --concurrency 32 --seconds 10 --compare-inline
+#   python -m benchmarks.bench_login --hash-workers 1                # the pool with a single thread
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import LagMonitor, summarize
+
+PASSWORD = "bench-password"
+
+
+async def register_users(client: httpx.AsyncClient, count: int) -> List[str]:
+    usernames = [f"login-bench-{i}" for i in range(count)]
+    for username in usernames:
+        response = await client.post("/register", json={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+    return usernames
+
+
+async def run_phase(client: httpx.AsyncClient, name: str, concurrency: int, seconds: float, step) -> Dict:
+    """Runs `step(client, worker)` in `concurrency` loops for `seconds`; latencies and outcomes of every call."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lag = LagMonitor(interval=0.01)
+    deadline = time.perf_counter() + seconds
+
+    async def worker(index: int) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await step(client, index)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if status == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    lag.start()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    finally:
+        await lag.stop()
+    elapsed = time.perf_counter() - started
+    return {"phase": name, "requests": len(latencies), "errors": errors,
+            "requests_per_second": round(len(latencies) / elapsed, 2),
+            "latency_ms": summarize(latencies), "event_loop_lag_ms": summarize(lag.samples)}
+
+
+async def drive(args) -> List[Dict]:
+    import app.main as app_module
+
+    lifespan = app_module.app.router.lifespan_context(app_module.app)
+    await lifespan.__aenter__()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench-login",
+                               timeout=httpx.Timeout(60))
+    results = []
+    try:
+        async with client:
+            usernames = await register_users(client, args.concurrency)
+            refresh_tokens: List[str] = [""] * args.concurrency
+
+            async def password_login(client: httpx.AsyncClient, index: int):
+                response = await client.post("/token", data={"username": usernames[index], "password": PASSWORD})
+                if response.status_code == 200:
+                    refresh_tokens[index] = response.json()["refresh_token"]
+                return response.status_code
+
+            async def refresh(client: httpx.AsyncClient, index: int):
+                response = await client.post("/token/refresh", json={"refresh_token": refresh_tokens[index]})
+                if response.status_code == 200:
+                    refresh_tokens[index] = response.json()["refresh_token"]
+                return response.status_code
+
+            results.append(await run_phase(client, "password login", args.concurrency, args.seconds, password_login))
+            results.append(await run_phase(client, "refresh token", args.concurrency, args.seconds, refresh))
+
+            if args.compare_inline:
+                hasher = app_module.password_hasher
+
+                async def inline(operation, func, *func_args):
+                    return func(*func_args)
+
+                hasher._run = inline # Instance attribute, shadows the pooled implementation
+                try:
+                    results.append(await run_phase(client, "password login (bcrypt inline)", args.concurrency,
+                                                   args.seconds, password_login))
+                finally:
+                    del hasher._run
+    finally:
+        await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def print_report(results: List[Dict], args) -> None:
+    print(f"concurrency {args.concurrency}, {args.seconds:g} s per phase, "
+          f"{os.environ['PASSWORD_HASH_WORKERS']} password hashing thread(s)\n")
+    print(f"{'phase':<34}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'lag p99':>10}{'lag max':>10}  errors")
+    for result in results:
+        latency, lag = result["latency_ms"], result["event_loop_lag_ms"]
+        print(f"{result['phase']:<34}{result['requests']:>10}{result['requests_per_second']:>10,.1f}"
+              f"{latency['p50']:>10,.1f}{latency['p95']:>10,.1f}{latency['p99']:>10,.1f}"
+              f"{lag['p99']:>10,.1f}{lag['max']:>10,.1f}  {result['errors'] or ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients logging in at the same time (one user each).")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of each phase.")
+    parser.add_argument("--hash-workers", type=int, default=None, help="PASSWORD_HASH_WORKERS for the run.")
+    parser.add_argument("--compare-inline", action="store_true", help="Add a phase with bcrypt on the event loop.")
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    # Settings for the app under test; must be in place before it is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_login_'), 'login.db')}"
+    os.environ.setdefault("GEMINI_API_KEY", "bench-login")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max(64, args.concurrency))
+    if args.hash_workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+
+    results = asyncio.run(drive(args))
+    print_report(results, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(result["requests"] for result in results) else 1)
@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_pdf_extraction.py
+#
+# PDF text extraction time for 1, 10 and 100 page documents: the previous implementation
+# (whole stream read into memory, `text +=` per page), the current in-process extraction
+# (memory-mapped file, list join), and the parser pool with and without page-range sharding.
+# Run from the backend/ directory:
+#   python -m benchmarks.bench_pdf_extraction [--pages 1 10 100] [--repeat 5]
+
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import fitz
+
+from app.services.document_parsing import DocumentParserPool
+from app.utils.resume_parser import parse_resume_file
+
+LINE = "Designed and operated a multi-tenant ingestion pipeline processing 4B events/day with p99 < 200 ms. "
+
+
+def make_pdf(path: str, pages: int) -> None:
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), f"Page {page_number}\n" + LINE * 60, fontsize=7)
+    doc.save(path)
+    doc.close()
+
+
+def legacy_extract(path: str) -> str:
+    """The implementation this benchmark replaced, kept here for comparison."""
+    with open(path, "rb") as pdf_file:
+        stream = io.BytesIO(pdf_file.read())
+    doc = fitz.open(stream=stream.read(), filetype="pdf")
+    text = ""
+    for page_num in range(doc.page_count):
+        page = doc.load_page(page_num)
+        text += page.get_text()
+    doc.close()
+    return text
+
+
+def time_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def time_pool_ms(pool: DocumentParserPool, path: str, repeat: int) -> float:
+    await pool.parse(path, os.path.basename(path)) # Warm up the worker processes
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await pool.parse(path, os.path.basename(path))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main(page_counts, repeat: int):
+    directory = tempfile.mkdtemp(prefix="bench_pdf_")
+    workers = os.cpu_count() or 1
+    single = DocumentParserPool(max_workers=1, max_pages=10_000, timeout=120)
+    sharded = DocumentParserPool(max_workers=workers, max_pages=10_000, timeout=120)
+    try:
+        print(f"median of {repeat} runs, {workers} CPUs (sharding needs more than one to help)")
+        print(f"{'pages':>6}{'legacy (ms)':>13}{'in-process (ms)':>17}{'pool x1 (ms)':>14}{f'pool x{workers} (ms)':>16}")
+        for pages in page_counts:
+            path = os.path.join(directory, f"doc_{pages}.pdf")
+            make_pdf(path, pages)
+            expected = legacy_extract(path)
+            assert parse_resume_file(path, "doc.pdf", max_pages=None) == expected
+            assert await sharded.parse(path, "doc.pdf") == expected
+
+            legacy = time_ms(lambda: legacy_extract(path), repeat)
+            in_process = time_ms(lambda: parse_resume_file(path, "doc.pdf", max_pages=None), repeat)
+            pool_single = await time_pool_ms(single, path, repeat)
+            pool_sharded = await time_pool_ms(sharded, path, repeat)
+            print(f"{pages:>6}{legacy:>13.1f}{in_process:>17.1f}{pool_single:>14.1f}{pool_sharded:>16.1f}")
+    finally:
+        single.shutdown()
+        sharded.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.repeat))
@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_prompt_size.py
+#
+# Prompt size regression check: builds the resume, critique, refinement and suggestions prompts for a set
+# of fixture profiles (small, typical, heavy) and compares their estimated token counts, section by section,
+# against prompt_size_baseline.json. Exits with status 1 when any prompt grew.
+# Run from the backend/ directory:
+#   python -m benchmarks.bench_prompt_size            # check against the baseline
+#   python -m benchmarks.bench_prompt_size --update   # accept the current sizes as the new baseline
+
+import argparse
+import json
+import os
+import random
+import sys
+
+from app.core_ai.prompt_budget import prompt_metrics
+from app.core_ai.prompt_manager import PromptManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "prompt_size_baseline.json")
+
+SKILLS = ["Python", "Go", "SQL", "PostgreSQL", "Docker", "Kubernetes", "Terraform", "AWS", "React", "Kafka",
+          "Redis", "gRPC", "Airflow", "Spark", "TypeScript", "Linux"]
+RULES = ["Keep the summary under 3 sentences.", "Do not include a hobbies section.", "Use British spelling.",
+         "Highlight Python and distributed systems experience.", "Avoid the word 'passionate'.",
+         "List certifications before education.", "Never mention GPA.", "Prefer numbers over adjectives.",
+         "Limit each role to four bullet points.", "Exclude roles older than 2012."]
+JD_PARAGRAPH = ("We are hiring a senior backend engineer to own our payments platform: design APIs in Python and Go, "
+                "run PostgreSQL and Kafka at scale, mentor engineers and work closely with product. ")
+
+
+def make_fixture(seed: int, jobs: int, rules: int, jd_paragraphs: int):
+    """Returns (core data, learned preferences, job description), deterministic for a seed."""
+    rng = random.Random(seed)
+    core_data = {
+        "full_name": "Jane Doe",
+        "email": "jane.doe@example.com",
+        "phone": "+1 555 0100",
+        "linkedin": "linkedin.com/in/jane-doe",
+        "years_of_experience": 2 * jobs,
+        "job_history": [
+            {"title": "Senior Engineer", "company": f"Company {job}", "start_date": f"{2022 - 2 * job}-01",
+             "end_date": "Present" if job == 0 else f"{2024 - 2 * job}-01",
+             "responsibilities": [f"Built service {job}-{r}, cutting latency by {rng.randint(5, 60)}% for "
+                                  f"{rng.randint(2, 90)}k users." for r in range(rng.randint(3, 6))]}
+            for job in range(jobs)
+        ],
+        "education": [{"degree": "B.Sc.", "field_of_study": "Computer Science", "institution": "University of Somewhere",
+                       "start_date": "2008", "end_date": "2012"}],
+        "skills": rng.sample(SKILLS, min(len(SKILLS), 4 + jobs)),
+        "certifications": ["AWS Certified Solutions Architect"],
+    }
+    learned_preferences = [
+        {"id": f"pref_{i}", "rule": f"{RULES[i % len(RULES)]}" + (f" (variant {i})" if i >= len(RULES) else ""),
+         "type": "exclusion" if "not" in RULES[i % len(RULES)] else "stylistic", "active": i % 7 != 6}
+        for i in range(rules)
+    ]
+    return core_data, learned_preferences, JD_PARAGRAPH * jd_paragraphs
+
+
+FIXTURES = {
+    "small": make_fixture(seed=1, jobs=1, rules=0, jd_paragraphs=0),
+    "typical": make_fixture(seed=2, jobs=4, rules=8, jd_paragraphs=4),
+    "heavy": make_fixture(seed=3, jobs=12, rules=120, jd_paragraphs=200),
+}
+
+DRAFT = "\n".join(["# Jane Doe", "## Summary", "Backend engineer.", "## Experience"] +
+                  [f"- Delivered project {i}, cutting latency by {10 + i}%." for i in range(40)])
+CRITIQUES = [{"category": "Quantification", "severity": "high", "description": f"Bullet {i} lacks numbers.",
+              "suggested_action": "add numbers", "relevant_rule_id": None} for i in range(5)]
+
+
+def measure() -> dict:
+    """{fixture: {prompt kind: {"total": tokens, "sections": {...}}}}, from the breakdowns PromptManager records."""
+    prompt_manager = PromptManager()
+    sizes = {}
+    for name, (core_data, learned_preferences, job_description) in FIXTURES.items():
+        fragments = prompt_manager.render_profile_fragments(core_data, learned_preferences)
+        prompt_rules = fragments["prompt_rules"]
+        builders = {
+            "resume": lambda: prompt_manager.assemble_resume_prompt(fragments, "Keep it to one page.", job_description),
+            "critique": lambda: prompt_manager.generate_critique_prompt(DRAFT, prompt_rules, job_description),
+            "refinement": lambda: prompt_manager.generate_refinement_prompt(DRAFT, CRITIQUES, core_data, prompt_rules,
+                                                                            job_description),
+            "suggestions": lambda: prompt_manager.generate_suggestions_prompt(core_data, prompt_rules, job_description),
+        }
+        sizes[name] = {}
+        for kind, build in builders.items():
+            build()
+            breakdown = prompt_metrics.last_breakdown[kind]
+            sizes[name][kind] = {"total": breakdown["total"], "sections": breakdown["sections"]}
+    return sizes
+
+
+def main(update: bool, tolerance: int) -> int:
+    sizes = measure()
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    grew = []
+    print(f"{'fixture':<10}{'prompt':<13}{'tokens':>8}{'baseline':>10}{'change':>8}")
+    for name, kinds in sizes.items():
+        for kind, size in kinds.items():
+            previous = baseline.get(name, {}).get(kind)
+            change = "" if previous is None else f"{size['total'] - previous['total']:+d}"
+            print(f"{name:<10}{kind:<13}{size['total']:>8}{'' if previous is None else previous['total']:>10}{change:>8}")
+            if previous is not None and size["total"] > previous["total"] + tolerance:
+                sections = {section: f"{previous['sections'].get(section, 0)} -> {tokens}"
+                            for section, tokens in size["sections"].items()
+                            if tokens > previous["sections"].get(section, 0)}
+                grew.append(f"{name}/{kind}: {previous['total']} -> {size['total']} tokens ({sections})")
+
+    if update or not baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(sizes, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    if grew:
+        print("\nPrompt size regression:\n  " + "\n  ".join(grew))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true", help="Write the current sizes as the new baseline.")
+    parser.add_argument("--tolerance", type=int, default=0, help="Tokens a prompt may grow before the check fails.")
+    args = parser.parse_args()
+    sys.exit(main(args.update, args.tolerance))
@@ -0,0 +1,130 @@
+# backend/benchmarks/bench_resume_history.py
+#
+# Storage size and read latency of a 500-version resume history, with and without delta encoding.
+# Uses a throwaway SQLite database; run from the backend/ directory:
+#   python -m benchmarks.bench_resume_history [--versions 500]
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_history_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+from sqlalchemy import select, func  # noqa: E402
+
+from app.db.database import engine, SessionLocal  # noqa: E402
+from app.db import models  # noqa: E402
+from app.services import resume_storage  # noqa: E402
+
+CORE_DATA = {"full_name": "Jane Doe", "skills": ["Python", "SQL", "FastAPI"]}
+PREFERENCES = [{"id": "pref_1", "rule": "Keep the summary under 3 sentences.", "active": True}]
+
+
+def make_history(count: int, seed: int = 7):
+    """Yields resume drafts where each one changes a few bullets of the previous one (re-tailoring every 25th)."""
+    rng = random.Random(seed)
+    lines = ["# Jane Doe", "jane.doe@example.com | +1 555 0100", "", "## Summary",
+             "Backend engineer with 9 years of experience building data-heavy web services.", "", "## Experience"]
+    for job in range(6):
+        lines += ["", f"### Senior Engineer, Company {job} | 201{job} - 201{job + 1}"]
+        lines += [f"- Delivered project {job}-{b}, cutting latency by {rng.randint(5, 60)}% for {rng.randint(2, 90)}k users."
+                  for b in range(5)]
+    lines += ["", "## Skills", "Python, SQL, FastAPI, PostgreSQL, Docker, Kubernetes"]
+
+    for version in range(count):
+        bullet_indexes = [i for i, line in enumerate(lines) if line.startswith("- ")]
+        changes = max(1, len(bullet_indexes) // 5) if version % 25 == 0 else rng.randint(1, 3)
+        for i in rng.sample(bullet_indexes, changes):
+            lines[i] = f"- Reworked bullet v{version}: improved throughput by {rng.randint(5, 80)}% across {rng.randint(2, 40)} services."
+        yield "\n".join(lines) + "\n"
+
+
+async def build_history(count: int) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        parent = None
+        for i, content in enumerate(make_history(count)):
+            rv = await resume_storage.build_resume_version(
+                db, owner_id=user.id, resume_uuid=f"bench-{i}", version_name=f"v{i}", content=content,
+                core_data_used=CORE_DATA, learned_preferences_used=PREFERENCES,
+                target_job_description_used="Senior Python engineer", critique_data=None, parent=parent)
+            db.add(rv)
+            await db.flush()
+            resume_storage.cache_content(rv, content)
+            parent = rv
+        await db.commit()
+
+        result = await db.execute(select(
+            func.sum(func.length(models.ResumeVersion.content))
+            + func.sum(func.coalesce(func.length(models.ResumeVersion.content_blob), 0))
+            + func.sum(func.coalesce(func.length(models.ResumeVersion.content_delta_blob), 0))
+        ))
+        return result.scalar()
+
+
+async def measure_reads(count: int) -> dict:
+    async with SessionLocal() as db:
+        result = await db.execute(select(models.ResumeVersion).order_by(models.ResumeVersion.id.desc()))
+        versions = result.scalars().all()
+
+        resume_storage.content_cache.clear()
+        start = time.perf_counter()
+        decoded = await resume_storage.read_resume_versions(db, versions)
+        cold_all = time.perf_counter() - start
+        expected = list(make_history(count))
+        assert [d["content"] for d in reversed(decoded)] == expected, "reconstructed history does not round-trip"
+
+        start = time.perf_counter()
+        await resume_storage.read_resume_versions(db, versions)
+        warm_all = time.perf_counter() - start
+
+    single = []
+    rng = random.Random(1)
+    for version_id in rng.sample(range(1, count + 1), 50):
+        resume_storage.content_cache.clear()
+        async with SessionLocal() as db: # Fresh session: parents must come from the DB
+            rv = await db.get(models.ResumeVersion, version_id)
+            start = time.perf_counter()
+            await resume_storage.reconstruct_contents(db, [rv])
+            single.append(time.perf_counter() - start)
+
+    return {
+        "cold_all_ms": cold_all * 1000,
+        "warm_all_ms": warm_all * 1000,
+        "single_p50_ms": statistics.median(single) * 1000,
+        "single_max_ms": max(single) * 1000,
+    }
+
+
+async def main(count: int):
+    print(f"{count}-version history")
+    print(f"{'mode':<22}{'content bytes':>14}{'cold all (ms)':>15}{'warm all (ms)':>15}"
+          f"{'1 cold p50':>12}{'1 cold max':>12}")
+    for label, delta, interval in [("full (no delta)", False, 1), ("delta, keyframe/10", True, 10),
+                                   ("delta, keyframe/50", True, 50)]:
+        resume_storage.RESUME_DELTA_ENCODING = delta
+        resume_storage.RESUME_KEYFRAME_INTERVAL = interval
+        resume_storage.content_cache.clear()
+        size = await build_history(count)
+        reads = await measure_reads(count)
+        print(f"{label:<22}{size:>14,}{reads['cold_all_ms']:>15.1f}{reads['warm_all_ms']:>15.1f}"
+              f"{reads['single_p50_ms']:>12.2f}{reads['single_max_ms']:>12.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--versions", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.versions))
@@ -0,0 +1,381 @@
+# backend/benchmarks/load_test.py
+#
+# End-to-end load test: concurrent virtual users each run realistic sessions (register, login, upload a
+# resume, set up the profile, then generate / list versions / submit feedback a few times) against the
+# API with Gemini replaced by a stand-in model of configurable latency. Reports throughput, p50/p95/p99
+# latency per endpoint and event-loop lag, to see how a change moves the capacity of one worker.
+#
+# In-process (the app runs on the load generator's event loop, on a throwaway SQLite database):
+#   python -m benchmarks.load_test --users 20 --sessions 2 --llm-latency-ms 800
+# Against a server on localhost, started with the same stand-in model (it reports its own event-loop lag on exit):
+#   python -m benchmarks.load_test --serve --port 8000
+#   python -m benchmarks.load_test --url http://127.0.0.1:8000 --users 50
+# Run from the backend/ directory. --json FILE also writes the report as JSON.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import httpx
+import docx
+
+from benchmarks.resume_corpus import LAYOUTS, make_resume
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+JOB_DESCRIPTIONS = [
+    "Senior Backend Engineer. Requirements: Python, PostgreSQL, Kafka, 5+ years building APIs. " * 6,
+    "Data Engineer. You will build batch and streaming pipelines with Spark, Airflow and SQL on AWS. " * 6,
+    "Engineering Manager. Lead a team of 8 engineers, own delivery and hiring, background in Go or Java. " * 6,
+]
+FEEDBACK_COMMENTS = ["Make the summary shorter.", "Do not mention my GPA.", "Highlight my Kafka experience.",
+                     "Use more numbers in the bullet points.", "Remove the hobbies section."]
+
+
+class StandInModel:
+    """
+    Replaces genai.GenerativeModel: sleeps (blocking, like the real SDK call) for a normally distributed
+    latency, then answers with output of the shape each prompt asks for, so the whole pipeline runs.
+    A `critique_issue_rate` share of critiques report issues, which makes generation run refinement passes.
+    """
+
+    def __init__(self, latency_ms: float, jitter_ms: float, critique_issue_rate: float, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.critique_issue_rate = critique_issue_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock() # Calls come from several worker threads
+        self.calls = 0
+
+    def generate_content(self, prompt: str, generation_config=None, safety_settings=None):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            issues = self._rng.random() < self.critique_issue_rate
+        time.sleep(delay)
+        text = self._respond(prompt, issues)
+        return SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))],
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4),
+        )
+
+    def count_tokens(self, text: str):
+        return SimpleNamespace(total_tokens=len(text) // 4)
+
+    @staticmethod
+    def _respond(prompt: str, issues: bool) -> str:
+        if "Digest JSON:" in prompt:
+            return json.dumps({"title": "Backend Engineer", "seniority": "Senior", "must_have": ["Python", "SQL"],
+                               "nice_to_have": ["Kafka"], "responsibilities": ["Build APIs"],
+                               "keywords": ["Python", "PostgreSQL", "Kafka"]})
+        if "Resume to Critique" in prompt:
+            found = [{"category": "Quantification", "severity": "medium", "description": "Add numbers.",
+                      "suggested_action": "Quantify the impact.", "relevant_rule_id": None}] if issues else []
+            return json.dumps({"issues": found, "overall_assessment": "Solid draft.", "has_issues": issues})
+        if "`items` array" in prompt:
+            comments = re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)
+            return json.dumps({"items": [{"index": int(index), "rules": [
+                {"action": "add", "id": None, "rule": f"Load test rule {index}.", "type": "stylistic", "active": True}],
+                "core_data_updates": {}} for index in comments]})
+        if "JSON Output:" in prompt:
+            return json.dumps({"rules": [{"action": "add", "id": None, "rule": "Load test rule.", "type": "stylistic",
+                                          "active": True}], "core_data_updates": {}})
+        if "resume parser and data extractor" in prompt:
+            return json.dumps({"full_name": "Load Test", "job_history": [
+                {"title": "Engineer", "company": "Acme", "start_date": "2019-01", "end_date": "Present",
+                 "responsibilities": ["Built services used by 40k customers."]}], "education": [], "projects": []})
+        return "# Load Test\n## Summary\nBackend engineer.\n## Experience\n" + "\n".join(
+            f"- Delivered project {i}, cutting latency by {10 + i}%." for i in range(12))
+
+
+def install_stand_in(app_module, args) -> StandInModel:
+    model = StandInModel(args.llm_latency_ms, args.llm_jitter_ms, args.critique_issue_rate)
+    app_module.llm_client.model = model
+    return model
+
+
+def configure_environment(args) -> None:
+    """Settings for the app under test; must run before the app is imported."""
+    if not args.url:
+        database = args.database or os.path.join(tempfile.mkdtemp(prefix="load_test_"), "load.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+        # The app shares the load generator's stdout; per-request INFO lines would bury the report
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("GEMINI_API_KEY", "load-test")
+    # The stand-in model has no rate limit; keep the scheduler's unless asked otherwise
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.llm_rpm)
+
+
+class LagMonitor:
+    """Samples event-loop lag: how late a sleep of `interval` seconds wakes up."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected) * 1000)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99),
+            "max": max(values, default=0.0), "mean": statistics.fmean(values) if values else 0.0}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.session_seconds: List[float] = []
+        self.failed_sessions = 0
+
+    async def call(self, client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            outcome = None if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as e:
+            response, outcome = None, type(e).__name__
+        self.latencies.setdefault(step, []).append((time.perf_counter() - started) * 1000)
+        if outcome is not None:
+            errors = self.errors.setdefault(step, {})
+            errors[outcome] = errors.get(outcome, 0) + 1
+            return None
+        return response
+
+
+def resume_docx(seed: int) -> bytes:
+    text, _ = make_resume(random.Random(seed), LAYOUTS[seed % len(LAYOUTS)], jobs=3 + seed % 4)
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+async def run_session(client: httpx.AsyncClient, recorder: Recorder, args, user: int, session: int, run_id: str) -> bool:
+    """One user session; returns False if a step failed (the rest of the session is skipped)."""
+    rng = random.Random(user * 1000 + session)
+    username = f"load_{run_id}_{user}_{session}"
+
+    async def think():
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    if not await recorder.call(client, "register", "POST", "/register",
+                               json={"username": username, "password": "load-test-password"}):
+        return False
+    response = await recorder.call(client, "login", "POST", "/token",
+                                   data={"username": username, "password": "load-test-password"})
+    if not response:
+        return False
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await think()
+
+    upload = resume_docx(0 if args.same_upload else user * 1000 + session)
+    response = await recorder.call(client, "upload_resume", "POST", "/upload-resume/", headers=headers,
+                                   files={"file": (f"{username}.docx", upload, DOCX_MIME)})
+    if not response:
+        return False
+    core_data = response.json().get("extracted_data") or {}
+    await think()
+
+    core_data["skills"] = sorted(set(core_data.get("skills") or []) | {"Python", "PostgreSQL"})
+    if not await recorder.call(client, "setup_profile", "POST", "/setup-user-profile/", headers=headers,
+                               json={"core_data": core_data}):
+        return False
+
+    for _ in range(args.generations):
+        await think()
+        response = await recorder.call(client, "generate_resume", "POST", "/generate-resume/", headers=headers, json={
+            "initial_prompt": "Keep it to one page.", "target_job_description": rng.choice(JOB_DESCRIPTIONS)})
+        if not response:
+            return False
+        version_id = response.json()["id"]
+        await think()
+        if not await recorder.call(client, "list_versions", "GET", "/resume-versions/", headers=headers):
+            return False
+        await think()
+        if not await recorder.call(client, "submit_feedback", "POST", "/submit-feedback/", headers=headers, json={
+                "resume_version_id": version_id,
+                "feedback_items": [{"section": "summary", "text": "Backend engineer.",
+                                    "comment": rng.choice(FEEDBACK_COMMENTS), "is_positive": False}]}):
+            return False
+    return True
+
+
+async def run_user(client: httpx.AsyncClient, recorder: Recorder, args, user: int, run_id: str) -> None:
+    if args.ramp_up_seconds:
+        await asyncio.sleep(args.ramp_up_seconds * user / args.users)
+    for session in range(args.sessions):
+        started = time.perf_counter()
+        if await run_session(client, recorder, args, user, session, run_id):
+            recorder.session_seconds.append(time.perf_counter() - started)
+        else:
+            recorder.failed_sessions += 1
+
+
+async def drive(args) -> dict:
+    recorder = Recorder()
+    lag = LagMonitor()
+    stand_in = lifespan = None
+    timeout = httpx.Timeout(args.timeout_seconds)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout,
+                                   limits=httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users))
+    else:
+        import app.main as app_module
+        stand_in = install_stand_in(app_module, args)
+        lifespan = app_module.app.router.lifespan_context(app_module.app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://load-test",
+                                   timeout=timeout)
+
+    run_id = uuid.uuid4().hex[:8]
+    lag.start()
+    started = time.perf_counter()
+    try:
+        async with client:
+            await asyncio.gather(*(run_user(client, recorder, args, user, run_id) for user in range(args.users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await lag.stop()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    requests = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "mode": args.url or "in-process",
+        "users": args.users,
+        "sessions_per_user": args.sessions,
+        "generations_per_session": args.generations,
+        "llm_latency_ms": args.llm_latency_ms if stand_in is not None else None,
+        "llm_calls": stand_in.calls if stand_in is not None else None,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 2),
+        "sessions_completed": len(recorder.session_seconds),
+        "sessions_failed": recorder.failed_sessions,
+        "sessions_per_minute": round(len(recorder.session_seconds) / elapsed * 60, 2),
+        "session_seconds": summarize(recorder.session_seconds),
+        "endpoints": {step: {"count": len(values), "errors": recorder.errors.get(step, {}),
+                             "per_second": round(len(values) / elapsed, 2), "latency_ms": summarize(values)}
+                      for step, values in recorder.latencies.items()},
+        # In-process, this is the app's own event loop; against --url, only the load generator's
+        "event_loop_lag_ms": summarize(lag.samples),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['users']} users x {report['sessions_per_user']} sessions ({report['mode']}), "
+          f"{report['elapsed_seconds']} s: {report['requests']} requests, {report['requests_per_second']} req/s, "
+          f"{report['sessions_completed']} sessions ({report['sessions_per_minute']}/min), "
+          f"{report['sessions_failed']} failed")
+    if report["llm_calls"] is not None:
+        print(f"Stand-in LLM: {report['llm_calls']} calls at ~{report['llm_latency_ms']} ms")
+    print(f"\n{'endpoint':<18}{'count':>7}{'errors':>8}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"{step:<18}{stats['count']:>7}{sum(stats['errors'].values()):>8}{stats['per_second']:>8}"
+              f"{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}")
+    errors = {step: stats["errors"] for step, stats in report["endpoints"].items() if stats["errors"]}
+    if errors:
+        print(f"Errors by status: {errors}")
+    lag = report["event_loop_lag_ms"]
+    print(f"\nEvent-loop lag (ms): p50 {lag['p50']:.1f}, p95 {lag['p95']:.1f}, p99 {lag['p99']:.1f}, max {lag['max']:.1f}")
+
+
+async def serve(args) -> None:
+    """Runs the app with the stand-in model on localhost until interrupted, then prints its event-loop lag."""
+    import uvicorn
+    import app.main as app_module
+
+    stand_in = install_stand_in(app_module, args)
+    lag = LagMonitor()
+
+    app_lifespan = app_module.app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan_with_report(app):
+        # The report runs in the app's shutdown, before uvicorn re-raises the interrupt
+        async with app_lifespan(app):
+            try:
+                yield
+            finally:
+                await lag.stop()
+                stats = summarize(lag.samples)
+                print(f"Stand-in LLM calls: {stand_in.calls}. Event-loop lag (ms): p50 {stats['p50']:.1f}, "
+                      f"p95 {stats['p95']:.1f}, p99 {stats['p99']:.1f}, max {stats['max']:.1f}", flush=True)
+
+    app_module.app.router.lifespan_context = lifespan_with_report
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    lag.start()
+    await server.serve()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users.")
+    parser.add_argument("--sessions", type=int, default=1, help="Sessions each user runs one after another.")
+    parser.add_argument("--generations", type=int, default=2, help="Generate / list / feedback rounds per session.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a user's steps.")
+    parser.add_argument("--ramp-up-seconds", type=float, default=0, help="Spread the users' start over this time.")
+    parser.add_argument("--same-upload", action="store_true", help="Every user uploads the same resume (upload cache hits).")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Mean latency of the stand-in Gemini model.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=200, help="Standard deviation of that latency.")
+    parser.add_argument("--critique-issue-rate", type=float, default=0.5, help="Share of critiques that find issues.")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="LLM_REQUESTS_PER_MINUTE for the app (0 = unlimited).")
+    parser.add_argument("--timeout-seconds", type=float, default=300)
+    parser.add_argument("--url", default=None, help="Drive a server at this URL instead of the app in-process.")
+    parser.add_argument("--database", default=None, help="SQLite file for the in-process app (default: a temp file).")
+    parser.add_argument("--serve", action="store_true", help="Serve the app with the stand-in model on localhost.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--json", default=None, help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    if args.serve:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    report = asyncio.run(drive(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,112 @@
+# backend/benchmarks/resume_corpus.py
+#
+# Builds a local corpus of synthetic resumes (PDF and DOCX, several layouts) with the ground-truth
+# fields they were generated from. Used by the benchmarks; nothing here touches the network.
+
+import os
+import random
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+import fitz
+import docx
+
+FIRST_NAMES = ["Jane", "Omar", "Li", "Priya", "Carlos", "Anna", "Kwame", "Sofia", "Mateo", "Yuki"]
+LAST_NAMES = ["Doe", "Haddad", "Wei", "Raman", "Silva", "Kowalski", "Mensah", "Rossi", "Garcia", "Tanaka"]
+COMPANIES = ["Acme GmbH", "Globex", "Initech", "Umbrella Health", "Stark Logistics", "Wayne Fintech"]
+TITLES = ["Software Engineer", "Senior Backend Engineer", "Data Engineer", "Engineering Manager", "SRE"]
+SKILLS = ["Python", "Go", "SQL", "PostgreSQL", "Docker", "Kubernetes", "Terraform", "AWS", "React", "Kafka"]
+CERTS = ["AWS Certified Solutions Architect", "Certified Kubernetes Administrator", "PMP", "CISSP"]
+VERBS = ["Led", "Built", "Designed", "Migrated", "Automated", "Scaled", "Reduced", "Launched"]
+OBJECTS = ["the billing platform", "an event-driven ingestion pipeline", "the search service",
+           "CI/CD for 40 repositories", "the customer analytics warehouse", "a multi-region failover setup"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# Layouts differ in heading names and in how dates / skills are written
+LAYOUTS = [
+    {"experience": "Work Experience", "education": "Education", "skills": "Skills",
+     "certifications": "Certifications", "summary": "Professional Summary", "date": "month"},
+    {"experience": "PROFESSIONAL EXPERIENCE", "education": "EDUCATION", "skills": "TECHNICAL SKILLS",
+     "certifications": "LICENSES & CERTIFICATIONS", "summary": "PROFILE", "date": "iso"},
+    {"experience": "Employment History:", "education": "Academic Background:", "skills": "Core Competencies:",
+     "certifications": "Certificates:", "summary": "Objective:", "date": "year"},
+]
+
+
+def _format_date(year: int, month: int, style: str) -> str:
+    if style == "month":
+        return f"{MONTHS[month - 1]} {year}"
+    if style == "iso":
+        return f"{year}-{month:02d}"
+    return str(year)
+
+
+def make_resume(rng: random.Random, layout: Dict[str, str], jobs: int) -> Tuple[str, Dict[str, Any]]:
+    """Returns (resume text, ground truth fields)."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    handle = name.lower().replace(" ", ".")
+    truth = {
+        "full_name": name,
+        "email": f"{handle}@example.com",
+        "phone": f"+1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "linkedin": f"linkedin.com/in/{handle.replace('.', '-')}",
+        "skills": rng.sample(SKILLS, 6),
+        "certifications": rng.sample(CERTS, 2),
+    }
+    lines = [name, f"{truth['email']} | {truth['phone']} | {truth['linkedin']}", "Remote", "",
+             layout["summary"], "Engineer who enjoys turning slow, fragile systems into fast, boring ones.", "",
+             layout["experience"]]
+
+    year, month = date.today().year, date.today().month # The current role ends "Present"
+    covered_months = 0
+    for job in range(jobs):
+        length = rng.randint(14, 40)
+        start = year * 12 + month - 1 - length
+        start_year, start_month = divmod(start, 12)
+        start_month += 1
+        end = "Present" if job == 0 else _format_date(year, month, layout["date"])
+        lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} | "
+                     f"{_format_date(start_year, start_month, layout['date'])} - {end}")
+        for _ in range(rng.randint(3, 5)):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}, improving throughput by {rng.randint(10, 80)}% "
+                         f"for {rng.randint(2, 90)}k users.")
+        covered_months += length
+        year, month = start_year, start_month
+        lines.append("")
+    truth["years_of_experience_months"] = covered_months
+
+    lines += [layout["education"], f"B.Sc. Computer Science, University of Somewhere, {year - 1}", "",
+              layout["skills"], ", ".join(truth["skills"]), "", layout["certifications"]]
+    lines += [f"- {cert}" for cert in truth["certifications"]]
+    return "\n".join(lines) + "\n", truth
+
+
+def write_pdf(path: str, text: str) -> None:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def write_docx(path: str, text: str) -> None:
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def build_corpus(directory: str, count: int = 30, seed: int = 11) -> List[Tuple[str, Dict[str, Any]]]:
+    """Writes `count` resumes (alternating PDF / DOCX) to `directory`; returns [(path, truth)]."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        text, truth = make_resume(rng, LAYOUTS[i % len(LAYOUTS)], jobs=rng.randint(2, 5))
+        if i % 2 == 0:
+            path = os.path.join(directory, f"resume_{i:03d}.pdf")
+            write_pdf(path, text)
+        else:
+            path = os.path.join(directory, f"resume_{i:03d}.docx")
+            write_docx(path, text)
+        corpus.append((path, truth))
+    return corpus
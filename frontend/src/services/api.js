@@ -30,16 +30,60 @@ const getAuthToken = () => {
     return localStorage.getItem('access_token');
 };
 
-// Function to store the token
-const setAuthToken = (token) => {
+// Function to store the token (and the refresh token that renews it)
+const setAuthToken = (token, refreshToken) => {
     localStorage.setItem('access_token', token);
+    if (refreshToken) {
+        localStorage.setItem('refresh_token', refreshToken);
+    }
 };
 
 // Function to remove the token (on logout)
 const removeAuthToken = () => {
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+};
+
+// Access tokens expire after 30 minutes. On a 401 the stored refresh token is traded for a new
+// token pair and the request is retried once, so the user isn't sent back to the login form.
+// Refresh tokens are single use: concurrent 401s share one refresh call.
+let refreshInFlight = null;
+
+const refreshAuthToken = () => {
+    if (!refreshInFlight) {
+        const refreshToken = localStorage.getItem('refresh_token');
+        refreshInFlight = (refreshToken
+            ? api.post('/token/refresh', { refresh_token: refreshToken }).then(response => {
+                setAuthToken(response.data.access_token, response.data.refresh_token);
+                return response.data.access_token;
+            })
+            : Promise.reject(new Error('No refresh token'))
+        ).finally(() => {
+            refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
 };
 
+api.interceptors.response.use(
+    response => response,
+    async error => {
+        const config = error.config;
+        if (error.response?.status !== 401 || !config || config._retried || config.url?.startsWith('/token')) {
+            return Promise.reject(error);
+        }
+        try {
+            const token = await refreshAuthToken();
+            config._retried = true;
+            config.headers.Authorization = `Bearer ${token}`;
+            return api(config);
+        } catch (refreshError) {
+            removeAuthToken();
+            return Promise.reject(error);
+        }
+    }
+);
+
 // export const generateResume = async (initialPrompt = null, targetJobDescription = null) => {
 //     console.log('Generating resume with initialPrompt:', initialPrompt, 'and targetJobDescription:', targetJobDescription);
 
@@ -94,7 +138,7 @@ export const loginUser = async (username, password) => {
                 'Content-Type': 'application/x-www-form-urlencoded',
             },
         });
-        setAuthToken(response.data.access_token); // Store the token
+        setAuthToken(response.data.access_token, response.data.refresh_token); // Store the tokens
         return response.data;
     } catch (error) {
         throw new Error(error.response?.data?.detail || 'Login failed');
@@ -103,6 +147,11 @@ export const loginUser = async (username, password) => {
 
 // Logout user
 export const logoutUser = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+        // End the session on the server too; logging out locally doesn't wait for it
+        api.post('/token/revoke', { refresh_token: refreshToken }).catch(() => {});
+    }
     removeAuthToken(); // Remove the token from storage
 };
 